@@ -9,8 +9,22 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CORE.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Django's handler, except that live event streams don't hold a thread each
+from api.streams import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
+
+# Judging in the web process lets the in-process pub/sub broker reach the live streams
+from django.conf import settings  # noqa: E402
+
+if settings.JUDGE_WORKERS_IN_PROCESS:
+    from api.judge_queue import JudgeWorker  # noqa: E402
+
+    for index in range(settings.JUDGE_WORKERS_IN_PROCESS):
+        JudgeWorker(index=index).start()
@@ -91,6 +91,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Judge workers, Judge0 callbacks and web requests write concurrently.
+            # BEGIN IMMEDIATE takes the write lock up front, so a transaction waits
+            # for it (up to `timeout` seconds) instead of failing with "database is
+            # locked" when it later tries to upgrade a read lock; WAL lets readers
+            # proceed while a write is in progress.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
+        # A file rather than the in-memory default, so tests with threads and the
+        # live server get their own connections and lock like production does
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -165,6 +178,71 @@ LOGOUT_REDIRECT_URL = "/accounts/login/"
 
 JUDGE0_API_URL = os.environ['JUDGE0_API_URL']
 JUDGE0_API_KEY = os.environ['JUDGE0_API_KEY']
+JUDGE0_BATCH_SIZE = int(os.environ.get('JUDGE0_BATCH_SIZE', 20))  # Judge0's MAX_SUBMISSION_BATCH_SIZE
+JUDGE0_CONNECT_TIMEOUT = float(os.environ.get('JUDGE0_CONNECT_TIMEOUT', 3.05))  # seconds
+JUDGE0_READ_TIMEOUT = float(os.environ.get('JUDGE0_READ_TIMEOUT', 10))  # seconds
+JUDGE0_MAX_RETRIES = int(os.environ.get('JUDGE0_MAX_RETRIES', 2))
+JUDGE0_RETRY_BACKOFF = float(os.environ.get('JUDGE0_RETRY_BACKOFF', 0.2))  # base seconds, doubled per retry
+JUDGE0_POOL_SIZE = int(os.environ.get('JUDGE0_POOL_SIZE', 20))  # keep-alive connections per process
+JUDGE0_MAX_IN_FLIGHT = int(os.environ.get('JUDGE0_MAX_IN_FLIGHT', 100))  # Judge0 jobs per process, 0 for no limit
+JUDGE0_MAX_IN_FLIGHT_PER_USER = int(os.environ.get('JUDGE0_MAX_IN_FLIGHT_PER_USER', 20))  # 0 for no limit
+JUDGE0_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('JUDGE0_CIRCUIT_FAILURE_THRESHOLD', 5))
+JUDGE0_CIRCUIT_RESET_TIMEOUT = float(os.environ.get('JUDGE0_CIRCUIT_RESET_TIMEOUT', 30))  # seconds
+# Result polling (see api.judge.PollSchedule)
+JUDGE0_POLL_INITIAL_DELAY = float(os.environ.get('JUDGE0_POLL_INITIAL_DELAY', 0.05))  # seconds before the first poll
+JUDGE0_POLL_BACKOFF = float(os.environ.get('JUDGE0_POLL_BACKOFF', 2))
+JUDGE0_POLL_MAX_INTERVAL = float(os.environ.get('JUDGE0_POLL_MAX_INTERVAL', 1))  # seconds
+JUDGE0_POLL_GRACE = float(os.environ.get('JUDGE0_POLL_GRACE', 10))  # compile and queueing allowance, seconds
+JUDGE0_POLL_MAX_DEADLINE = float(os.environ.get('JUDGE0_POLL_MAX_DEADLINE', 300))  # seconds
+# Callbacks: set to this backend's public base URL (e.g. https://oj.example.com) to have Judge0
+# PUT results to /api/judge0/<key>/callback/ instead of being polled; needs a long random secret too
+JUDGE0_CALLBACK_URL = os.environ.get('JUDGE0_CALLBACK_URL', '')
+JUDGE0_CALLBACK_TIMEOUT = int(os.environ.get('JUDGE0_CALLBACK_TIMEOUT', 120))  # seconds before falling back to polling
+
+# Judge queue (see api/judge_queue.py and `manage.py run_judge_workers`)
+JUDGE_WORKER_POLL_INTERVAL = float(os.environ.get('JUDGE_WORKER_POLL_INTERVAL', 0.5))  # seconds between polls of an empty queue
+JUDGE_TASK_MAX_ATTEMPTS = int(os.environ.get('JUDGE_TASK_MAX_ATTEMPTS', 3))
+JUDGE_TASK_STALE_AFTER = int(os.environ.get('JUDGE_TASK_STALE_AFTER', 600))  # seconds without a heartbeat before a running task is requeued
+JUDGE_TASK_HEARTBEAT_INTERVAL = float(os.environ.get('JUDGE_TASK_HEARTBEAT_INTERVAL', 30))  # seconds between a running task's heartbeats
+JUDGE_MAINTENANCE_INTERVAL = int(os.environ.get('JUDGE_MAINTENANCE_INTERVAL', 30))  # seconds between stale task/callback sweeps
+JUDGE_ICPC_INITIAL_WAVE = int(os.environ.get('JUDGE_ICPC_INITIAL_WAVE', 1))  # testcases in the first ICPC wave; later waves double
+JUDGE_WORKERS_IN_PROCESS = int(os.environ.get('JUDGE_WORKERS_IN_PROCESS', 0))  # judge worker threads started by CORE/asgi.py
+JUDGE_DEDUP_WINDOW = int(os.environ.get('JUDGE_DEDUP_WINDOW', 600))  # seconds an identical submission's verdict is reused, 0 to judge every one
+
+# Live updates (see api/pubsub.py and api/streams.py); streams need the ASGI server
+PUBSUB_BROKER = os.environ.get('PUBSUB_BROKER', 'api.pubsub.InProcessBroker')
+PUBSUB_QUEUE_SIZE = int(os.environ.get('PUBSUB_QUEUE_SIZE', 256))  # undelivered messages kept per subscriber
+STREAM_KEEPALIVE_INTERVAL = float(os.environ.get('STREAM_KEEPALIVE_INTERVAL', 15))  # seconds between keepalives and DB resyncs
+STREAM_MAX_DURATION = float(os.environ.get('STREAM_MAX_DURATION', 900))  # seconds before a stream is closed (clients reconnect)
+LEADERBOARD_PUSH_INTERVAL = float(os.environ.get('LEADERBOARD_PUSH_INTERVAL', 1))  # seconds; leaderboard diffs per contest at most this often
+
+# Caching: locmem (per process) unless CACHE_BACKEND names a shared one, e.g.
+# django.core.cache.backends.redis.RedisCache with CACHE_LOCATION=redis://...
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+# Public read endpoints (see api/response_cache.py)
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))  # seconds; the longest a cached response is served
+# Frozen scoreboards (see api/leaderboard.py)
+LEADERBOARD_SNAPSHOT_TIMEOUT = int(os.environ.get('LEADERBOARD_SNAPSHOT_TIMEOUT', 300))  # seconds a frozen snapshot is reused before it is rebuilt
+# Practice problem views (see api/view_counts.py)
+VIEW_COUNT_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 10))  # seconds between view count writes
+VIEW_COUNT_DEDUP_WINDOW = int(os.environ.get('VIEW_COUNT_DEDUP_WINDOW', 0))  # seconds a user's repeat views are not counted, 0 to count all
+# Contest exports (see api/exports.py)
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))  # rows fetched from the database at a time
+EXPORT_BUFFER_SIZE = int(os.environ.get('EXPORT_BUFFER_SIZE', 64 * 1024))  # characters written to the response at a time
+# Testcase archives (see api/testcase_import.py)
+TESTCASE_IMPORT_BATCH_BYTES = int(os.environ.get('TESTCASE_IMPORT_BATCH_BYTES', 16 * 2 ** 20))  # testcase text inserted per bulk_create
+TESTCASE_IMPORT_MAX_FILE_SIZE = int(os.environ.get('TESTCASE_IMPORT_MAX_FILE_SIZE', 64 * 2 ** 20))  # bytes; larger .in/.out files are rejected
+# Testcase payload files (see cms/testcase_store.py and `manage.py externalize_testcases`)
+TESTCASE_STORE_ROOT = os.environ.get('TESTCASE_STORE_ROOT') or os.path.join(MEDIA_ROOT, 'testcases')
+TESTCASE_STORE_MIN_SIZE = int(os.environ.get('TESTCASE_STORE_MIN_SIZE', 0))  # bytes; larger inputs/outputs go to files, 0 keeps them in the database
+# Testcases prepared for judging (see api/testcase_cache.py)
+TESTCASE_CACHE_MAX_BYTES = int(os.environ.get('TESTCASE_CACHE_MAX_BYTES', 256 * 2 ** 20))  # per process, 0 to prepare them for every submission
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ['EMAIL_HOST']
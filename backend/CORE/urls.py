@@ -56,6 +56,8 @@ urlpatterns = [
     path('allcontest/', allcontest, name='allcontest'),
     path('addcontest/', addcontest, name='addcontest'),
     path('contest/edit/<int:contest_id>/', editcontest, name='editcontest'),
+    path('contest/unfreeze/<int:contest_id>/', unfreezecontest, name='unfreezecontest'),
+    path('contest/export/<int:contest_id>/<str:dataset>/', exportcontest, name='exportcontest'),
     path('contest/delete/<int:contest_id>/', deletecontest, name='deletecontest'),
     path('contest_analytics/', contest_analytics, name='contest_analytics'),
 
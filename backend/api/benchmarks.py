@@ -0,0 +1,170 @@
+"""
+Fixtures shared by the benchmark management commands.
+
+Benchmarks create their own throwaway contest, problems and users (all
+prefixed with ``bench-``) and delete them again when they finish, so they
+can be pointed at a development database without leaving anything behind.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+import random
+import uuid
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from cms.models import (
+    Contest, Problem, Testcase, Submission, UserProfile, PracticeProblem, PracticeTestcase, PracticeSubmission, ProblemTag,
+)
+
+
+@contextmanager
+def bench_contest(users=1, problems=1, testcases=1):
+    """Yield a dict with a running contest, its problems and participants."""
+    tag = uuid.uuid4().hex[:8]
+    owner = User.objects.create_user(username=f'bench-owner-{tag}')
+    now = timezone.now()
+    contest = Contest.objects.create(
+        title=f'bench-{tag}', slug=f'bench-{tag}', description='benchmark',
+        start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=4),
+        created_by=owner,
+    )
+    problem_objs = []
+    for p in range(problems):
+        problem = Problem.objects.create(
+            contest=contest, title=f'bench-{tag}-{p}', slug=f'bench-{tag}-{p}',
+            statement='-', input_format='-', output_format='-', constraints='-',
+            sample_input='1', sample_output='1', difficulty='Easy',
+        )
+        Testcase.objects.bulk_create([
+            Testcase(problem=problem, input=f'{i}', output=f'{i}', points=1, is_sample=(i == 0))
+            for i in range(testcases)
+        ])
+        problem_objs.append(problem)
+
+    User.objects.bulk_create([
+        User(username=f'bench-{tag}-user-{u}') for u in range(users)
+    ])
+    user_objs = list(User.objects.filter(username__startswith=f'bench-{tag}-user-').order_by('id'))
+    UserProfile.objects.bulk_create([UserProfile(user=u) for u in user_objs])
+
+    try:
+        yield {'contest': contest, 'problems': problem_objs, 'users': user_objs}
+    finally:
+        contest.delete()
+        User.objects.filter(username__startswith=f'bench-{tag}-').delete()
+        owner.delete()
+
+
+@contextmanager
+def bench_practice(problems=1, tags=0, testcases=1):
+    """Yield a dict with visible practice problems and tags spread round-robin over them."""
+    tag = uuid.uuid4().hex[:8]
+    tag_objs = [ProblemTag.objects.create(name=f'bench-{tag}-{t}') for t in range(tags)]
+    problem_objs = []
+    for p in range(problems):
+        problem = PracticeProblem.objects.create(
+            title=f'bench-{tag}-{p}', slug=f'bench-{tag}-{p}',
+            statement='-', input_format='-', output_format='-', constraints='-',
+            sample_input='1', sample_output='1', difficulty='Easy',
+        )
+        PracticeTestcase.objects.bulk_create([
+            PracticeTestcase(problem=problem, input=f'{i}', output=f'{i}', points=1, is_sample=(i == 0))
+            for i in range(testcases)
+        ])
+        if tag_objs:
+            problem.tags.add(tag_objs[p % len(tag_objs)])
+        problem_objs.append(problem)
+
+    try:
+        yield {'problems': problem_objs, 'tags': tag_objs}
+    finally:
+        PracticeProblem.objects.filter(slug__startswith=f'bench-{tag}-').delete()
+        ProblemTag.objects.filter(name__startswith=f'bench-{tag}-').delete()
+
+
+def create_practice_submissions(practice, users, count, accept_ratio=0.3, seed=0):
+    """Bulk create ``count`` judged practice submissions from random users to random problems."""
+    rng = random.Random(seed)
+    submissions = [
+        PracticeSubmission(
+            user=rng.choice(users), problem=rng.choice(practice['problems']), code='print(input())', language=71,
+            status='Accepted' if rng.random() < accept_ratio else 'Wrong Answer',
+        )
+        for _ in range(count)
+    ]
+    PracticeSubmission.objects.bulk_create(submissions, batch_size=1000)
+    return submissions
+
+
+def create_submissions(fixture, count, status='Pending', code='print(input())'):
+    """Bulk create ``count`` submissions spread round-robin over users and problems."""
+    users, problems = fixture['users'], fixture['problems']
+    contest = fixture['contest']
+    submissions = [
+        Submission(
+            user=users[i % len(users)], problem=problems[i % len(problems)], contest=contest,
+            code=code, language=71, status=status,
+        )
+        for i in range(count)
+    ]
+    Submission.objects.bulk_create(submissions, batch_size=1000)
+    return list(Submission.objects.filter(contest=contest).order_by('id'))
+
+
+def create_judged_submissions(fixture, count, seed=0, accept_ratio=0.3):
+    """
+    Bulk create ``count`` judged submissions from random users to random
+    problems, spread over the contest's first hours in submission order.
+    """
+    rng = random.Random(seed)
+    users, problems = fixture['users'], fixture['problems']
+    contest = fixture['contest']
+    submissions = []
+    for i in range(count):
+        accepted = rng.random() < accept_ratio
+        submissions.append(Submission(
+            user=rng.choice(users), problem=rng.choice(problems), contest=contest,
+            code='print(input())', language=71,
+            status='Accepted' if accepted else rng.choice(['Wrong Answer', 'Time Limit Exceeded', 'Runtime Error']),
+            score=100 if accepted else rng.choice([0, 0, 30, 60]),
+            execution_time=round(rng.uniform(0.01, 1.0), 3),
+        ))
+    Submission.objects.bulk_create(submissions, batch_size=1000)
+
+    # submitted_at is auto_now_add, so it can only be spread out afterwards
+    created = list(Submission.objects.filter(contest=contest).order_by('id'))[-count:]
+    step = timedelta(hours=3) / max(count, 1)
+    for i, submission in enumerate(created):
+        submission.submitted_at = contest.start_time + step * i
+    Submission.objects.bulk_update(created, ['submitted_at'], batch_size=1000)
+    return created
+
+
+def create_submission_history(fixture, count, days=365, seed=0, batch_size=10000):
+    """
+    Bulk create ``count`` judged submissions from random users to random
+    problems, spread evenly over the last ``days`` days (several share each
+    timestamp), without holding them all in memory.
+    """
+    rng = random.Random(seed)
+    users, problems = fixture['users'], fixture['problems']
+    contest = fixture['contest']
+    statuses = ['Accepted', 'Wrong Answer', 'Wrong Answer', 'Time Limit Exceeded', 'Runtime Error', 'Compilation Error']
+    start = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count // 4, 1)
+    submitted_at = Submission._meta.get_field('submitted_at')
+    # submitted_at is auto_now_add; switch that off so the history can be written in one pass
+    auto_now_add, submitted_at.auto_now_add = submitted_at.auto_now_add, False
+    try:
+        for offset in range(0, count, batch_size):
+            Submission.objects.bulk_create([
+                Submission(
+                    user=rng.choice(users), problem=rng.choice(problems), contest=contest,
+                    code='-', language=71, status=rng.choice(statuses),
+                    submitted_at=start + step * (i // 4),
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ])
+    finally:
+        submitted_at.auto_now_add = auto_now_add
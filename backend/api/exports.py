@@ -0,0 +1,162 @@
+"""
+Streaming exports of a contest's submissions, testcase verdicts and standings.
+
+Rows are read with ``values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+(no model instances, no result cache) and written out as CSV or JSON lines
+in ~``EXPORT_BUFFER_SIZE`` pieces of a ``StreamingHttpResponse``, so an
+export holds one chunk of rows at a time however large the contest is. With
+``compress`` the stream is gzipped on the fly and served as a ``.gz`` file.
+
+Under ASGI Django would read a synchronous streaming iterator to the end
+before sending anything, so there the chunks are produced one at a time on
+the request's sync thread (where its cursors live) by an async iterator.
+
+Standings are streamed as two sorted iterators, the leaderboard entries and
+their per-problem cells, merged on the entry; every problem gets an
+attempts and a first-AC column.
+"""
+import csv
+from datetime import datetime
+import io
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from cms.models import Leaderboard, LeaderboardCell, Submission, SubmissionTestcase
+
+from .leaderboard import standing_order
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+SUBMISSION_COLUMNS = [
+    ('id', 'id'), ('username', 'user__username'), ('problem', 'problem__slug'), ('language', 'language'),
+    ('status', 'status'), ('score', 'score'), ('execution_time', 'execution_time'), ('memory_used', 'memory_used'),
+    ('testcases_passed', 'testcases_passed'), ('testcases_total', 'testcases_total'), ('submitted_at', 'submitted_at'),
+]
+VERDICT_COLUMNS = [
+    ('submission', 'submission_id'), ('testcase', 'testcase_id'), ('status', 'status'),
+    ('execution_time', 'execution_time'), ('memory_used', 'memory_used'),
+]
+STANDING_COLUMNS = [
+    ('rank', 'rank'), ('username', 'user__username'), ('score', 'score'), ('problems_solved', 'problems_solved'),
+    ('penalty', 'penalty'), ('total_submissions', 'total_submissions'),
+    ('accepted_submissions', 'accepted_submissions'), ('total_time', 'total_time'),
+]
+
+
+def _chunked(queryset, fields):
+    return queryset.values_list(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def submissions(contest):
+    """``(header, rows)`` of a contest's submissions, in submission order."""
+    header, fields = zip(*SUBMISSION_COLUMNS)
+    return header, _chunked(Submission.objects.filter(contest=contest).order_by('id'), fields)
+
+
+def verdicts(contest):
+    """``(header, rows)`` of the per-testcase results of a contest's submissions."""
+    header, fields = zip(*VERDICT_COLUMNS)
+    results = SubmissionTestcase.objects.filter(submission__contest=contest).order_by('submission_id', 'id')
+    return header, _chunked(results, fields)
+
+
+def standings(contest):
+    """``(header, rows)`` of a contest's live standings, one row per leaderboard entry."""
+    problems = list(contest.problems.order_by('id').values_list('id', 'slug'))
+    header, fields = zip(*STANDING_COLUMNS)
+    header += tuple(f'{slug}_{column}' for _, slug in problems for column in ('attempts', 'first_ac_at'))
+    column_of = {problem_id: i for i, (problem_id, _) in enumerate(problems)}
+
+    entries = _chunked(Leaderboard.objects.filter(contest=contest).order_by(*standing_order()), ('id',) + fields)
+    cells = _chunked(
+        LeaderboardCell.objects.filter(entry__contest=contest).order_by(*standing_order('entry__')),
+        ('entry_id', 'problem_id', 'attempts', 'first_ac_at'),
+    )
+
+    def rows():
+        cell = next(cells, None)
+        for entry_id, *values in entries:
+            results = [None] * (2 * len(problems))
+            while cell is not None and cell[0] == entry_id:
+                if cell[1] in column_of:
+                    results[2 * column_of[cell[1]]:2 * column_of[cell[1]] + 2] = cell[2:]
+                cell = next(cells, None)
+            yield (*values, *results)
+    return header, rows()
+
+
+DATASETS = {
+    'submissions': submissions,
+    'verdicts': verdicts,
+    'standings': standings,
+}
+
+
+def _csv_lines(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+        if buffer.tell() >= settings.EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _json_lines(header, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    pending, size = [], 0
+    for row in rows:
+        line = encoder.encode(dict(zip(header, row))) + '\n'
+        pending.append(line)
+        size += len(line)
+        if size >= settings.EXPORT_BUFFER_SIZE:
+            yield ''.join(pending)
+            pending, size = [], 0
+    yield ''.join(pending)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+def stream(dataset, contest, file_format='csv', compress=False):
+    """The encoded chunks of an export; ``dataset`` is a key of DATASETS."""
+    header, rows = DATASETS[dataset](contest)
+    lines = _csv_lines(header, rows) if file_format == 'csv' else _json_lines(header, rows)
+    chunks = (text.encode() for text in lines if text)
+    return _gzipped(chunks) if compress else chunks
+
+
+async def _asynchronous(chunks):
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def export_response(request, dataset, contest, file_format='csv', compress=False):
+    """A download of ``stream(...)``; raises KeyError for an unknown dataset or format."""
+    content_type = FORMATS[file_format]
+    chunks = stream(dataset, contest, file_format, compress)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):  # a DRF request wraps Django's
+        chunks = _asynchronous(chunks)
+    filename = f'{contest.slug}-{dataset}.{file_format}'
+    if compress:
+        content_type, filename = 'application/gzip', f'{filename}.gz'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
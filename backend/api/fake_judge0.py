@@ -0,0 +1,189 @@
+"""
+A local stand-in for the Judge0 API, used by the judge benchmarks.
+
+It implements the endpoints api.judge talks to (single and batch create,
+single and batch read) and "runs" every program as ``cat``: stdout is the
+submitted stdin, so a testcase is Accepted when its expected output equals
+its input. Each submission stays In Queue/Processing for ``delay`` seconds;
+if it was created with a ``callback_url``, the finished result is then PUT
+there. Results are base64 encoded like Judge0 does: in callbacks, and when
+read with ``base64_encoded=true``.
+
+    with FakeJudge0(delay=0.05) as fake:
+        settings.JUDGE0_API_URL = fake.url
+        ...
+        print(fake.request_counts)
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import base64
+import json
+import threading
+import time
+import uuid
+
+import requests
+
+
+STATUS_PROCESSING = {'id': 2, 'description': 'Processing'}
+STATUS_ACCEPTED = {'id': 3, 'description': 'Accepted'}
+STATUS_WRONG_ANSWER = {'id': 4, 'description': 'Wrong Answer'}
+
+
+class FakeJudge0:
+    def __init__(self, delay=0.05, host='127.0.0.1', port=0):
+        self.delay = delay
+        self.submissions = {}
+        self.request_counts = Counter()
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_counts.clear()
+
+    # Submission lifecycle
+    @staticmethod
+    def decode(payload):
+        """A payload sent with ``base64_encoded=true``, with its text fields decoded."""
+        payload = dict(payload)
+        for field in ('source_code', 'stdin', 'expected_output'):
+            if payload.get(field):
+                payload[field] = base64.b64decode(payload[field]).decode()
+        return payload
+
+    @staticmethod
+    def encode(payload):
+        """The ``base64_encoded=true`` form of a plain payload."""
+        payload = dict(payload)
+        for field in ('source_code', 'stdin', 'expected_output'):
+            if payload.get(field):
+                payload[field] = base64.b64encode(payload[field].encode()).decode()
+        return payload
+
+    def create(self, payload):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.submissions[token] = {'payload': payload, 'created': time.monotonic()}
+        if payload.get('callback_url'):
+            timer = threading.Timer(self.delay, self._send_callback, args=(token, payload))
+            timer.daemon = True
+            timer.start()
+        return token
+
+    @staticmethod
+    def encode_result(result):
+        """The ``base64_encoded=true`` form of a result."""
+        if not result:
+            return result
+        result = dict(result)
+        for field in ('stdout', 'compile_output'):
+            if result.get(field):
+                result[field] = base64.b64encode(result[field].encode()).decode()
+        return result
+
+    def _send_callback(self, token, payload):
+        result = self.encode_result(self.finished_result(token, payload))
+        try:
+            requests.put(payload['callback_url'], json=result, timeout=10)
+        except requests.exceptions.RequestException:
+            with self.lock:
+                self.callbacks_failed += 1
+            return
+        with self.lock:
+            self.callbacks_sent += 1
+
+    def result(self, token):
+        with self.lock:
+            entry = self.submissions.get(token)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['created'] < self.delay:
+            return {'token': token, 'status': STATUS_PROCESSING}
+        return self.finished_result(token, entry['payload'])
+
+    def finished_result(self, token, payload):
+        stdout = payload.get('stdin') or ''
+        expected = payload.get('expected_output') or ''
+        status = STATUS_ACCEPTED if stdout.strip() == expected.strip() else STATUS_WRONG_ANSWER
+        return {'token': token, 'status': status, 'stdout': stdout, 'time': '0.001', 'memory': 1024,
+                'compile_output': None}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _count(self, route):
+                with fake.lock:
+                    fake.request_counts[f'{self.command} {route}'] += 1
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _send(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                path = urlsplit(self.path).path.rstrip('/')
+                if path == '/submissions/batch':
+                    self._count('/submissions/batch')
+                    payloads = self._body().get('submissions', [])
+                    if parse_qs(urlsplit(self.path).query).get('base64_encoded') == ['true']:
+                        payloads = [fake.decode(p) for p in payloads]
+                    return self._send(201, [{'token': fake.create(p)} for p in payloads])
+                if path == '/submissions':
+                    self._count('/submissions')
+                    return self._send(201, {'token': fake.create(self._body())})
+                self._send(404, {'error': 'not found'})
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path.rstrip('/')
+                query = parse_qs(url.query)
+                encode = fake.encode_result if query.get('base64_encoded') == ['true'] else (lambda result: result)
+                if path == '/submissions/batch':
+                    self._count('/submissions/batch')
+                    tokens = query.get('tokens', [''])[0].split(',')
+                    return self._send(200, {'submissions': [encode(fake.result(t)) for t in tokens if t]})
+                if path.startswith('/submissions/'):
+                    self._count('/submissions/{token}')
+                    result = encode(fake.result(path.rsplit('/', 1)[-1]))
+                    return self._send(200 if result else 404, result or {'error': 'not found'})
+                self._send(404, {'error': 'not found'})
+
+        return Handler
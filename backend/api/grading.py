@@ -0,0 +1,556 @@
+"""
+Judging pipeline for contest and practice submissions.
+
+Testcases are sent to Judge0 in waves chosen by the judging policy of the
+contest (or practice problem):
+
+* ``ioi``: every testcase in one wave, partial points.
+* ``icpc``: waves that double in size, starting at
+  ``JUDGE_ICPC_INITIAL_WAVE``; judging stops at the first failing testcase.
+* ``samples_first``: the sample testcases, then everything else if they all
+  passed.
+
+Testcases a policy does not need are stored as 'Skipped'. By default each
+wave's results are polled for and stored right away. When
+``JUDGE0_CALLBACK_URL`` is set, Judge0 instead PUTs each result to
+``/api/judge0/<callback key>/callback/`` and ``apply_callback`` stores it;
+the last result of a wave finalizes the submission, or queues a JudgeTask
+that sends the next wave (no Judge0 call is made while answering a
+callback). A callback is only accepted with the random key of its
+JudgeToken and the Judge0 token recorded for it (see ``callback_mapping``).
+Either way the verdict is computed by the ``finalize_*`` functions from the
+stored testcase rows.
+
+Each testcase result and the final verdict are also published (see
+api.pubsub) on the submission's topic, for the live streams in api.streams.
+
+No database transaction is ever held open across a Judge0 call. When
+polling, a submission's results are buffered in memory and written in one
+short transaction at the end: a single ``bulk_create`` of the testcase rows
+and a single ``save(update_fields=...)`` of the submission.
+
+A problem's testcases and their Judge0 payload fields are prepared once
+and shared by its submissions (see api.testcase_cache).
+
+A resubmission of the same code (same ``code_hash``, see CodeHashMixin)
+within ``JUDGE_DEDUP_WINDOW`` seconds of a judged one, against the same
+``testcase_version`` of the problem, is not sent to Judge0: the earlier
+testcase results are copied and finalized as if they had just come back.
+Results with a judge-side error are never reused, and ``force`` (an admin
+rejudge) always judges. Reuses are counted as ``dedup.hits``, judged
+lookups as ``dedup.misses`` in api.metrics. When a rejudge changes a
+verdict that was already counted, the problem stats, the user's problem
+status and profile and the leaderboard cell are corrected (the
+``record_rejudge`` methods) rather than counted again.
+"""
+import base64
+from datetime import timedelta
+import hmac
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from cms.models import (
+    Submission, SubmissionTestcase, PracticeSubmission, PracticeSubmissionTestcase, JudgeTask, JudgeToken,
+    UserProblemStatus, UserPracticeProblemStatus,
+)
+from . import judge, leaderboard, metrics, pubsub, testcase_cache
+
+
+ICPC, IOI, SAMPLES_FIRST = 'icpc', 'ioi', 'samples_first'
+
+CONTEST_VERDICT_FIELDS = ['status', 'score', 'execution_time', 'memory_used', 'testcases_passed']
+PRACTICE_VERDICT_FIELDS = ['status', 'execution_time', 'memory_used', 'penalty']
+RESULT_FIELDS = ['status', 'execution_time', 'memory_used', 'output']
+# Testcase results that say nothing about the code, so are not reused for a duplicate submission
+JUDGE_ERROR_STATUSES = {'API Error', 'System Error', 'Internal Error', 'Exec Format Error'}
+
+
+# Contest submissions
+def process_submission(submission, queue_depth=0, force=False):
+    """Judge a contest submission against the testcases of its problem."""
+    _judge(CONTEST, submission, queue_depth, force)
+
+
+def continue_submission(submission):
+    """Send the next wave of a contest submission judged with callbacks."""
+    _advance_with_callbacks(CONTEST, submission)
+
+
+def finalize_submission(submission, testcase_results=None):
+    """
+    Compute a contest submission's verdict from its testcase results, read
+    from the database unless passed in (ordered by testcase id).
+    """
+    total_points, max_exec_time, max_mem_used = 0, 0, 0
+    overall_status = 'Accepted'
+    testcases_passed = 0
+    previous_status, previous_score = submission.status, submission.score
+
+    if testcase_results is None:
+        testcase_results = submission.testcases.select_related('testcase').order_by('testcase_id')
+    for testcase_result in testcase_results:
+        if testcase_result.status == 'Skipped':
+            continue
+        if testcase_result.status == 'Accepted':
+            total_points += testcase_result.testcase.points
+            testcases_passed += 1
+        else:
+            overall_status = testcase_result.status
+        max_exec_time = max(max_exec_time, testcase_result.execution_time or 0)
+        max_mem_used = max(max_mem_used, testcase_result.memory_used or 0)
+
+    submission.status = overall_status
+    submission.score = total_points
+    submission.execution_time = max_exec_time
+    submission.memory_used = max_mem_used
+    submission.testcases_passed = testcases_passed
+    submission.save(update_fields=CONTEST_VERDICT_FIELDS)
+
+    # update user profile, problem stats and leaderboard, unless a retried task already counted this submission;
+    # a rejudge that changed the verdict corrects them instead
+    if previous_status == 'Pending':
+        first_attempt, newly_solved = UserProblemStatus.record_verdict(submission)
+        submission.user.profile.record_verdict(submission, newly_solved)
+        submission.problem.record_verdict(submission, first_attempt, newly_solved)
+        leaderboard.record_verdict(submission)
+    elif (submission.status, submission.score) != (previous_status, previous_score):
+        solved_change = UserProblemStatus.record_rejudge(submission)
+        submission.user.profile.record_rejudge(solved_change)
+        submission.problem.record_rejudge(submission, previous_status, solved_change)
+        leaderboard.record_verdict(submission, rejudged=True)
+
+
+def _contest_result_fields(result):
+    return {
+        'status': result.get('status', {}).get('description', 'Runtime Error'),
+        'execution_time': float(result.get('time', 0)) if result.get('time') else 0.0,
+        'memory_used': result.get('memory') / 1024 if result.get('memory') else None,
+        'output': result.get('stdout', '').strip() if result.get('stdout') else None,
+    }
+
+
+# Practice submissions
+def process_practice_submission(submission, queue_depth=0, force=False):
+    """Judge a practice submission against the testcases of its problem."""
+    _judge(PRACTICE, submission, queue_depth, force)
+
+
+def continue_practice_submission(submission):
+    """Send the next wave of a practice submission judged with callbacks."""
+    _advance_with_callbacks(PRACTICE, submission)
+
+
+def finalize_practice_submission(submission, testcase_results=None):
+    """
+    Compute a practice submission's verdict from its testcase results, read
+    from the database unless passed in (ordered by testcase id).
+    """
+    overall_status = 'Accepted'
+    max_exec_time, max_mem_used = 0, 0
+    total_penalty = 0
+    previous_status = submission.status
+
+    if testcase_results is None:
+        testcase_results = submission.testcases.order_by('testcase_id')
+    for testcase_result in testcase_results:
+        if testcase_result.status == 'Skipped':
+            continue
+        if testcase_result.status != 'Accepted':
+            overall_status = testcase_result.status
+            total_penalty += 5  # 5 seconds penalty for failed testcase (customize as needed)
+
+        max_exec_time = max(max_exec_time, testcase_result.execution_time or 0)
+        max_mem_used = max(max_mem_used, testcase_result.memory_used or 0)
+
+    submission.status = overall_status
+    submission.execution_time = max_exec_time
+    submission.memory_used = max_mem_used
+    submission.penalty = total_penalty
+    submission.save(update_fields=PRACTICE_VERDICT_FIELDS)
+
+    if previous_status == 'Pending':
+        first_attempt, newly_solved = UserPracticeProblemStatus.record_verdict(submission)
+        submission.problem.record_verdict(submission, first_attempt, newly_solved)
+    elif submission.status != previous_status:
+        solved_change = UserPracticeProblemStatus.record_rejudge(submission)
+        submission.problem.record_rejudge(submission, previous_status, solved_change)
+
+
+def _practice_result_fields(result):
+    return {
+        'status': result.get('status', {}).get('description', 'Runtime Error'),
+        'execution_time': float(result.get('time', 0)) if result.get('time') else 0.0,
+        'memory_used': result.get('memory', 0) / 1024 if result.get('memory') else 0.0,
+        'output': result.get('stdout', '').strip() if result.get('stdout') else '',
+    }
+
+
+class _Kind:
+    """What differs between judging a contest and a practice submission."""
+
+    def __init__(self, result_model, result_fields, finalize, verdict_fields, token_owner, token_testcase, policy):
+        self.result_model = result_model
+        self.result_fields = result_fields
+        self.finalize = finalize
+        self.verdict_fields = verdict_fields
+        self.token_owner = token_owner
+        self.token_testcase = token_testcase
+        self.policy = policy
+
+    def results(self, submission):
+        return self.result_model.objects.filter(submission=submission)
+
+    def tokens(self, submission):
+        return JudgeToken.objects.filter(**{self.token_owner: submission})
+
+    def build(self, submission, testcase, result):
+        return self.result_model(submission=submission, testcase=testcase, **self.result_fields(result))
+
+    def copy(self, submission, testcase, row):
+        """An unsaved copy of another submission's result ``row``."""
+        return self.result_model(submission=submission, testcase=testcase,
+                                 **{field: getattr(row, field) for field in RESULT_FIELDS})
+
+    def store(self, submission, testcase_id, result):
+        return self.result_model.objects.create(submission=submission, testcase_id=testcase_id,
+                                                **self.result_fields(result))
+
+    def topic(self, submission_id):
+        """The pub/sub topic of a submission's live events."""
+        return f'{self.token_owner}:{submission_id}'
+
+    def testcase_event(self, row):
+        return {'event': 'testcase', 'testcase': row.testcase_id, 'status': row.status,
+                'execution_time': row.execution_time, 'memory_used': row.memory_used}
+
+    def verdict_event(self, submission):
+        event = {field: getattr(submission, field) for field in self.verdict_fields}
+        event['event'] = 'verdict'
+        return event
+
+    def publish_testcase(self, submission, row):
+        pubsub.publish(self.topic(submission.pk), self.testcase_event(row))
+
+    def publish_verdict(self, submission):
+        pubsub.publish(self.topic(submission.pk), self.verdict_event(submission))
+
+
+CONTEST = _Kind(SubmissionTestcase, _contest_result_fields, finalize_submission, CONTEST_VERDICT_FIELDS,
+                'submission', 'testcase', lambda submission: submission.contest.judging_policy)
+PRACTICE = _Kind(PracticeSubmissionTestcase, _practice_result_fields, finalize_practice_submission,
+                 PRACTICE_VERDICT_FIELDS, 'practice_submission', 'practice_testcase',
+                 lambda submission: submission.problem.judging_policy)
+
+
+# Judging policies
+def judging_order(policy, testcases):
+    """Testcases in the order a policy judges them."""
+    testcases = sorted(testcases, key=lambda testcase: testcase.id)
+    if policy == SAMPLES_FIRST:
+        testcases.sort(key=lambda testcase: not testcase.is_sample)
+    return testcases
+
+
+def next_wave(policy, testcases, statuses):
+    """
+    The testcases to judge next, given ``statuses`` ({testcase_id: status})
+    of those judged so far. An empty list means judging is over; testcases
+    without a status then count as skipped.
+    """
+    remaining = [testcase for testcase in testcases if testcase.id not in statuses]
+    failed = any(status != 'Accepted' for status in statuses.values())
+    if not remaining:
+        return []
+    if policy == ICPC:
+        if failed:
+            return []
+        size = min(max(settings.JUDGE_ICPC_INITIAL_WAVE, len(statuses)), settings.JUDGE0_BATCH_SIZE)
+        return remaining[:size]
+    if policy == SAMPLES_FIRST:
+        samples = [testcase for testcase in remaining if testcase.is_sample]
+        if samples:
+            return samples
+        if failed:  # only samples have been judged so far
+            return []
+    return remaining
+
+
+def _judge(kind, submission, queue_depth, force=False):
+    problem = submission.problem
+    policy = kind.policy(submission)
+    prepared = testcase_cache.get(problem)
+    testcases = judging_order(policy, prepared.testcases)
+
+    # A retried task starts over: forget tokens and results of the earlier attempt
+    with transaction.atomic():
+        kind.tokens(submission).delete()
+        kind.results(submission).delete()
+        submission.testcase_version = prepared.version
+        type(submission).objects.filter(pk=submission.pk).update(testcase_version=prepared.version)
+
+    if not force and settings.JUDGE_DEDUP_WINDOW > 0 and submission.code_hash:
+        if _reuse_duplicate(kind, submission, policy, testcases):
+            metrics.increment('dedup.hits')
+            return
+        metrics.increment('dedup.misses')
+
+    if callbacks_enabled():
+        _advance_with_callbacks(kind, submission, policy, testcases, {})
+        return
+
+    rows = {}  # testcase id -> unsaved result row
+    statuses = {}
+    wave = next_wave(policy, testcases, statuses)
+    while wave:
+        schedule = judge.PollSchedule(problem.time_limit, len(wave), queue_depth)
+        payloads = _judge0_payloads(submission, problem, prepared, wave)
+
+        def on_result(index, result, wave=wave):
+            row = rows[wave[index].id] = kind.build(submission, wave[index], result)
+            kind.publish_testcase(submission, row)
+
+        results = judge.run_batch(payloads, schedule, user=submission.user_id, on_result=on_result)
+        for testcase, result in zip(wave, results):
+            if testcase.id not in rows:  # never came back from Judge0
+                rows[testcase.id] = kind.build(submission, testcase, result)
+            statuses[testcase.id] = rows[testcase.id].status
+        wave = next_wave(policy, testcases, statuses)
+
+    _complete(kind, submission, policy, testcases, statuses, rows)
+
+
+def _reuse_duplicate(kind, submission, policy, testcases):
+    """
+    Finish ``submission`` with the results of the latest judged identical
+    submission in the dedup window, if there is one whose results still
+    apply. Returns whether it did.
+    """
+    window = timedelta(seconds=settings.JUDGE_DEDUP_WINDOW)
+    duplicate = type(submission).objects.filter(
+        user_id=submission.user_id, problem_id=submission.problem_id, code_hash=submission.code_hash,
+        testcase_version=submission.testcase_version,
+        submitted_at__gte=submission.submitted_at - window, submitted_at__lte=submission.submitted_at + window,
+    ).exclude(pk=submission.pk).exclude(status='Pending').order_by('-submitted_at', '-id').first()
+    if duplicate is None:
+        return False
+
+    by_id = {testcase.id: testcase for testcase in testcases}
+    rows, statuses = {}, {}
+    for row in kind.results(duplicate):
+        if row.status in JUDGE_ERROR_STATUSES or row.testcase_id not in by_id:
+            return False
+        if row.status != 'Skipped':
+            rows[row.testcase_id] = kind.copy(submission, by_id[row.testcase_id], row)
+            statuses[row.testcase_id] = row.status
+    if not statuses or next_wave(policy, testcases, statuses):
+        return False  # e.g. judged under another policy, which skipped testcases this one needs
+
+    for testcase_id in sorted(rows):
+        kind.publish_testcase(submission, rows[testcase_id])
+    _complete(kind, submission, policy, testcases, statuses, rows)
+    return True
+
+
+def _complete(kind, submission, policy, testcases, statuses, rows=None):
+    """
+    Store 'Skipped' for testcases the policy did not need, then finalize.
+
+    ``rows`` are the buffered, unsaved results of a polled submission; they
+    are written here together with the verdict. Without them the results are
+    already in the database (callback mode).
+    """
+    skipped = [testcase for testcase in testcases if testcase.id not in statuses]
+    if policy == ICPC:
+        # A wave is judged in parallel, so testcases after the first failure
+        # may have results; ICPC only reports up to the first failure
+        failed_at = next((index for index, testcase in enumerate(testcases)
+                          if statuses.get(testcase.id, 'Accepted') != 'Accepted'), len(testcases))
+        judged_after = [testcase.id for testcase in testcases[failed_at + 1:] if testcase.id in statuses]
+    else:
+        judged_after = []
+    skipped_rows = [kind.result_model(submission=submission, testcase=testcase, status='Skipped')
+                    for testcase in skipped]
+
+    with transaction.atomic():
+        if rows is None:
+            if judged_after:
+                kind.results(submission).filter(testcase_id__in=judged_after).update(status='Skipped')
+            kind.result_model.objects.bulk_create(skipped_rows)
+            kind.finalize(submission)
+        else:
+            for testcase_id in judged_after:
+                rows[testcase_id].status = 'Skipped'
+            rows.update((row.testcase_id, row) for row in skipped_rows)
+            ordered = [rows[testcase_id] for testcase_id in sorted(rows)]
+            kind.result_model.objects.bulk_create(ordered)
+            kind.finalize(submission, ordered)
+    kind.publish_verdict(submission)
+
+
+def _judge0_payloads(submission, problem, prepared, wave):
+    """Base64 encoded, see judge.Judge0Client.create_batch."""
+    source_code = base64.b64encode(submission.code.encode()).decode('ascii')
+    payloads = []
+    for testcase in wave:
+        stdin, expected_output = prepared.payload(testcase)
+        payloads.append({
+            'source_code': source_code,
+            'language_id': submission.language,
+            'stdin': stdin,
+            'expected_output': expected_output,
+            'cpu_time_limit': problem.time_limit,
+            'memory_limit': problem.memory_limit * 1024,
+        })
+    return payloads
+
+
+# Judge0 callbacks
+def _callback_progress(kind, submission):
+    """The policy, testcases (in judging order) and stored statuses of a callback-judged submission."""
+    policy = kind.policy(submission)
+    testcases = judging_order(policy, testcase_cache.get(submission.problem).testcases)
+    statuses = dict(kind.results(submission).values_list('testcase_id', 'status'))
+    return policy, testcases, statuses
+
+
+def _advance_with_callbacks(kind, submission, policy=None, testcases=None, statuses=None):
+    """Dispatch the next wave of a callback-judged submission, or finalize it."""
+    if policy is None:
+        if kind.tokens(submission).exists():
+            return  # a wave is already out (a continuation task ran twice)
+        policy, testcases, statuses = _callback_progress(kind, submission)
+
+    wave = next_wave(policy, testcases, statuses)
+    if wave:
+        _dispatch_with_callbacks(kind, submission, wave)
+    else:
+        _complete(kind, submission, policy, testcases, statuses)
+
+
+def _dispatch_with_callbacks(kind, submission, wave):
+    """
+    Send a wave of testcases to Judge0 with a callback URL per testcase.
+
+    The JudgeToken rows are created before dispatching (their id is part of
+    the callback URL), so a callback can never arrive ahead of its mapping.
+    Tokens are filled in once Judge0 has accepted the batch. If dispatching
+    fails, the mappings of testcases Judge0 did not take are removed again:
+    a retry sends them, or the next wave once the rest of this one is in.
+    """
+    JudgeToken.objects.bulk_create([
+        JudgeToken(**{kind.token_owner: submission, kind.token_testcase: testcase}) for testcase in wave
+    ])
+    mappings = list(kind.tokens(submission).order_by('id'))
+    payloads = _judge0_payloads(submission, submission.problem, testcase_cache.get(submission.problem), wave)
+    for payload, mapping in zip(payloads, mappings):
+        payload['callback_url'] = _callback_url(mapping)
+
+    try:
+        tokens = judge.dispatch_batch(payloads)
+    except Exception as error:
+        dispatched = dict(zip(mappings, getattr(error, 'dispatched', [])))
+        for mapping, token in dispatched.items():
+            mapping.token = token
+        JudgeToken.objects.bulk_update([mapping for mapping in dispatched if mapping.token], ['token'])
+        JudgeToken.objects.filter(pk__in=[mapping.pk for mapping in mappings if not mapping.token]).delete()
+        raise
+
+    accepted = []
+    for mapping, token in zip(mappings, tokens):
+        if token:
+            mapping.token = token
+            accepted.append(mapping)
+    JudgeToken.objects.bulk_update(accepted, ['token'])
+
+    for mapping, token in zip(mappings, tokens):
+        if not token:
+            apply_callback(mapping.pk, {'status': {'description': 'API Error'}})
+
+
+def callbacks_enabled():
+    return bool(settings.JUDGE0_CALLBACK_URL)
+
+
+def _callback_url(mapping):
+    return f"{settings.JUDGE0_CALLBACK_URL.rstrip('/')}/api/judge0/{mapping.callback_key}/callback/"
+
+
+def callback_mapping(callback_key, result):
+    """
+    The id of the JudgeToken a Judge0 callback is for, or None unless both
+    its callback key and the Judge0 token in ``result`` match. A callback
+    that beats the recording of its token is refused too; Judge0 retries it,
+    and ``collect_lost_callbacks`` polls for it if it never gets through.
+    """
+    mapping = JudgeToken.objects.filter(callback_key=callback_key).values_list('id', 'token').first()
+    if mapping is None or not mapping[1]:
+        return None
+    if not hmac.compare_digest(str(result.get('token') or '').encode(), mapping[1].encode()):
+        return None
+    return mapping[0]
+
+
+def apply_callback(mapping_id, result):
+    """
+    Store the Judge0 result for one JudgeToken and, once the rest of its wave
+    is in, finalize the submission or queue a JudgeTask for its next wave.
+    Returns False for unknown or already applied tokens (Judge0 may deliver
+    a callback more than once).
+    """
+    mapping = JudgeToken.objects.filter(pk=mapping_id).first()
+    if mapping is None:
+        return False
+    if mapping.token and result.get('token') and result['token'] != mapping.token:
+        return False
+    kind = CONTEST if mapping.submission_id else PRACTICE
+
+    with transaction.atomic():
+        # Deleting first makes this a write transaction from its first statement
+        # (SQLite cannot upgrade a read lock under contention) and makes a
+        # duplicate delivery of the same callback a no-op.
+        if not JudgeToken.objects.filter(pk=mapping_id).delete()[0]:
+            return False
+
+        # Lock the parent submission so exactly one callback sees the wave complete
+        if mapping.submission_id:
+            submission = Submission.objects.select_for_update().get(pk=mapping.submission_id)
+        else:
+            submission = PracticeSubmission.objects.select_for_update().get(pk=mapping.practice_submission_id)
+
+        row = kind.store(submission, getattr(mapping, f'{kind.token_testcase}_id'), result)
+        wave = None
+        if not kind.tokens(submission).exists():
+            policy, testcases, statuses = _callback_progress(kind, submission)
+            wave = next_wave(policy, testcases, statuses)
+            if wave:
+                # Judge0 is not called from here: it may be down, and a failed
+                # request would have it deliver this (applied) callback again
+                JudgeTask.objects.create(**{kind.token_owner: submission}, resume=True)
+
+    kind.publish_testcase(submission, row)
+    if wave == []:
+        _complete(kind, submission, policy, testcases, statuses)
+    return True
+
+
+def collect_lost_callbacks(older_than=None):
+    """
+    Poll Judge0 for tokens whose callback never arrived, and give up on
+    mappings that never got a token (their dispatch failed midway).
+    """
+    older_than = older_than or settings.JUDGE0_CALLBACK_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    stale = list(JudgeToken.objects.filter(created_at__lt=cutoff))
+    if not stale:
+        return 0
+
+    finished = judge.fetch_finished([m.token for m in stale if m.token])
+    collected = 0
+    for mapping in stale:
+        if mapping.token in finished:
+            collected += apply_callback(mapping.pk, finished[mapping.token])
+        elif not mapping.token:
+            collected += apply_callback(mapping.pk, {'status': {'description': 'System Error'}})
+    return collected
@@ -0,0 +1,475 @@
+"""
+Client for the Judge0 HTTP API.
+
+All judging goes through one process-wide ``Judge0Client`` (see
+``get_client``). It keeps a pooled keep-alive ``requests.Session``, applies
+connect/read timeouts to every call, retries transient failures with
+jittered exponential backoff (creating submissions only when Judge0 cannot
+have run them, so a retry never judges a testcase twice) and trips a circuit breaker when Judge0 keeps
+failing, so workers fail fast instead of hanging while Judge0 is down.
+
+``run_batch`` is the path used for judging: it creates the testcases of a
+submission through ``/submissions/batch`` and then polls all of their tokens
+together, so a submission costs O(polls) requests instead of
+O(testcases x polls). ``run_submission`` judges a single payload. Both poll
+on a ``PollSchedule``: quickly at first, then backing off up to a deadline
+derived from the problem's time limit.
+
+How many Judge0 jobs a process keeps in flight is bounded by an
+``InFlightLimiter``, both overall and per user, so one user's 100-testcase
+submissions cannot starve everybody else. ``run_batch`` keeps a sliding
+window of jobs: a testcase is created as soon as a slot frees up.
+"""
+from collections import Counter, deque
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from . import metrics
+import requests
+import base64
+import json
+import random
+import threading
+import time
+
+
+IN_PROGRESS_STATUSES = (1, 2)  # In Queue / Processing
+RESULT_FIELDS = 'token,stdout,time,memory,status,compile_output'
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+UNPROCESSED_STATUS_CODES = (429, 503)  # rejected before running anything, so safe to retry even when creating
+BASE64_FIELDS = ('stdout', 'stderr', 'compile_output', 'message')
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling Judge0 while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Judge0 circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds. After that a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self.trial_in_flight:
+                raise CircuitOpenError(max(remaining, 0.1))
+            self.trial_in_flight = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class Judge0Client:
+    def __init__(self, base_url, api_key, connect_timeout=3.05, read_timeout=10, max_retries=2,
+                 retry_backoff=0.2, pool_size=20, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'X-RapidAPI-Key': api_key,
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, idempotent=True, **kwargs):
+        """
+        Send a request with timeouts, retries and circuit breaking; return the
+        decoded JSON. A request that creates submissions (``idempotent=False``)
+        is only retried when Judge0 cannot have run it: the connection failed,
+        or it answered 429/503. After a read timeout it may have.
+        """
+        self.breaker.before_call()
+        retry_statuses = RETRY_STATUS_CODES if idempotent else UNPROCESSED_STATUS_CODES
+        succeeded = None  # stays None if anything else goes wrong, which counts as a failure
+        try:
+            for attempt in range(self.max_retries + 1):
+                can_retry = attempt < self.max_retries
+                try:
+                    response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+                    if response.status_code in retry_statuses and can_retry:
+                        self._sleep_before_retry(attempt)
+                        continue
+                    response.raise_for_status()
+                    data = response.json()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                    if can_retry and (idempotent or not isinstance(exc, requests.exceptions.ReadTimeout)):
+                        self._sleep_before_retry(attempt)
+                        continue
+                    succeeded = False
+                    raise
+                except requests.exceptions.HTTPError:
+                    succeeded = response.status_code < 500 and response.status_code not in RETRY_STATUS_CODES
+                    raise
+                succeeded = True
+                return data
+        finally:
+            # Always settles a half-open trial, or the circuit would stay open for good
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _sleep_before_retry(self, attempt):
+        # "Full jitter" backoff: spreads retries from many workers apart
+        time.sleep(random.uniform(0, self.retry_backoff * (2 ** attempt)))
+
+    def create(self, payload):
+        return self.request('POST', '/submissions', idempotent=False, data=json.dumps(payload))['token']
+
+    def get(self, token):
+        return decode_result(self.request('GET', f'/submissions/{token}', params={'base64_encoded': 'true'}))
+
+    def create_batch(self, payloads):
+        """``payloads``' source_code, stdin and expected_output must be base64 encoded."""
+        return self.request('POST', '/submissions/batch', idempotent=False, params={'base64_encoded': 'true'},
+                            data=json.dumps({'submissions': payloads}))
+
+    def get_batch(self, tokens):
+        """
+        Results come base64 encoded (Judge0 refuses to return output that is
+        not valid UTF-8 otherwise) and are decoded here.
+        """
+        data = self.request('GET', '/submissions/batch', params={
+            'tokens': ','.join(tokens), 'base64_encoded': 'true', 'fields': RESULT_FIELDS,
+        })
+        return [decode_result(result) if result else result for result in data.get('submissions', [])]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared Judge0 client, building it from settings on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Judge0Client(
+                settings.JUDGE0_API_URL,
+                settings.JUDGE0_API_KEY,
+                connect_timeout=settings.JUDGE0_CONNECT_TIMEOUT,
+                read_timeout=settings.JUDGE0_READ_TIMEOUT,
+                max_retries=settings.JUDGE0_MAX_RETRIES,
+                retry_backoff=settings.JUDGE0_RETRY_BACKOFF,
+                pool_size=settings.JUDGE0_POOL_SIZE,
+                breaker=CircuitBreaker(settings.JUDGE0_CIRCUIT_FAILURE_THRESHOLD,
+                                       settings.JUDGE0_CIRCUIT_RESET_TIMEOUT),
+            )
+        return _client
+
+
+def reset_client():
+    """Drop the shared client so the next call picks up changed settings."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
+
+
+class InFlightLimiter:
+    """
+    Counts Judge0 jobs in flight, overall and per user. A limit of 0 means
+    unlimited. Slots are taken in bulk (``acquire`` grants as many of the
+    wanted slots as are free) and must be given back with ``release``.
+    """
+
+    def __init__(self, limit=0, per_user_limit=0):
+        self.limit = limit
+        self.per_user_limit = per_user_limit
+        self.in_flight = 0
+        self.per_user = Counter()
+        self.condition = threading.Condition()
+
+    def _free(self, user):
+        free = []
+        if self.limit:
+            free.append(self.limit - self.in_flight)
+        if self.per_user_limit and user is not None:
+            free.append(self.per_user_limit - self.per_user[user])
+        return min(free) if free else float('inf')
+
+    def acquire(self, user, wanted, timeout=None):
+        """
+        Take up to ``wanted`` slots for ``user`` and return how many were
+        taken. Waits up to ``timeout`` seconds (None: forever, 0: not at all)
+        for at least one slot; returns 0 if none freed up in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                taken = int(min(self._free(user), wanted))
+                if taken > 0:
+                    self.in_flight += taken
+                    if user is not None:
+                        self.per_user[user] += taken
+                    metrics.observe('judge0.in_flight', self.in_flight)
+                    return taken
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return 0
+                metrics.increment('judge0.slot_waits')
+                self.condition.wait(remaining)
+
+    def release(self, user, count=1):
+        if count <= 0:
+            return
+        with self.condition:
+            self.in_flight -= count
+            if user is not None:
+                self.per_user[user] -= count
+                if self.per_user[user] <= 0:
+                    del self.per_user[user]
+            self.condition.notify_all()
+
+
+_limiter = None
+
+
+def get_limiter():
+    """Return the process-wide in-flight limiter, built from settings on first use."""
+    global _limiter
+    with _client_lock:
+        if _limiter is None:
+            _limiter = InFlightLimiter(settings.JUDGE0_MAX_IN_FLIGHT, settings.JUDGE0_MAX_IN_FLIGHT_PER_USER)
+        return _limiter
+
+
+def reset_limiter():
+    """Drop the shared limiter so the next call picks up changed settings."""
+    global _limiter
+    with _client_lock:
+        _limiter = None
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+class PollSchedule:
+    """
+    When to poll Judge0 for results.
+
+    The first poll comes after ``JUDGE0_POLL_INITIAL_DELAY`` (most accepted
+    solutions finish well under 100 ms), then the delay grows by
+    ``JUDGE0_POLL_BACKOFF`` per poll up to ``JUDGE0_POLL_MAX_INTERVAL``.
+    Polling stops at a deadline sized for the worst case: every testcase
+    running to the CPU time limit, stretched by the number of other
+    submissions being judged at the same time.
+    """
+
+    def __init__(self, time_limit=1.0, testcases=1, queue_depth=0):
+        self.delay = settings.JUDGE0_POLL_INITIAL_DELAY
+        self.backoff = settings.JUDGE0_POLL_BACKOFF
+        self.max_interval = settings.JUDGE0_POLL_MAX_INTERVAL
+        budget = settings.JUDGE0_POLL_GRACE + time_limit * testcases * (1 + queue_depth)
+        self.timeout = min(budget, settings.JUDGE0_POLL_MAX_DEADLINE)
+        self.started = time.monotonic()
+        self.polls = 0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def remaining(self):
+        return max(self.timeout - self.elapsed, 0)
+
+    def reset_backoff(self):
+        """Poll quickly again, e.g. after more jobs were created."""
+        self.delay = settings.JUDGE0_POLL_INITIAL_DELAY
+
+    def wait(self):
+        """Sleep until the next poll; return False once the deadline has passed."""
+        remaining = self.timeout - self.elapsed
+        if remaining <= 0:
+            return False
+        time.sleep(min(self.delay, remaining))
+        self.delay = min(self.delay * self.backoff, self.max_interval)
+        self.polls += 1
+        metrics.increment('judge0.polls')
+        return True
+
+    def finished(self, timed_out=False):
+        metrics.observe('judge0.polls_per_verdict', self.polls)
+        if timed_out:
+            metrics.increment('judge0.poll_timeouts')
+        else:
+            metrics.observe('judge0.verdict_latency', self.elapsed)
+
+
+def run_submission(data, schedule=None):
+    """Create one Judge0 submission and poll it until it finishes."""
+    client = get_client()
+    schedule = schedule or PollSchedule(data.get('cpu_time_limit') or 1.0)
+    try:
+        token = client.create(data)
+        while schedule.wait():
+            result = client.get(token)
+            if result.get('status', {}).get('id') not in IN_PROGRESS_STATUSES:
+                schedule.finished()
+                return result
+
+        schedule.finished(timed_out=True)
+        return {'status': {'description': 'System Error'}}
+    except CircuitOpenError:
+        raise
+    except requests.exceptions.RequestException:
+        return {'status': {'description': 'API Error'}}
+
+
+def dispatch_batch(payloads):
+    """
+    Create Judge0 submissions for ``payloads`` (base64 encoded) without waiting for them.
+
+    Returns one token per payload, in order; None where Judge0 rejected the
+    payload (it validates each entry of a batch separately). When a chunk
+    fails, the exception carries the tokens of the payloads before it, which
+    Judge0 is already running, as ``dispatched``.
+    """
+    client = get_client()
+    tokens = []
+    for _, chunk in _chunks(payloads, settings.JUDGE0_BATCH_SIZE):
+        try:
+            created = client.create_batch(chunk)
+        except requests.exceptions.RequestException as error:
+            error.dispatched = tokens
+            raise
+        tokens.extend(entry.get('token') for entry in created)
+    return tokens
+
+
+def run_batch(payloads, schedule=None, user=None, on_result=None):
+    """
+    Judge a list of Judge0 payloads (their source_code, stdin and
+    expected_output base64 encoded) and return their results in the same order.
+    ``on_result(index, result)`` is called as each result comes back.
+
+    Payloads are created in chunks of at most ``JUDGE0_BATCH_SIZE`` (Judge0
+    rejects larger batches), as far as the in-flight limiter has slots for
+    ``user``; the rest wait for earlier jobs to finish. Every outstanding
+    token is read back with a single ``GET /submissions/batch?tokens=...``
+    per chunk on each poll.
+
+    If creating a chunk fails, its payloads get 'API Error' while those
+    already created are still polled for.
+
+    Raises CircuitOpenError when Judge0 is known to be down, so the caller
+    can retry the whole submission later instead of recording 'API Error'.
+    """
+    client = get_client()
+    limiter = get_limiter()
+    batch_size = settings.JUDGE0_BATCH_SIZE
+    schedule = schedule or PollSchedule(testcases=len(payloads))
+    results = [None] * len(payloads)
+    waiting = deque(range(len(payloads)))  # indexes not yet sent to Judge0
+    pending = {}  # token -> index into payloads
+
+    try:
+        while waiting or pending:
+            if waiting:
+                # Block for a slot only when there is nothing else to wait for
+                slots = limiter.acquire(user, len(waiting), timeout=0 if pending else schedule.remaining)
+                if slots:
+                    indexes = [waiting.popleft() for _ in range(slots)]
+                    failure = None
+                    try:
+                        tokens = dispatch_batch([payloads[index] for index in indexes])
+                    except requests.exceptions.RequestException as error:
+                        # The chunks before the failed one are running: their tokens keep their slots
+                        failure, tokens = error, error.dispatched
+                        limiter.release(user, len(indexes) - len(tokens))
+                        for index in indexes[len(tokens):]:
+                            results[index] = {'status': {'description': 'API Error'}}
+                    for index, token in zip(indexes, tokens):
+                        if token:
+                            pending[token] = index
+                        else:
+                            limiter.release(user)
+                            results[index] = {'status': {'description': 'API Error'}}
+                    if isinstance(failure, CircuitOpenError):
+                        raise failure
+                    schedule.reset_backoff()
+                elif not pending:
+                    break
+            if not pending:
+                continue
+            if not schedule.wait():
+                break
+
+            for _, tokens in _chunks(list(pending), batch_size):
+                for result in client.get_batch(tokens):
+                    if result and result.get('status', {}).get('id') not in IN_PROGRESS_STATUSES:
+                        index = pending.pop(result['token'])
+                        results[index] = result
+                        limiter.release(user)
+                        if on_result:
+                            on_result(index, result)
+
+        schedule.finished(timed_out=bool(pending or waiting))
+        for index in list(pending.values()) + list(waiting):
+            results[index] = {'status': {'description': 'System Error'}}
+    except CircuitOpenError:
+        raise
+    except requests.exceptions.RequestException:
+        results = [result or {'status': {'description': 'API Error'}} for result in results]
+    finally:
+        limiter.release(user, len(pending))
+
+    return results
+
+
+def fetch_finished(tokens):
+    """Return ``{token: result}`` for those of ``tokens`` that Judge0 has finished judging."""
+    client = get_client()
+    finished = {}
+    for _, chunk in _chunks(list(tokens), settings.JUDGE0_BATCH_SIZE):
+        for result in client.get_batch(chunk):
+            if result and result.get('status', {}).get('id') not in IN_PROGRESS_STATUSES:
+                finished[result['token']] = result
+    return finished
+
+
+def decode_result(data):
+    """Decode the text fields of a base64 encoded Judge0 result (polled, or a callback body) in place."""
+    for field in BASE64_FIELDS:
+        if data.get(field):
+            data[field] = base64.b64decode(data[field]).decode('utf-8', errors='replace')
+    return data
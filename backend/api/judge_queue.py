@@ -0,0 +1,189 @@
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cms.models import JudgeTask
+from . import grading, judge, metrics
+
+
+# Enqueueing
+def enqueue_submission(submission, force=False):
+    """Queue a contest submission for the judge workers; ``force`` judges it even if it's a duplicate."""
+    return JudgeTask.objects.create(submission=submission, force=force)
+
+
+def enqueue_practice_submission(submission, force=False):
+    """Queue a practice submission for the judge workers; ``force`` judges it even if it's a duplicate."""
+    return JudgeTask.objects.create(practice_submission=submission, force=force)
+
+
+# Claiming
+def claim_task(worker_id, batch=10):
+    """
+    Atomically move the oldest queued task to 'running' and return it.
+
+    On backends with SKIP LOCKED (PostgreSQL) candidate rows are locked so
+    concurrent workers never look at the same rows. SQLite has no row locks,
+    so the conditional UPDATE in _mark_claimed acts as a compare-and-set:
+    only one worker can flip a given row from 'queued' to 'running'.
+    """
+    candidates = JudgeTask.objects.filter(status='queued').order_by('id').values_list('id', flat=True)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            task_ids = list(candidates.select_for_update(skip_locked=True)[:1])
+            if task_ids and _mark_claimed(task_ids[0], worker_id):
+                return _load_task(task_ids[0])
+        return None
+
+    for task_id in list(candidates[:batch]):
+        if _mark_claimed(task_id, worker_id):
+            return _load_task(task_id)
+    return None
+
+
+def _mark_claimed(task_id, worker_id):
+    return JudgeTask.objects.filter(id=task_id, status='queued').update(
+        status='running',
+        worker=worker_id,
+        claimed_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+
+
+def _load_task(task_id):
+    return JudgeTask.objects.select_related(
+        'submission__problem', 'submission__user',
+        'practice_submission__problem', 'practice_submission__user',
+    ).get(id=task_id)
+
+
+def requeue_stale_tasks(stale_after=None):
+    """
+    Give tasks held by a crashed worker back to the queue: running tasks
+    whose worker hasn't refreshed ``claimed_at`` (see ``_Heartbeat``) for
+    ``stale_after`` seconds. Tasks that already used up their
+    ``JUDGE_TASK_MAX_ATTEMPTS`` are failed instead, so a submission that
+    kills its worker every time isn't retried forever. Returns the number
+    requeued.
+    """
+    stale_after = stale_after or settings.JUDGE_TASK_STALE_AFTER
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = JudgeTask.objects.filter(status='running', claimed_at__lt=cutoff)
+    abandoned = stale.filter(attempts__gte=settings.JUDGE_TASK_MAX_ATTEMPTS).update(
+        status='failed', error=f'Worker stopped responding on all {settings.JUDGE_TASK_MAX_ATTEMPTS} attempts',
+        finished_at=timezone.now(),
+    )
+    if abandoned:
+        metrics.increment('judge.tasks_abandoned', abandoned)
+    return stale.update(status='queued', worker='')
+
+
+# Running
+class _Heartbeat:
+    """
+    Refreshes a running task's ``claimed_at`` every
+    ``JUDGE_TASK_HEARTBEAT_INTERVAL`` seconds from a side thread while it is
+    judged, however long its waves take, so ``requeue_stale_tasks`` only
+    picks up tasks whose worker is gone.
+    """
+
+    def __init__(self, task, interval=None):
+        self.task = task
+        self.interval = interval or settings.JUDGE_TASK_HEARTBEAT_INTERVAL
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._beat, name=f'judge-heartbeat-{task.id}', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _beat(self):
+        try:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    JudgeTask.objects.filter(id=self.task.id, status='running', worker=self.task.worker).update(
+                        claimed_at=timezone.now())
+                except DatabaseError:
+                    pass  # e.g. "database is locked"; the next beat tries again
+        finally:
+            connection.close()
+
+
+def run_task(task):
+    """Judge the submission behind a claimed task and record the outcome."""
+    # Other submissions being judged right now compete for the same Judge0 workers
+    queue_depth = JudgeTask.objects.filter(status='running').exclude(id=task.id).count()
+    try:
+        with _Heartbeat(task):
+            if task.resume and task.submission_id:
+                grading.continue_submission(task.submission)
+            elif task.resume:
+                grading.continue_practice_submission(task.practice_submission)
+            elif task.submission_id:
+                grading.process_submission(task.submission, queue_depth, task.force)
+            else:
+                grading.process_practice_submission(task.practice_submission, queue_depth, task.force)
+    except judge.CircuitOpenError:
+        # Judge0 is down: put the task back without spending one of its attempts
+        JudgeTask.objects.filter(id=task.id).update(status='queued', worker='', attempts=F('attempts') - 1)
+        raise
+    except Exception:
+        error = traceback.format_exc()
+        status = 'failed' if task.attempts >= settings.JUDGE_TASK_MAX_ATTEMPTS else 'queued'
+        JudgeTask.objects.filter(id=task.id).update(status=status, error=error, finished_at=timezone.now())
+        return False
+
+    JudgeTask.objects.filter(id=task.id).update(status='done', error=None, finished_at=timezone.now())
+    return True
+
+
+class JudgeWorker(threading.Thread):
+    """A judge worker thread that drains the JudgeTask queue until stopped."""
+
+    def __init__(self, index=0, poll_interval=None, stop_event=None, exit_when_idle=False):
+        super().__init__(name=f'judge-worker-{index}', daemon=True)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        self.poll_interval = poll_interval or settings.JUDGE_WORKER_POLL_INTERVAL
+        self.stop_event = stop_event or threading.Event()
+        self.exit_when_idle = exit_when_idle
+        self.processed = 0
+        self.failed = 0
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    task = claim_task(self.worker_id)
+                    if task is None:
+                        if self.exit_when_idle:
+                            break
+                        self.stop_event.wait(self.poll_interval)
+                        continue
+                    if run_task(task):
+                        self.processed += 1
+                    else:
+                        self.failed += 1
+                except judge.CircuitOpenError as exc:
+                    self.stop_event.wait(exc.retry_after)
+                except DatabaseError:
+                    # e.g. "database is locked" on SQLite; stale tasks are requeued later
+                    metrics.increment('judge.worker_db_errors')
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stop_event.set()
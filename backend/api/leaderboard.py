@@ -0,0 +1,362 @@
+"""
+Materialized contest leaderboard.
+
+Every contest verdict is folded into the user's ``LeaderboardCell`` for the
+problem and the cells are summed into their ``Leaderboard`` entry, so
+reading the standings never touches the submissions table. The entry then
+moves in the ranks: only the entries between its old and its new place
+move, by one, in a single ``UPDATE`` (see ``_rerank``).
+
+Cells are folded in submission order. A verdict for a submission made
+before the cell's first AC (judged out of order, e.g. after a rejudge), or
+a rejudge that changed a counted verdict, replays that user's submissions
+to the problem instead.
+``rebuild_contest`` replays a whole contest, e.g. for contests judged
+before the leaderboard was materialized.
+
+Every change is announced, once committed, on the contest's pub/sub topic
+(``leaderboard_topic``) for the live leaderboard streams in api.streams,
+which reload the board at most once per ``LEADERBOARD_PUSH_INTERVAL`` and
+push only the rows that changed (``diff_rows``).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from cms.models import Contest, Leaderboard, LeaderboardCell, Submission
+
+from . import pubsub
+from .serializers import FrozenLeaderboardSerializer, LeaderboardSerializer, ProblemLeaderboardSerializer
+
+
+def leaderboard_topic(contest_id):
+    return f'leaderboard:{contest_id}'
+
+
+def _announce(contest_id):
+    # Listeners reload the board, so they must not hear of a change before it is committed
+    transaction.on_commit(lambda: pubsub.publish(leaderboard_topic(contest_id), {'event': 'changed'}))
+
+
+def record_verdict(submission, rejudged=False):
+    """
+    Fold a newly judged contest submission into its contest's leaderboard;
+    ``rejudged`` replays the cell for a counted submission whose verdict changed.
+    """
+    contest = submission.contest
+    primary = ranking_field(contest)
+    with transaction.atomic():
+        entry, _ = Leaderboard.objects.get_or_create(contest_id=submission.contest_id, user_id=submission.user_id)
+        # Serializes concurrent verdicts of the same user (a no-op on SQLite, where writes are serialized anyway)
+        entry = Leaderboard.objects.select_for_update().get(pk=entry.pk)
+        ranked_as = None if entry.rank is None else (getattr(entry, primary), entry.penalty)
+        cell, _ = LeaderboardCell.objects.get_or_create(entry=entry, problem_id=submission.problem_id)
+
+        if rejudged or (cell.is_solved and submission.submitted_at < cell.first_ac_at):
+            _replay_cell(cell, contest)
+        else:
+            cell.apply(submission, contest.start_time)
+        cell.save()
+        entry.update_stats()
+        _rerank(entry, ranked_as, primary)
+        _announce(contest.pk)
+
+
+def _replay_cell(cell, contest):
+    cell.reset()
+    judged = Submission.objects.filter(
+        contest=contest, user_id=cell.entry.user_id, problem_id=cell.problem_id,
+    ).exclude(status='Pending').order_by('submitted_at', 'id')
+    for submission in judged.only('status', 'score', 'submitted_at', 'execution_time'):
+        cell.apply(submission, contest.start_time)
+
+
+# Ranking
+#
+# Contests rank by their ``ranking_field`` (problems solved under the ICPC
+# ranking rule, score otherwise), then by penalty; entries equal on both
+# share a rank and are listed by the earlier last AC, then by user id. The
+# ranks of the live leaderboard, written by ``update_ranks``, are the
+# authoritative standings; the frozen snapshot and the replay engine
+# (api.standings) order with the same ``standing_key`` and ``shared_ranks``.
+
+def ranking_field(contest):
+    """The Leaderboard field a contest ranks by before penalty."""
+    return 'problems_solved' if contest.ranking_rule == 'icpc' else 'score'
+
+
+def standing_key(primary, penalty, last_ac, user_id):
+    """Sort key of a standing, best first; ``last_ac`` is a timestamp, None while nothing is solved."""
+    return (-primary, penalty, last_ac is None, last_ac or 0, user_id)
+
+
+def standing_order(prefix=''):
+    """``order_by`` arguments listing ranked Leaderboard rows (or rows related through ``prefix``) in order."""
+    return (f'{prefix}rank', F(f'{prefix}last_ac_at').asc(nulls_last=True), f'{prefix}user_id')
+
+
+def shared_ranks(keys):
+    """Ranks of ``(primary, penalty)`` keys sorted best first: equal keys share the first one's rank."""
+    previous, rank = None, 0
+    for position, key in enumerate(keys, start=1):
+        if key != previous:
+            previous, rank = key, position
+        yield rank
+
+
+def _assign_ranks(entries, primary):
+    """Set ranks on entries sorted best first; returns the entries whose rank changed."""
+    changed = []
+    ranks = shared_ranks((getattr(entry, primary), entry.penalty) for entry in entries)
+    for entry, rank in zip(entries, ranks):
+        if entry.rank != rank:
+            entry.rank = rank
+            changed.append(entry)
+    return changed
+
+
+def _better_than(primary, key):
+    return Q(**{f'{primary}__gt': key[0]}) | Q(**{primary: key[0], 'penalty__lt': key[1]})
+
+
+def _worse_than(primary, key):
+    return Q(**{f'{primary}__lt': key[0]}) | Q(**{primary: key[0], 'penalty__gt': key[1]})
+
+
+def _rerank(entry, ranked_as, primary):
+    """
+    Move an entry whose ``(primary, penalty)`` changed from ``ranked_as``
+    (None if it had no rank yet) to its new rank. A rank is one plus the
+    number of entries strictly better, so only the entries the change passed
+    (or fell behind) move, by one place each. Returns how many moved.
+    """
+    key = (getattr(entry, primary), entry.penalty)
+    if key == ranked_as:
+        return 0
+    others = Leaderboard.objects.filter(contest_id=entry.contest_id).exclude(pk=entry.pk)
+    if ranked_as is None:
+        moved = others.filter(_worse_than(primary, key)).update(rank=F('rank') + 1)
+    elif key[0] > ranked_as[0] or (key[0] == ranked_as[0] and key[1] < ranked_as[1]):
+        moved = others.filter(_worse_than(primary, key) & ~_worse_than(primary, ranked_as)).update(rank=F('rank') + 1)
+    else:
+        moved = others.filter(_worse_than(primary, ranked_as) & ~_worse_than(primary, key)).update(rank=F('rank') - 1)
+    entry.rank = others.filter(_better_than(primary, key)).count() + 1
+    Leaderboard.objects.filter(pk=entry.pk).update(rank=entry.rank)
+    return moved
+
+
+def update_ranks(contest):
+    """Reassign all ranks in a contest; only rows whose rank changed are written."""
+    primary = ranking_field(contest)
+    entries = list(Leaderboard.objects.filter(contest=contest).order_by(
+        f'-{primary}', 'penalty', F('last_ac_at').asc(nulls_last=True), 'user_id'
+    ).only('id', primary, 'penalty', 'rank'))
+    changed = _assign_ranks(entries, primary)
+    Leaderboard.objects.bulk_update(changed, ['rank'], batch_size=500)
+    return len(changed)
+
+
+def _fold_cells(contest, until=None):
+    """Unsaved cells keyed by (user_id, problem_id), folded from the judged submissions made before ``until``."""
+    cells = {}
+    judged = Submission.objects.filter(contest=contest).exclude(status='Pending')
+    if until is not None:
+        judged = judged.filter(submitted_at__lt=until)
+    judged = judged.order_by('submitted_at', 'id').only(
+        'user_id', 'problem_id', 'status', 'score', 'submitted_at', 'execution_time')
+    for submission in judged.iterator():
+        key = (submission.user_id, submission.problem_id)
+        if key not in cells:
+            cells[key] = LeaderboardCell(problem_id=submission.problem_id)
+        cells[key].apply(submission, contest.start_time)
+    return cells
+
+
+def rebuild_contest(contest):
+    """Recompute a contest's leaderboard from scratch out of its judged submissions."""
+    cells = _fold_cells(contest)
+
+    with transaction.atomic():
+        Leaderboard.objects.filter(contest=contest).delete()
+        user_ids = sorted({user_id for user_id, _ in cells})
+        Leaderboard.objects.bulk_create([Leaderboard(contest=contest, user_id=user_id) for user_id in user_ids],
+                                        batch_size=500)
+        entries = {entry.user_id: entry for entry in Leaderboard.objects.filter(contest=contest)}
+        for (user_id, _), cell in cells.items():
+            cell.entry = entries[user_id]
+        LeaderboardCell.objects.bulk_create(cells.values(), batch_size=500)
+
+        by_entry = {}
+        for cell in cells.values():
+            by_entry.setdefault(cell.entry_id, []).append(cell)
+        for entry in entries.values():
+            entry.sum_cells(by_entry.get(entry.pk, []))
+        Leaderboard.objects.bulk_update(entries.values(), [
+            'score', 'problems_solved', 'penalty', 'total_submissions', 'accepted_submissions',
+            'total_attempts', 'total_time', 'last_ac_at',
+        ], batch_size=500)
+        update_ranks(contest)
+    _announce(contest.pk)
+    return len(entries)
+
+
+def standings(contest_id):
+    """The leaderboard rows of a contest in rank order, with their cells."""
+    return Leaderboard.objects.filter(contest_id=contest_id).select_related('user').prefetch_related('cells').order_by(
+        *standing_order()
+    )
+
+
+def board_rows(contest_id, live=True):
+    """
+    A contest's serialized standings: the live board, or (``live=False``)
+    what non-staff users see, i.e. the frozen snapshot while it is frozen.
+    """
+    if not live:
+        frozen = frozen_standings(contest_id=contest_id)
+        if frozen is not None:
+            return frozen['rows']
+    return LeaderboardSerializer(standings(contest_id), many=True).data
+
+
+def diff_rows(old, new):
+    """
+    What changed between two serialized boards, or None if nothing did:
+    ``rows`` that are new or whose results changed (whole), ``ranks`` of
+    the rows that only moved (``[username, rank]``) and the usernames
+    ``removed`` from the board.
+    """
+    before = {row['username']: row for row in old}
+    rows, ranks = [], []
+    for row in new:
+        previous = before.get(row['username'])
+        if previous is None or any(previous.get(key) != value for key, value in row.items() if key != 'rank'):
+            rows.append(row)
+        elif previous['rank'] != row['rank']:
+            ranks.append([row['username'], row['rank']])
+    removed = sorted(before.keys() - {row['username'] for row in new})
+    if not (rows or ranks or removed):
+        return None
+    return {'rows': rows, 'ranks': ranks, 'removed': removed}
+
+
+def problem_standings(problem_id):
+    """Per-user cells of one problem, best first."""
+    return LeaderboardCell.objects.filter(problem_id=problem_id).select_related('entry__user').order_by(
+        '-best_score', 'penalty', 'first_ac_at', 'id'
+    )
+
+
+# Scoreboard freeze
+#
+# From ``Contest.freeze_time`` until the contest is unfrozen, non-staff
+# users get the standings as of the freeze. They are computed in memory from
+# the submissions made before it, serialized and cached for
+# ``LEADERBOARD_SNAPSHOT_TIMEOUT``, so a frozen request reads the contest's
+# freeze state and then the cache. The cache key names the freeze time, start
+# time and ranking rule the snapshot was built with: the cache may be per
+# process, and re-checking the contest on every read is what makes an
+# unfreeze or an edit visible to all of them at once. Staff keep reading the
+# live leaderboard, which the judge goes on updating. ``unfreeze`` reveals
+# the results submitted during the freeze in submission order.
+
+def _snapshot_key(kind, object_id, contest):
+    version = f'{contest.freeze_time.timestamp()}:{contest.start_time.timestamp()}:{contest.ranking_rule}'
+    return f'leaderboard:frozen:{kind}:{object_id}:{version}'
+
+
+def frozen_standings(contest_id=None, problem_id=None):
+    """
+    The frozen snapshot of a contest's (or one of its problems') standings,
+    ``{'freeze_time': ..., 'rows': [...]}``, or None if it is not frozen.
+    """
+    contests = Contest.objects.filter(problems__pk=problem_id) if problem_id else Contest.objects.filter(pk=contest_id)
+    contest = contests.first()
+    if contest is None or not contest.is_frozen():
+        return None
+    kind, object_id = ('problem', int(problem_id)) if problem_id else ('contest', int(contest_id))
+    key = _snapshot_key(kind, object_id, contest)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    snapshots = _build_snapshots(contest)
+    # add, not set: if two requests race to build the snapshot, the first one stays
+    for snapshot_key, value in snapshots.items():
+        cache.add(snapshot_key, value, timeout=settings.LEADERBOARD_SNAPSHOT_TIMEOUT)
+    return cache.get(key, snapshots[key])
+
+
+def _build_snapshots(contest):
+    cells = _fold_cells(contest, until=contest.freeze_time)
+    users = User.objects.in_bulk({user_id for user_id, _ in cells})
+    entries, cells_by_user = {}, {}
+    for (user_id, problem_id), cell in cells.items():
+        if user_id not in entries:
+            entries[user_id] = Leaderboard(contest=contest, user=users[user_id])
+        cell.entry = entries[user_id]
+        cells_by_user.setdefault(user_id, []).append(cell)
+    for user_id, entry in entries.items():
+        entry.sum_cells(cells_by_user[user_id])
+
+    primary = ranking_field(contest)
+    ranked = sorted(entries.values(), key=lambda entry: standing_key(
+        getattr(entry, primary), entry.penalty, entry.last_ac_at and entry.last_ac_at.timestamp(), entry.user_id))
+    _assign_ranks(ranked, primary)
+
+    freeze_time = contest.freeze_time.isoformat()
+    snapshots = {_snapshot_key('contest', contest.pk, contest): {
+        'freeze_time': freeze_time,
+        'rows': FrozenLeaderboardSerializer(ranked, many=True, context={'cells': cells_by_user}).data,
+    }}
+    for problem_id in contest.problems.values_list('pk', flat=True):
+        problem_cells = sorted(
+            (cell for (_, cell_problem), cell in cells.items() if cell_problem == problem_id),
+            key=lambda cell: (-cell.best_score, cell.penalty, cell.first_ac_at or contest.end_time, cell.entry.user_id),
+        )
+        snapshots[_snapshot_key('problem', problem_id, contest)] = {
+            'freeze_time': freeze_time,
+            'rows': ProblemLeaderboardSerializer(problem_cells, many=True).data,
+        }
+    return snapshots
+
+
+def unfreeze(contest):
+    """
+    Reveal a frozen contest: replay the verdicts of submissions made during
+    the freeze onto the frozen standings in submission order, rebuild the
+    live leaderboard and publish it. Returns the reveals, one per verdict
+    that changed a user's result, in order.
+    """
+    cells = _fold_cells(contest, until=contest.freeze_time)
+    totals = {}
+    for (user_id, _), cell in cells.items():
+        solved, score = totals.get(user_id, (0, 0))
+        totals[user_id] = (solved + cell.is_solved, score + cell.best_score)
+
+    reveals = []
+    pending = Submission.objects.filter(contest=contest, submitted_at__gte=contest.freeze_time).exclude(
+        status='Pending').select_related('user').order_by('submitted_at', 'id')
+    for submission in pending:
+        key = (submission.user_id, submission.problem_id)
+        cell = cells.setdefault(key, LeaderboardCell(problem_id=submission.problem_id))
+        was_solved, best_score = cell.is_solved, cell.best_score
+        cell.apply(submission, contest.start_time)
+        if (cell.is_solved, cell.best_score) == (was_solved, best_score):
+            continue
+        solved, score = totals.get(submission.user_id, (0, 0))
+        solved += cell.is_solved - was_solved
+        score += cell.best_score - best_score
+        totals[submission.user_id] = (solved, score)
+        reveals.append({
+            'submission': submission.pk, 'username': submission.user.username, 'problem': submission.problem_id,
+            'status': submission.status, 'problems_solved': solved, 'total_score': score,
+        })
+
+    contest.unfrozen_at = timezone.now()
+    contest.save(update_fields=['unfrozen_at'])
+    rebuild_contest(contest)  # also tells the live streams to publish the revealed board
+    return reveals
@@ -0,0 +1,137 @@
+import base64
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from api import judge, metrics
+from api.benchmarks import bench_contest
+from api.judge_queue import JudgeWorker, enqueue_submission
+from cms.models import ContestParticipation, JudgeTask, Submission, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Judge submissions while other threads keep submitting and registering, and count "
+        "'database is locked' errors (SQLite only)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--clients', type=int, default=8, help='Threads submitting and registering')
+        parser.add_argument('--requests', type=int, default=25, help='Submissions and registrations per client')
+        parser.add_argument('--testcases', type=int, default=5)
+        parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Judge0 seconds per wave')
+        parser.add_argument('--modes', default='DEFERRED,IMMEDIATE',
+                            help="Comma separated SQLite transaction modes; DEFERRED also uses Django's "
+                                 "default lock timeout, i.e. the settings before judging was reworked")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write("Only SQLite has database-wide write locks; nothing to measure.")
+            return
+        latency = options['latency']
+
+        def stub_judge0(payloads, schedule=None, user=None, on_result=None):
+            time.sleep(latency)
+            results = [{'status': {'id': 3, 'description': 'Accepted'}, 'time': '0.01', 'memory': 1024,
+                        'stdout': base64.b64decode(data['expected_output']).decode()} for data in payloads]
+            for index, result in enumerate(results):
+                if on_result:
+                    on_result(index, result)
+            return results
+
+        db_settings = connections.settings['default']
+        real_options = dict(db_settings.get('OPTIONS', {}))
+        real_run_batch = judge.run_batch
+        judge.run_batch = stub_judge0
+        try:
+            with bench_contest(users=options['clients'], testcases=options['testcases']) as fixture:
+                for mode in options['modes'].split(','):
+                    mode = mode.strip().upper()
+                    # Threads open their own connections, which read these options
+                    if mode == 'DEFERRED':
+                        db_settings['OPTIONS'] = {key: value for key, value in real_options.items()
+                                                  if key not in ('transaction_mode', 'timeout')}
+                    else:
+                        db_settings['OPTIONS'] = dict(real_options, transaction_mode=mode)
+                    self._run(fixture, mode, options)
+        finally:
+            db_settings['OPTIONS'] = real_options
+            judge.run_batch = real_run_batch
+
+    def _run(self, fixture, mode, options):
+        metrics.reset()
+        contest, problem = fixture['contest'], fixture['problems'][0]
+        stop_event = threading.Event()
+        workers = [JudgeWorker(index=i, poll_interval=0.02, stop_event=stop_event)
+                   for i in range(options['workers'])]
+        lock_errors, latencies, lock = [0], [], threading.Lock()
+        submitted = []
+
+        def client(user):
+            try:
+                for _ in range(options['requests']):
+                    for action in (self._submit, self._register):
+                        started = time.perf_counter()
+                        try:
+                            result = action(user, contest, problem)
+                        except OperationalError:
+                            with lock:
+                                lock_errors[0] += 1
+                            continue
+                        with lock:
+                            latencies.append(time.perf_counter() - started)
+                            if isinstance(result, Submission):
+                                submitted.append(result.id)
+            finally:
+                connection.close()
+
+        clients = [threading.Thread(target=client, args=(user,)) for user in fixture['users']]
+        started = time.perf_counter()
+        for thread in workers + clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        # Let the workers drain the queue, then stop them
+        deadline = time.monotonic() + 120
+        while (JudgeTask.objects.filter(submission_id__in=submitted, status__in=('queued', 'running')).exists()
+               and time.monotonic() < deadline):
+            time.sleep(0.1)
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        tasks = JudgeTask.objects.filter(submission_id__in=submitted)
+        judged = tasks.filter(status='done').count()
+        locked_tasks = tasks.filter(error__contains='database is locked').count()
+        worker_errors = metrics.snapshot()['counters'].get('judge.worker_db_errors', 0)
+        self.stdout.write(
+            f"mode={mode:<10} submitted={len(submitted):<4} judged={judged:<4} "
+            f"client_lock_errors={lock_errors[0]:<4} task_lock_errors={locked_tasks:<4} "
+            f"worker_db_errors={worker_errors:<4} "
+            f"write_p50={metrics.percentile(latencies, 50) * 1000:6.1f}ms "
+            f"write_p99={metrics.percentile(latencies, 99) * 1000:6.1f}ms elapsed={elapsed:6.2f}s"
+        )
+
+        Submission.objects.filter(id__in=submitted).delete()
+        User.objects.filter(username__startswith=f'{contest.slug}-reg-').delete()
+
+    def _submit(self, user, contest, problem):
+        """What the submit endpoint writes."""
+        submission = Submission.objects.create(user=user, problem=problem, contest=contest,
+                                               code='print(input())', language=71)
+        enqueue_submission(submission)
+        return submission
+
+    def _register(self, user, contest, problem):
+        """What signing up and joining a contest write."""
+        new_user = User.objects.create(username=f'{contest.slug}-reg-{uuid.uuid4().hex[:12]}')
+        UserProfile.objects.create(user=new_user)
+        ContestParticipation.objects.get_or_create(user=new_user, contest=contest)
+        return new_user
@@ -0,0 +1,147 @@
+import asyncio
+import resource
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+
+from api.benchmarks import bench_contest, create_submission_history
+from cms.models import Leaderboard, LeaderboardCell, Submission, SubmissionTestcase, Testcase
+
+
+def _rss():
+    """Resident set size of this process, in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:  # not Linux: the peak so far is the best there is
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _PeakRSS:
+    """Samples the RSS on a thread while the block runs; ``growth`` is the peak over the starting RSS."""
+
+    def __enter__(self):
+        self.start = self.peak = _rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._done.wait(0.01):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+        self.growth = self.peak - self.start
+
+
+class Command(BaseCommand):
+    help = ("Export a large synthetic contest through the streaming export endpoint and check the process "
+            "memory stays flat; compare with building the same CSV in memory")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Submissions in the contest')
+        parser.add_argument('--verdicts', type=int, default=200000, help='Testcase results in the contest')
+        parser.add_argument('--max-rss-growth', type=int, default=64, help='MiB an export may grow the RSS by')
+        parser.add_argument('--asgi', action='store_true', help='Go through the ASGI handler (async iteration)')
+
+    def handle(self, *args, **options):
+        with bench_contest(users=200, problems=10, testcases=10) as fixture:
+            contest = fixture['contest']
+            started = time.perf_counter()
+            create_submission_history(fixture, options['rows'])
+            self._create_verdicts(fixture, options['verdicts'])
+            self._create_standings(fixture)
+            self.stdout.write(f"created {options['rows']} submissions and {options['verdicts']} verdicts "
+                              f"in {time.perf_counter() - started:.1f}s\n")
+            owner = contest.created_by
+            owner.is_staff = True
+            owner.save(update_fields=['is_staff'])
+
+            limit = options['max_rss_growth'] * 2 ** 20
+            failed = []
+            self.stdout.write(f"{'export':<36} {'lines':>9} {'bytes':>12} {'time':>8} {'RSS growth':>11}")
+            for dataset, query in (('submissions', ''), ('submissions', '?gzip=1'), ('submissions', '?format=jsonl'),
+                                   ('verdicts', '?gzip=1'), ('standings', '')):
+                label = f'{dataset}{query}'
+                with _PeakRSS() as rss:
+                    started = time.perf_counter()
+                    lines, size = self._export(owner, f'/contest/export/{contest.pk}/{dataset}/{query}',
+                                               'gzip' in query, options['asgi'])
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(f"{label:<36} {lines:>9} {size:>12} {elapsed:>7.1f}s {rss.growth / 2 ** 20:>7.1f} MiB")
+                if rss.growth > limit:
+                    failed.append(label)
+
+            with _PeakRSS() as rss:
+                started = time.perf_counter()
+                rows = list(Submission.objects.filter(contest=contest).values_list())
+                body = '\n'.join(','.join(map(str, row)) for row in rows).encode()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"{'submissions, built in memory':<36} {len(rows):>9} {len(body):>12} "
+                              f"{elapsed:>7.1f}s {rss.growth / 2 ** 20:>7.1f} MiB")
+            del rows, body
+
+        if failed:
+            raise CommandError(f"RSS grew by more than {options['max_rss_growth']} MiB: {', '.join(failed)}")
+
+    def _create_verdicts(self, fixture, count):
+        """``count`` testcase results, ten for each of the first submissions."""
+        testcases = list(Testcase.objects.filter(problem__contest=fixture['contest']).values_list('id', flat=True))[:10]
+        ids = Submission.objects.filter(contest=fixture['contest']).order_by('id').values_list('id', flat=True)
+        for offset in range(0, count // len(testcases), 1000):
+            SubmissionTestcase.objects.bulk_create([
+                SubmissionTestcase(submission_id=submission_id, testcase_id=testcase_id, status='Accepted',
+                                   execution_time=0.01, memory_used=1.0)
+                for submission_id in ids[offset:offset + 1000] for testcase_id in testcases
+            ])
+
+    def _create_standings(self, fixture):
+        entries = Leaderboard.objects.bulk_create([
+            Leaderboard(contest=fixture['contest'], user=user, rank=rank, score=1000 - rank)
+            for rank, user in enumerate(fixture['users'], 1)
+        ])
+        LeaderboardCell.objects.bulk_create([
+            LeaderboardCell(entry=entry, problem=problem, submissions=3, attempts=2, first_ac_at=timezone.now())
+            for entry in entries for problem in fixture['problems']
+        ])
+
+    def _export(self, user, path, gzipped, asgi):
+        """Stream an export, counting its lines as they arrive; returns ``(lines, bytes)``."""
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if gzipped else None
+        lines = size = 0
+
+        def consume(chunk):
+            nonlocal lines, size
+            size += len(chunk)
+            lines += (decompressor.decompress(chunk) if decompressor else chunk).count(b'\n')
+
+        if asgi:
+            @override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])  # AsyncClient's fixed Host
+            async def run():
+                client = AsyncClient()
+                await client.aforce_login(user)
+                response = await client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(f'{path} returned {response.status_code}')
+                async for chunk in response.streaming_content:
+                    consume(chunk)
+            asyncio.run(run())
+        else:
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}')
+            for chunk in response.streaming_content:
+                consume(chunk)
+            response.close()
+        return lines, size
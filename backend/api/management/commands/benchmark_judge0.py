@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import judge, metrics
+from api.fake_judge0 import FakeJudge0
+
+
+class Command(BaseCommand):
+    help = "Compare Judge0 request counts and wall time per submission against a local fake Judge0"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--testcases', default='1,10,30', help='Comma separated testcase counts')
+        parser.add_argument('--delay', type=float, default=0.05, help='Fake Judge0 run time per submission')
+
+    def handle(self, *args, **options):
+        real_url = settings.JUDGE0_API_URL
+        with FakeJudge0(delay=options['delay']) as fake:
+            settings.JUDGE0_API_URL = fake.url
+            judge.reset_client()
+            try:
+                for count in [int(c) for c in options['testcases'].split(',')]:
+                    payloads = [
+                        {'source_code': 'cat', 'language_id': 71, 'stdin': str(i), 'expected_output': str(i)}
+                        for i in range(count)
+                    ]
+                    self._run(fake, 'single', count, lambda: [judge.run_submission(p) for p in payloads])
+                    encoded = [fake.encode(p) for p in payloads]  # the batch endpoint is used base64 encoded
+                    self._run(fake, 'batch', count, lambda: judge.run_batch(encoded))
+            finally:
+                settings.JUDGE0_API_URL = real_url
+                judge.reset_client()
+
+    def _run(self, fake, mode, count, judge_all):
+        fake.reset_counts()
+        metrics.reset()
+        started = time.perf_counter()
+        results = judge_all()
+        elapsed = time.perf_counter() - started
+        accepted = sum(1 for r in results if r.get('status', {}).get('description') == 'Accepted')
+        self.stdout.write(
+            f"{mode:<7} testcases={count:<4} accepted={accepted:<4} "
+            f"requests={sum(fake.request_counts.values()):<5} wall={elapsed:7.3f}s "
+            f"p50_verdict={metrics.snapshot()['samples'].get('judge0.verdict_latency', {}).get('p50', 0):.3f}s"
+        )
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import judge, metrics
+from api.benchmarks import bench_contest, create_submissions
+from api.fake_judge0 import FakeJudge0
+from api.judge_queue import JudgeWorker, enqueue_submission
+from cms.models import JudgeTask, SubmissionTestcase
+
+
+class Command(BaseCommand):
+    help = "Measure p50/p99 verdict latency of the judge workers against a local fake Judge0"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=40)
+        parser.add_argument('--testcases', type=int, default=20)
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--delay', type=float, default=0.1, help='Fake Judge0 run time per testcase')
+        parser.add_argument('--limits', default='0:0,100:20,40:5',
+                            help='Comma separated max_in_flight:per_user pairs to compare (0 = no limit)')
+
+    def handle(self, *args, **options):
+        real = (settings.JUDGE0_API_URL, settings.JUDGE0_MAX_IN_FLIGHT, settings.JUDGE0_MAX_IN_FLIGHT_PER_USER)
+        with FakeJudge0(delay=options['delay']) as fake:
+            settings.JUDGE0_API_URL = fake.url
+            judge.reset_client()
+            try:
+                with bench_contest(users=options['users'], testcases=options['testcases']) as fixture:
+                    submissions = create_submissions(fixture, options['submissions'])
+                    for pair in options['limits'].split(','):
+                        limit, per_user = (int(value) for value in pair.split(':'))
+                        settings.JUDGE0_MAX_IN_FLIGHT = limit
+                        settings.JUDGE0_MAX_IN_FLIGHT_PER_USER = per_user
+                        judge.reset_limiter()
+                        self._run(fake, submissions, options['workers'], limit, per_user)
+            finally:
+                settings.JUDGE0_API_URL, settings.JUDGE0_MAX_IN_FLIGHT, settings.JUDGE0_MAX_IN_FLIGHT_PER_USER = real
+                judge.reset_client()
+                judge.reset_limiter()
+
+    def _run(self, fake, submissions, worker_count, limit, per_user):
+        SubmissionTestcase.objects.filter(submission__in=submissions).delete()
+        JudgeTask.objects.filter(submission__in=submissions).delete()
+        fake.reset_counts()
+        metrics.reset()
+        for submission in submissions:
+            enqueue_submission(submission)
+
+        stop_event = threading.Event()
+        workers = [JudgeWorker(index=i, poll_interval=0.05, stop_event=stop_event, exit_when_idle=True)
+                   for i in range(worker_count)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        # Verdict latency as a user sees it: from enqueueing to the verdict being stored
+        latencies = [
+            (finished - created).total_seconds()
+            for created, finished in JudgeTask.objects.filter(submission__in=submissions, status='done')
+            .values_list('created_at', 'finished_at')
+        ]
+        in_flight = metrics.snapshot()['samples'].get('judge0.in_flight', {})
+        self.stdout.write(
+            f"limit={limit or '-':<4} per_user={per_user or '-':<4} judged={len(latencies):<4} "
+            f"p50={metrics.percentile(latencies, 50):6.2f}s p99={metrics.percentile(latencies, 99):6.2f}s "
+            f"max_in_flight={in_flight.get('max', 0):<4} requests={sum(fake.request_counts.values()):<5} "
+            f"elapsed={elapsed:6.2f}s"
+        )
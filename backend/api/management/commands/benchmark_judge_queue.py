@@ -0,0 +1,65 @@
+import base64
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import judge
+from api.benchmarks import bench_contest, create_submissions
+from api.judge_queue import JudgeWorker, enqueue_submission
+from cms.models import JudgeTask, SubmissionTestcase
+
+
+class Command(BaseCommand):
+    help = "Measure judge queue throughput against a stubbed Judge0 with a fixed latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=100)
+        parser.add_argument('--testcases', type=int, default=5)
+        parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Judge0 seconds per testcase')
+        parser.add_argument('--workers', default='1,2,4,8', help='Comma separated worker counts to compare')
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+
+        def stub_judge0(payloads, schedule=None, user=None, on_result=None):
+            time.sleep(latency * len(payloads))
+            results = [{'status': {'id': 3, 'description': 'Accepted'}, 'time': '0.01', 'memory': 1024,
+                        'stdout': base64.b64decode(data['expected_output']).decode()} for data in payloads]
+            for index, result in enumerate(results):
+                if on_result:
+                    on_result(index, result)
+            return results
+
+        real_run_batch = judge.run_batch
+        judge.run_batch = stub_judge0
+        try:
+            with bench_contest(users=10, problems=1, testcases=options['testcases']) as fixture:
+                submissions = create_submissions(fixture, options['submissions'])
+                for count in [int(c) for c in options['workers'].split(',')]:
+                    self._run(submissions, count)
+        finally:
+            judge.run_batch = real_run_batch
+
+    def _run(self, submissions, worker_count):
+        SubmissionTestcase.objects.filter(submission__in=submissions).delete()
+        JudgeTask.objects.filter(submission__in=submissions).delete()
+        for submission in submissions:
+            enqueue_submission(submission)
+
+        stop_event = threading.Event()
+        workers = [JudgeWorker(index=i, poll_interval=0.05, stop_event=stop_event, exit_when_idle=True)
+                   for i in range(worker_count)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        judged = sum(w.processed for w in workers)
+        failed = sum(w.failed for w in workers)
+        self.stdout.write(
+            f"workers={worker_count:<3} judged={judged:<5} failed={failed:<4} "
+            f"elapsed={elapsed:7.2f}s throughput={judged / elapsed:7.2f} submissions/s"
+        )
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import timedelta
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import leaderboard
+from api.benchmarks import bench_contest, create_judged_submissions
+from api.views import SubmissionViewSet
+from cms.models import Submission
+
+
+class Command(BaseCommand):
+    help = "Compare recomputing the contest leaderboard per request with reading the materialized one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--problems', type=int, default=8)
+        parser.add_argument('--submissions', type=int, default=5000)
+        parser.add_argument('--verdicts', type=int, default=200, help='Incremental verdicts to time')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with bench_contest(users=options['users'], problems=options['problems']) as fixture:
+            contest = fixture['contest']
+            create_judged_submissions(fixture, options['submissions'])
+            viewer = fixture['users'][0]
+
+            self._time('recompute per request (old)', options['repeat'], lambda: self._legacy_leaderboard(contest))
+            self._time('rebuild_contest (one-off)', 1, lambda: leaderboard.rebuild_contest(contest))
+            self._time('read full board', options['repeat'], lambda: self._get(viewer, {'contest': contest.pk}))
+            self._time('read one page (50)', options['repeat'],
+                       lambda: self._get(viewer, {'contest': contest.pk, 'page': 3, 'page_size': 50}))
+
+            # Verdicts arriving one at a time, after everything already on the board
+            new = create_judged_submissions(fixture, options['verdicts'], seed=1)
+            for submission in new:
+                submission.submitted_at += timedelta(hours=3)
+            Submission.objects.bulk_update(new, ['submitted_at'])
+            verdicts = iter(new)
+            self._time('record_verdict (per verdict)', len(new), lambda: leaderboard.record_verdict(next(verdicts)))
+
+            board = leaderboard.standings(contest.pk)
+            expected = self._legacy_ranking(contest)
+            actual = [(entry.user_id, entry.score) for entry in board]
+            self.stdout.write(f"entries={len(actual)} top score matches old scoring: "
+                              f"{expected[:1] and actual[:1] and expected[0][1] == actual[0][1]}")
+
+    def _get(self, user, params):
+        request = APIRequestFactory().get('/api/submission/leaderboard/', params, HTTP_HOST='localhost')
+        force_authenticate(request, user=User.objects.get(pk=user.pk))
+        response = SubmissionViewSet.as_view({'get': 'leaderboard'})(request)
+        response.render()
+        return response
+
+    def _time(self, label, repeat, run):
+        elapsed, queries = 0.0, 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                run()
+                elapsed += time.perf_counter() - started
+            queries += len(captured)
+        self.stdout.write(f"{label:<32} {elapsed / repeat * 1000:9.2f} ms {queries / repeat:8.1f} queries")
+
+    def _legacy_leaderboard(self, contest):
+        """The per-request fold the leaderboard endpoint used to do."""
+        leaderboard_data = defaultdict(lambda: {
+            "username": "", "total_score": 0, "total_submissions": 0, "accepted_submissions": 0,
+            "wrong_submissions": 0, "problems_solved": 0, "total_time": 0.0, "attempts_per_problem": {},
+        })
+        submissions = Submission.objects.select_related("user", "problem").filter(problem__contest_id=contest.pk)
+        for sub in submissions.order_by('submitted_at'):
+            data = leaderboard_data[sub.user.username]
+            data["username"] = sub.user.username
+            data["total_score"] += sub.score
+            data["total_submissions"] += 1
+            if sub.status == "Accepted":
+                data["accepted_submissions"] += 1
+                if sub.problem_id not in data["attempts_per_problem"]:
+                    data["problems_solved"] += 1
+                    data["total_time"] += sub.execution_time or 0
+            else:
+                data["wrong_submissions"] += 1
+            problem = data["attempts_per_problem"].setdefault(sub.problem_id, {"attempts": 0, "solved": False})
+            if not problem["solved"]:
+                problem["attempts"] += 1
+                problem["solved"] = sub.status == "Accepted"
+        board = list(leaderboard_data.values())
+        board.sort(key=lambda x: (-x["total_score"], -x["accepted_submissions"], x["total_time"]))
+        return board
+
+    def _legacy_ranking(self, contest):
+        """Best score per problem, summed: what the materialized board ranks by."""
+        best = defaultdict(int)
+        for user_id, problem_id, score in Submission.objects.filter(contest=contest).exclude(
+                status='Pending').values_list('user_id', 'problem_id', 'score'):
+            best[user_id, problem_id] = max(best[user_id, problem_id], score)
+        totals = defaultdict(int)
+        for (user_id, _), score in best.items():
+            totals[user_id] += score
+        return sorted(totals.items(), key=lambda item: -item[1])
@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api import leaderboard
+from api.benchmarks import bench_contest, create_judged_submissions
+from cms.models import Submission
+
+
+class Command(BaseCommand):
+    help = "Compare pushing the whole leaderboard on every change with pushing coalesced diffs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--problems', type=int, default=8)
+        parser.add_argument('--submissions', type=int, default=3000, help='Judged before the pushes start')
+        parser.add_argument('--windows', type=int, default=20, help='Push intervals to simulate')
+        parser.add_argument('--verdicts', type=int, default=10, help='Verdicts per push interval')
+
+    def handle(self, *args, **options):
+        with bench_contest(users=options['users'], problems=options['problems']) as fixture:
+            contest = fixture['contest']
+            create_judged_submissions(fixture, options['submissions'])
+            leaderboard.rebuild_contest(contest)
+            rows = leaderboard.board_rows(contest.pk)
+
+            full_bytes = diff_bytes = diff_rows = pushes = queries = 0
+            elapsed = 0.0
+            for window in range(options['windows']):
+                new = create_judged_submissions(fixture, options['verdicts'], seed=window + 1)
+                for submission in new:
+                    submission.submitted_at = timezone.now()
+                Submission.objects.bulk_update(new, ['submitted_at'])
+                for submission in new:
+                    leaderboard.record_verdict(submission)
+                    # Without coalescing, every verdict pushes the whole board
+                    full_bytes += self._size(leaderboard.board_rows(contest.pk))
+
+                # With it, one reload and one diff per interval, whatever the number of viewers
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    board = leaderboard.board_rows(contest.pk)
+                    diff = leaderboard.diff_rows(rows, board)
+                    elapsed += time.perf_counter() - started
+                queries += len(captured)
+                rows = board
+                if diff is not None:
+                    pushes += 1
+                    diff_bytes += self._size(diff)
+                    diff_rows += len(diff['rows']) + len(diff['ranks']) + len(diff['removed'])
+
+            windows, verdicts = options['windows'], options['windows'] * options['verdicts']
+            self.stdout.write(f"board: {len(rows)} rows, {self._size(rows)} bytes")
+            self.stdout.write(f"full board per verdict  {verdicts:5d} pushes {full_bytes / 1024:10.1f} KiB per viewer")
+            self.stdout.write(f"diff per interval       {pushes:5d} pushes {diff_bytes / 1024:10.1f} KiB per viewer, "
+                              f"{diff_rows / max(pushes, 1):.1f} rows per diff")
+            self.stdout.write(f"reload + diff per interval: {elapsed / windows * 1000:.2f} ms, "
+                              f"{queries / windows:.1f} queries (shared by all viewers)")
+
+    def _size(self, data):
+        return len(json.dumps(data, cls=DjangoJSONEncoder))
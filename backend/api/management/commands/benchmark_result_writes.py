@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api import grading
+from api.benchmarks import bench_contest, create_submissions
+from cms.models import SubmissionTestcase
+
+
+class Command(BaseCommand):
+    help = "Measure the time and queries spent storing one submission's testcase results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--testcases', default='10,100,1000', help='Comma separated testcase counts')
+        parser.add_argument('--repeat', type=int, default=5, help='Submissions written per measurement')
+
+    def handle(self, *args, **options):
+        for count in [int(c) for c in options['testcases'].split(',')]:
+            with bench_contest(users=1, testcases=count) as fixture:
+                submissions = create_submissions(fixture, options['repeat'] * 2)
+                testcases = list(fixture['problems'][0].testcases.order_by('id'))
+                results = [{'status': {'id': 3, 'description': 'Accepted'}, 'time': '0.01', 'memory': 1024,
+                            'stdout': testcase.output} for testcase in testcases]
+                self._measure('per-row', count, submissions[:options['repeat']],
+                              lambda s: self._write_per_row(s, testcases, results))
+                self._measure('bulk', count, submissions[options['repeat']:],
+                              lambda s: self._write_bulk(s, testcases, results))
+
+    def _measure(self, mode, count, submissions, write):
+        elapsed, queries = 0.0, 0
+        for submission in submissions:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                write(submission)
+                elapsed += time.perf_counter() - started
+            queries += len(captured)
+        self.stdout.write(
+            f"{mode:<8} testcases={count:<5} "
+            f"ms/submission={elapsed / len(submissions) * 1000:8.2f} "
+            f"queries/submission={queries / len(submissions):7.1f}"
+        )
+
+    def _write_bulk(self, submission, testcases, results):
+        """The result writer of api.grading for a polled submission."""
+        rows = {t.id: grading.CONTEST.build(submission, t, r) for t, r in zip(testcases, results)}
+        statuses = {testcase_id: row.status for testcase_id, row in rows.items()}
+        grading._complete(grading.CONTEST, submission, grading.IOI, testcases, statuses, rows)
+
+    def _write_per_row(self, submission, testcases, results):
+        """How results were written before: one INSERT per testcase, then a full save()."""
+        with transaction.atomic():
+            for testcase, result in zip(testcases, results):
+                SubmissionTestcase.objects.create(
+                    submission=submission, testcase=testcase, **grading._contest_result_fields(result)
+                )
+            submission.status = 'Accepted'
+            submission.testcases_passed = len(testcases)
+            submission.save()
+            submission.user.profile.update_stats()  # the full recount it used to trigger
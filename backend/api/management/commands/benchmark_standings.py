@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import bench_contest, create_judged_submissions
+from api.standings import replay
+
+
+class Command(BaseCommand):
+    help = "Time an offline ICPC standings replay of a large finished contest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--problems', type=int, default=12)
+        parser.add_argument('--submissions', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with bench_contest(users=options['users'], problems=options['problems']) as fixture:
+            setup = time.perf_counter()
+            create_judged_submissions(fixture, options['submissions'])
+            self.stdout.write(f"created {options['submissions']} submissions in {time.perf_counter() - setup:.1f} s")
+
+            contest = fixture['contest']
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                ranking = replay(contest).ranking()
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f"replay: best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms "
+                              f"({len(ranking)} users, leader solved {ranking[0].solved} "
+                              f"with {ranking[0].penalty} min)")
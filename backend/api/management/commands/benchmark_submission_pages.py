@@ -0,0 +1,100 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarks import bench_contest, create_submission_history
+from api.pagination import encode_cursor, keyset_page
+from api.serializers import SubmissionListSerializer
+from api.views import SubmissionViewSet
+from cms.models import Submission
+from cms.views import all_submission
+
+
+class Command(BaseCommand):
+    help = ("Page through a large synthetic submissions table with OFFSET and with keyset cursors, "
+            "and compare both with loading every row as the submission lists used to")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3, help='Runs of each paged case; the best is reported')
+        parser.add_argument('--legacy-rows', type=int, default=100000,
+                            help='Rows the old every-row cms list loads (it holds them all in memory at once)')
+
+    def handle(self, *args, **options):
+        rows, page_size = options['rows'], options['page_size']
+        with bench_contest(users=options['users'], problems=10) as fixture:
+            started = time.perf_counter()
+            create_submission_history(fixture, rows)
+            self.stdout.write(f"created {rows} submissions in {time.perf_counter() - started:.1f}s\n")
+            contest, user = fixture['contest'], fixture['users'][0]
+            owner = contest.created_by
+            owner.is_staff = True
+            owner.save(update_fields=['is_staff'])
+            everything = Submission.objects.filter(contest=contest).select_related('user', 'problem', 'contest')
+
+            self.stdout.write(f"{'case':<52} {'rows':>8} {'queries':>7} {'time':>10} {'peak memory':>12}")
+            legacy_rows = min(rows, options['legacy_rows'])
+            self._report(f'cms list, every row (old, {legacy_rows} rows)', 1,
+                         lambda: list(everything.order_by('-submitted_at')[:legacy_rows]))
+            self._report('api list, one user, every row (old)', 1,
+                         lambda: SubmissionListSerializer(
+                             Submission.objects.filter(user=user).select_related('user', 'problem')
+                             .order_by('-submitted_at'), many=True).data)
+
+            for depth in (0, rows // 100, rows // 10, rows - rows // 10):
+                self._compare(f'depth {depth}', everything, depth, page_size, options['repeat'])
+            depth = rows // 20
+            self._compare(f'status=Accepted, depth {depth}', everything.filter(status='Accepted'), depth,
+                          page_size, options['repeat'])
+            depth = rows // options['users'] // 2
+            self._compare(f'one user, depth {depth}', Submission.objects.filter(user=user).select_related('user', 'problem'),
+                          depth, page_size, options['repeat'])
+
+            self._report('cms all_submission view, first page', options['repeat'],
+                         lambda: self._cms_page(owner, page_size))
+            self._report('api submission list, first page', options['repeat'],
+                         lambda: self._api_page(user, page_size))
+
+    def _compare(self, label, queryset, depth, page_size, repeat):
+        ordered = queryset.order_by('-submitted_at', '-id')
+        self._report(f'{label}: OFFSET', repeat, lambda: list(ordered[depth:depth + page_size]))
+        # The cursor a client would hold after paging down to ``depth``
+        cursor = encode_cursor(ordered[depth - 1]) if depth else None
+        page = self._report(f'{label}: keyset', repeat, lambda: keyset_page(queryset, cursor, page_size)[0])
+        if [row.pk for row in page] != [row.pk for row in ordered[depth:depth + page_size]]:
+            self.stdout.write(self.style.ERROR(f'{label}: keyset and OFFSET pages differ'))
+
+    def _report(self, label, repeat, run):
+        best = None
+        reset_queries()  # the inserts overflow the query log, which CaptureQueriesContext can't count past
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - started
+            best = min(best or elapsed, elapsed)
+        # Traced separately: tracemalloc slows everything down
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        count = len(result) if isinstance(result, list) else '-'
+        self.stdout.write(f"{label:<52} {count:>8} {len(captured):>7} {best * 1000:>8.1f}ms {peak / 2 ** 20:>9.1f} MiB")
+        return result
+
+    def _cms_page(self, owner, page_size):
+        request = RequestFactory().get('/submissions/', {'page_size': page_size}, HTTP_HOST='localhost')
+        request.user = owner
+        all_submission(request)
+
+    def _api_page(self, user, page_size):
+        request = APIRequestFactory().get('/api/submission/', {'page_size': page_size}, HTTP_HOST='localhost')
+        force_authenticate(request, user=user)
+        SubmissionViewSet.as_view({'get': 'list'})(request).render()
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import metrics, testcase_cache
+from api.benchmarks import bench_contest
+from cms.models import Testcase
+
+
+class Command(BaseCommand):
+    help = ("Time preparing a problem's testcases for Judge0 on every submission against reusing the "
+            "prepared copy from the testcase cache")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--testcases', type=int, default=50)
+        parser.add_argument('--size', type=int, default=64 * 1024, help='Bytes of each input and output')
+        parser.add_argument('--submissions', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with bench_contest(problems=1, testcases=0) as fixture:
+            problem = fixture['problems'][0]
+            line = '1 2 3 4 5 6 7 8 9\\n'
+            text = line * (options['size'] // len(line))
+            Testcase.objects.bulk_create([
+                Testcase(problem=problem, input=text, output=text, points=1) for _ in range(options['testcases'])
+            ])
+            problem.testcases_changed()
+
+            for label, prepare in (('uncached', testcase_cache.prepare), ('cached', testcase_cache.get)):
+                testcase_cache.clear()
+                metrics.reset()
+                started = time.perf_counter()
+                for _ in range(options['submissions']):
+                    prepare(problem)
+                elapsed = time.perf_counter() - started
+                counters = metrics.snapshot()['counters']
+                self.stdout.write(
+                    f"{label:<9} {elapsed / options['submissions'] * 1000:8.2f} ms/submission "
+                    f"hits={counters.get('testcase_cache.hits', 0)} misses={counters.get('testcase_cache.misses', 0)}"
+                )
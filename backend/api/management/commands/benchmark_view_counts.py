@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import view_counts
+from api.benchmarks import bench_contest, bench_practice
+from api.views import PracticeProblemViewSet
+from cms.models import PracticeProblem
+
+
+class Command(BaseCommand):
+    help = "Read a practice problem from many threads at once and count the views lost or the writes made"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--reads', type=int, default=50, help='Detail reads per thread')
+
+    def handle(self, *args, **options):
+        with bench_contest(users=options['threads']) as fixture, bench_practice(problems=1) as practice:
+            problem = practice['problems'][0]
+            expected = options['threads'] * options['reads']
+            for label, count_view in (('read-modify-write (old)', self._legacy_record_view),
+                                      ('buffered', view_counts.record_view)):
+                PracticeProblem.objects.filter(pk=problem.pk).update(view_count=0)
+                view_counts.flush()
+                record_view = view_counts.record_view
+                view_counts.record_view = count_view
+                try:
+                    with override_settings(VIEW_COUNT_FLUSH_INTERVAL=0.5, VIEW_COUNT_DEDUP_WINDOW=0):
+                        elapsed, errors, writes = self._run(fixture['users'], problem, options['reads'])
+                finally:
+                    view_counts.record_view = record_view
+                view_counts.flush()
+                counted = PracticeProblem.objects.get(pk=problem.pk).view_count
+                self.stdout.write(
+                    f"{label:<24} views={counted}/{expected} lost={expected - counted - errors:<5} "
+                    f"lock_errors={errors:<4} view_count_writes={writes:<5} elapsed={elapsed:6.2f}s"
+                )
+
+    def _run(self, users, problem, reads):
+        errors, writes, lock = [0], [0], threading.Lock()
+
+        def reader(user):
+            try:
+                for _ in range(reads):
+                    with CaptureQueriesContext(connection) as captured:
+                        try:
+                            self._view(user, problem)
+                        except OperationalError:
+                            with lock:
+                                errors[0] += 1
+                    with lock:
+                        writes[0] += sum(1 for query in captured if query['sql'].startswith('UPDATE'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reader, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, errors[0], writes[0]
+
+    def _view(self, user, problem):
+        request = APIRequestFactory().get(f'/api/practice/{problem.slug}/', HTTP_HOST='localhost')
+        force_authenticate(request, user=user)
+        response = PracticeProblemViewSet.as_view({'get': 'retrieve'})(request, slug=problem.slug)
+        response.render()
+
+    def _legacy_record_view(self, problem_id, user_id=None):
+        """What the detail endpoint used to do."""
+        instance = PracticeProblem.objects.get(pk=problem_id)
+        instance.view_count = instance.view_count + 1 if instance.view_count else 1
+        instance.save(update_fields=['view_count'])
@@ -0,0 +1,88 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cms import testcase_store
+from cms.models import PracticeTestcase, Testcase
+
+STORE_FIELDS = ['input', 'output', 'input_sha256', 'output_sha256', 'input_size', 'output_size']
+
+
+class Command(BaseCommand):
+    help = (
+        "Move testcase inputs and outputs of at least --min-size bytes out of the database into the "
+        "content-addressed testcase store (and record every payload's size), or back with --inline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-size', type=int, default=settings.TESTCASE_STORE_MIN_SIZE,
+                            help='Bytes from which a payload is stored as a file (default TESTCASE_STORE_MIN_SIZE)')
+        parser.add_argument('--inline', action='store_true', help='Move every stored payload back into the database')
+        parser.add_argument('--prune', action='store_true', help='Also delete store files no testcase refers to')
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='Seconds a file must be unchanged before --prune deletes it')
+        parser.add_argument('--batch-size', type=int, default=100, help='Testcases loaded and saved at a time')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would move without changing anything')
+
+    def handle(self, *args, **options):
+        min_size = 0 if options['inline'] else options['min_size']
+        if not options['inline'] and min_size <= 0:
+            raise CommandError('Set TESTCASE_STORE_MIN_SIZE or pass --min-size to choose what is moved')
+
+        for model in (Testcase, PracticeTestcase):
+            moved, moved_bytes = self._move(model, min_size, options['batch_size'], options['dry_run'])
+            direction = 'into the database' if options['inline'] else f'to {settings.TESTCASE_STORE_ROOT}'
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {moved} payloads, {moved_bytes} bytes "
+                              f"{'would be ' if options['dry_run'] else ''}moved {direction}")
+        if options['prune']:
+            self._prune(options['grace'], options['dry_run'])
+
+    def _move(self, model, min_size, batch_size, dry_run):
+        moved = moved_bytes = 0
+        ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            batch = list(model.objects.filter(pk__in=ids[start:start + batch_size]).order_by('pk'))
+            changed = []
+            for testcase in batch:
+                before = [getattr(testcase, field) for field in STORE_FIELDS]
+                stored = [field for field in model.PAYLOAD_FIELDS if getattr(testcase, f'{field}_sha256')]
+                if min_size == 0:
+                    testcase.input, testcase.output = testcase.input_text, testcase.output_text
+                if dry_run:
+                    for field in model.PAYLOAD_FIELDS:
+                        size = len(getattr(testcase, field).encode())
+                        if (field in stored) == (min_size == 0) and (min_size == 0 or size >= min_size):
+                            moved, moved_bytes = moved + 1, moved_bytes + size
+                    continue
+                testcase.store_payloads(min_size)
+                for field in model.PAYLOAD_FIELDS:
+                    if (field in stored) != bool(getattr(testcase, f'{field}_sha256')):
+                        moved, moved_bytes = moved + 1, moved_bytes + getattr(testcase, f'{field}_size')
+                if [getattr(testcase, field) for field in STORE_FIELDS] != before:
+                    changed.append(testcase)
+            if changed:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, STORE_FIELDS)
+        return moved, moved_bytes
+
+    def _prune(self, grace, dry_run):
+        referenced = set()
+        for model in (Testcase, PracticeTestcase):
+            for field in ('input_sha256', 'output_sha256'):
+                referenced.update(model.objects.exclude(**{field: ''}).values_list(field, flat=True).distinct())
+
+        cutoff = time.time() - grace
+        pruned = pruned_bytes = 0
+        for name, path in testcase_store.stored_files():
+            if name in referenced:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            pruned, pruned_bytes = pruned + 1, pruned_bytes + stat.st_size
+        self.stdout.write(f"{pruned} unreferenced files, {pruned_bytes} bytes {'would be ' if dry_run else ''}pruned")
@@ -0,0 +1,83 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from api.testcase_import import TestcaseArchiveError, entries, find_pairs, import_testcases
+from cms.models import Contest, PracticeProblem, Problem, ProblemTag
+
+# problem.json keys copied onto the problem, besides title, slug and tags
+PROBLEM_FIELDS = [
+    'statement', 'input_format', 'output_format', 'constraints', 'sample_input', 'sample_output', 'explanation',
+    'time_limit', 'memory_limit', 'difficulty', 'points', 'is_visible',
+]
+PRACTICE_FIELDS = PROBLEM_FIELDS + ['editorial', 'is_featured', 'judging_policy']
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update problems from packages on disk: a directory or .zip holding a problem.json "
+        "(title, statement, limits, tags ...) and N.in/N.out testcase pairs, which replace the problem's testcases"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('packages', nargs='+', help='Package directories or .zip files')
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--contest', type=int, help='Import as problems of this contest')
+        target.add_argument('--practice', action='store_true', help='Import as practice problems')
+        parser.add_argument('--points', type=int, default=0, help='Points of each hidden testcase')
+        parser.add_argument('--dry-run', action='store_true', help='Check the packages without saving anything')
+
+    def handle(self, *args, **options):
+        contest = None
+        if options['contest']:
+            contest = Contest.objects.filter(pk=options['contest']).first()
+            if contest is None:
+                raise CommandError(f"Contest {options['contest']} does not exist")
+
+        for path in options['packages']:
+            try:
+                metadata, pairs = self._read(path)
+            except TestcaseArchiveError as e:
+                raise CommandError(f'{path}: {e}') from e
+            slug = metadata.get('slug') or slugify(metadata['title'])
+            samples = sum(1 for is_sample, _, _ in pairs if is_sample)
+            summary = f"{slug}: {len(pairs) - samples} testcases, {samples} samples"
+            if options['dry_run']:
+                self.stdout.write(f'{path}: ok, {summary}')
+                continue
+
+            with transaction.atomic():
+                problem, created = self._save_problem(metadata, slug, contest)
+                import_testcases(problem, path, points=options['points'])
+            self.stdout.write(self.style.SUCCESS(f"{path}: {'created' if created else 'updated'} {summary}"))
+
+    def _read(self, path):
+        """The package's problem.json and its testcase pairs."""
+        if not os.path.exists(path):
+            raise TestcaseArchiveError('No such file or directory')
+        with entries(path) as files:
+            manifests = [opener for name, _, opener in files if os.path.basename(name) == 'problem.json']
+            if len(manifests) != 1:
+                raise TestcaseArchiveError('Expected exactly one problem.json')
+            with manifests[0]() as manifest:
+                try:
+                    metadata = json.load(manifest)
+                except ValueError as e:
+                    raise TestcaseArchiveError(f'problem.json is not valid JSON: {e}') from e
+            if not isinstance(metadata, dict) or not metadata.get('title'):
+                raise TestcaseArchiveError('problem.json needs at least a title')
+            return metadata, find_pairs(files)
+
+    def _save_problem(self, metadata, slug, contest):
+        if contest is None:
+            model, fields, lookup = PracticeProblem, PRACTICE_FIELDS, {'slug': slug}
+        else:
+            model, fields, lookup = Problem, PROBLEM_FIELDS, {'contest': contest, 'slug': slug}
+        values = {field: metadata[field] for field in fields if field in metadata}
+        problem, created = model.objects.update_or_create(**lookup, defaults={'title': metadata['title'], **values})
+        if 'tags' in metadata:
+            problem.tags.set([ProblemTag.objects.get_or_create(name=name)[0] for name in metadata['tags']])
+        return problem, created
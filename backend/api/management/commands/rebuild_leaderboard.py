@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.leaderboard import rebuild_contest
+from cms.models import Contest
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized leaderboard of one or all contests from their judged submissions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('contests', nargs='*', help='Contest slugs (default: all contests)')
+
+    def handle(self, *args, **options):
+        contests = Contest.objects.all()
+        if options['contests']:
+            contests = contests.filter(slug__in=options['contests'])
+            missing = set(options['contests']) - set(contests.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f"Unknown contest(s): {', '.join(sorted(missing))}")
+
+        for contest in contests:
+            entries = rebuild_contest(contest)
+            self.stdout.write(f"{contest.slug}: {entries} leaderboard entries")
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, Q
+
+from cms.models import (
+    PracticeProblem, PracticeSubmission, Problem, Submission, UserPracticeProblemStatus, UserProblemStatus,
+)
+
+STATS_FIELDS = ['total_submissions', 'accepted_submissions', 'attempt_count', 'solve_count']
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the submission statistics of contest and practice problems, and the per-user problem "
+        "statuses their distinct attempter/solver counts come from, from the judged submissions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without saving them')
+
+    def handle(self, *args, **options):
+        self._rebuild('contest', Submission, UserProblemStatus, Problem, options['dry_run'])
+        self._rebuild('practice', PracticeSubmission, UserPracticeProblemStatus, PracticeProblem, options['dry_run'])
+
+    def _rebuild(self, label, submission_model, status_model, problem_model, dry_run):
+        # One grouped query gives both the statuses and, summed per problem, the problem stats
+        accepted = Q(status='Accepted')
+        expected, totals = {}, {}
+        for row in submission_model.objects.exclude(status='Pending').order_by().values('user_id', 'problem_id').annotate(
+                attempts=Count('id'), accepted=Count('id', filter=accepted), solved_at=Min('submitted_at', filter=accepted)):
+            expected[row['user_id'], row['problem_id']] = (row['attempts'], row['solved_at'])
+            submitted, accepted_count, attempters, solvers = totals.get(row['problem_id'], (0, 0, 0, 0))
+            totals[row['problem_id']] = (submitted + row['attempts'], accepted_count + row['accepted'],
+                                         attempters + 1, solvers + (row['solved_at'] is not None))
+
+        current = {(s.user_id, s.problem_id): s for s in status_model.objects.all()}
+        to_create, to_update = [], []
+        for key, (attempts, solved_at) in expected.items():
+            status = current.pop(key, None)
+            if status is None:
+                to_create.append(status_model(user_id=key[0], problem_id=key[1], attempts=attempts, solved_at=solved_at))
+            elif (status.attempts, status.solved_at) != (attempts, solved_at):
+                status.attempts, status.solved_at = attempts, solved_at
+                to_update.append(status)
+        to_delete = [status.pk for status in current.values()]
+
+        stale_problems = []
+        for problem in problem_model.objects.only('id', *STATS_FIELDS):
+            stats = totals.get(problem.pk, (0, 0, 0, 0))
+            if tuple(getattr(problem, field) for field in STATS_FIELDS) != stats:
+                for field, value in zip(STATS_FIELDS, stats):
+                    setattr(problem, field, value)
+                stale_problems.append(problem)
+
+        self.stdout.write(
+            f"{label}: problem statuses: {len(to_create)} missing, {len(to_update)} wrong, "
+            f"{len(to_delete)} orphaned; problems: {len(stale_problems)} wrong"
+        )
+        if dry_run:
+            return
+
+        with transaction.atomic():
+            status_model.objects.filter(pk__in=to_delete).delete()
+            status_model.objects.bulk_create(to_create, batch_size=1000)
+            status_model.objects.bulk_update(to_update, ['attempts', 'solved_at'], batch_size=1000)
+            problem_model.objects.bulk_update(stale_problems, STATS_FIELDS, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"{label.capitalize()} problem stats rebuilt"))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, Q
+
+from cms.models import Submission, UserProblemStatus, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount UserProblemStatus rows and UserProfile submission/solved counters from the "
+        "judged submissions, fixing any drift in the incrementally maintained values"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only reconcile this username')
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without saving them')
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.exclude(status='Pending')
+        statuses = UserProblemStatus.objects.all()
+        profiles = UserProfile.objects.all()
+        if options['user']:
+            submissions = submissions.filter(user__username=options['user'])
+            statuses = statuses.filter(user__username=options['user'])
+            profiles = profiles.filter(user__username=options['user'])
+
+        expected = {
+            (row['user_id'], row['problem_id']): (row['attempts'], row['solved_at'])
+            for row in submissions.values('user_id', 'problem_id').annotate(
+                attempts=Count('id'), solved_at=Min('submitted_at', filter=Q(status='Accepted'))
+            )
+        }
+        current = {(s.user_id, s.problem_id): s for s in statuses}
+
+        to_create, to_update = [], []
+        for key, (attempts, solved_at) in expected.items():
+            status = current.pop(key, None)
+            if status is None:
+                to_create.append(UserProblemStatus(user_id=key[0], problem_id=key[1],
+                                                   attempts=attempts, solved_at=solved_at))
+            elif (status.attempts, status.solved_at) != (attempts, solved_at):
+                status.attempts, status.solved_at = attempts, solved_at
+                to_update.append(status)
+        to_delete = [status.pk for status in current.values()]
+
+        totals = {}
+        for (user_id, _), (attempts, solved_at) in expected.items():
+            submitted, solved = totals.get(user_id, (0, 0))
+            totals[user_id] = (submitted + attempts, solved + (solved_at is not None))
+        stale_profiles = []
+        for profile in profiles.only('id', 'user_id', 'total_submissions', 'total_solved'):
+            submitted, solved = totals.get(profile.user_id, (0, 0))
+            if (profile.total_submissions, profile.total_solved) != (submitted, solved):
+                profile.total_submissions, profile.total_solved = submitted, solved
+                stale_profiles.append(profile)
+
+        self.stdout.write(
+            f"problem statuses: {len(to_create)} missing, {len(to_update)} wrong, {len(to_delete)} orphaned; "
+            f"profiles: {len(stale_profiles)} wrong"
+        )
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            UserProblemStatus.objects.filter(pk__in=to_delete).delete()
+            UserProblemStatus.objects.bulk_create(to_create, batch_size=1000)
+            UserProblemStatus.objects.bulk_update(to_update, ['attempts', 'solved_at'], batch_size=1000)
+            UserProfile.objects.bulk_update(stale_profiles, ['total_submissions', 'total_solved'], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS("User stats reconciled"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.standings import replay
+from cms.models import Contest, Leaderboard
+
+
+class Command(BaseCommand):
+    help = "Replay a contest's submissions into ICPC standings, optionally checking the materialized leaderboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest', help='Contest slug')
+        parser.add_argument('--top', type=int, default=10, help='Rows to print')
+        parser.add_argument('--check', action='store_true',
+                            help='Compare solved counts, penalties and (under the ICPC ranking rule) ranks '
+                                 'with the materialized leaderboard')
+
+    def handle(self, *args, **options):
+        try:
+            contest = Contest.objects.get(slug=options['contest'])
+        except Contest.DoesNotExist:
+            raise CommandError(f"Unknown contest: {options['contest']}")
+
+        started = time.perf_counter()
+        ranking = replay(contest).ranking()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{contest.slug}: {len(ranking)} users replayed in {elapsed * 1000:.1f} ms")
+
+        usernames = dict(contest.leaderboard.values_list('user_id', 'user__username'))
+        for row in ranking[:options['top']]:
+            self.stdout.write(f"{row.rank:>5}  {usernames.get(row.user_id, row.user_id)!s:<24} "
+                              f"{row.solved:>3} solved  {row.penalty:>6} min")
+
+        if options['check']:
+            ranked = contest.ranking_rule == 'icpc'  # otherwise the leaderboard ranks by score
+            stored = {
+                user_id: (solved, penalty, rank if ranked else None) for user_id, solved, penalty, rank in
+                Leaderboard.objects.filter(contest=contest).values_list('user_id', 'problems_solved', 'penalty', 'rank')
+            }
+            replayed = {row.user_id: (row.solved, row.penalty, row.rank if ranked else None) for row in ranking}
+            mismatches = [user_id for user_id in replayed if stored.get(user_id) != replayed[user_id]]
+            for user_id in mismatches[:options['top']]:
+                self.stdout.write(f"mismatch user {user_id}: replay {replayed[user_id]}, "
+                                  f"leaderboard {stored.get(user_id)}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} leaderboard entries disagree; run rebuild_leaderboard {contest.slug}")
+            self.stdout.write(self.style.SUCCESS("Materialized leaderboard matches the replay"))
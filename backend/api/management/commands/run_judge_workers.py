@@ -0,0 +1,59 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from requests.exceptions import RequestException
+
+from api.grading import callbacks_enabled, collect_lost_callbacks
+from api.judge_queue import JudgeWorker, requeue_stale_tasks
+
+
+class Command(BaseCommand):
+    help = "Run a pool of judge workers that drain the submission queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=settings.JUDGE_WORKER_POLL_INTERVAL,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=settings.JUDGE_TASK_STALE_AFTER,
+                            help='Requeue running tasks without a heartbeat for this many seconds (fail them after their last attempt)')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping judge workers after their current task...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        requeued = requeue_stale_tasks(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale task(s)")
+
+        workers = [
+            JudgeWorker(index=i, poll_interval=options['poll_interval'], stop_event=stop_event)
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(workers)} judge worker(s)"))
+
+        # Periodically recover tasks abandoned by workers that died mid-judge,
+        # and results whose Judge0 callback never arrived
+        while not stop_event.wait(settings.JUDGE_MAINTENANCE_INTERVAL):
+            requeue_stale_tasks(options['stale_after'])
+            if callbacks_enabled():
+                try:
+                    collect_lost_callbacks()
+                except RequestException:
+                    pass
+
+        for worker in workers:
+            worker.join()
+        processed = sum(w.processed for w in workers)
+        failed = sum(w.failed for w in workers)
+        self.stdout.write(self.style.SUCCESS(f"Judge workers stopped: {processed} judged, {failed} failed"))
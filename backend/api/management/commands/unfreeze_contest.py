@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.leaderboard import unfreeze
+from cms.models import Contest
+
+
+class Command(BaseCommand):
+    help = "Unfreeze a finished contest's scoreboard, printing the frozen results in the order they are revealed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest', help='Contest slug')
+        parser.add_argument('--force', action='store_true', help='Unfreeze even if the contest has not ended')
+
+    def handle(self, *args, **options):
+        try:
+            contest = Contest.objects.get(slug=options['contest'])
+        except Contest.DoesNotExist:
+            raise CommandError(f"Unknown contest: {options['contest']}")
+        if not contest.freeze_time or contest.unfrozen_at:
+            raise CommandError(f"{contest.slug} is not frozen")
+        if contest.end_time > timezone.now() and not options['force']:
+            raise CommandError(f"{contest.slug} has not ended yet (use --force to unfreeze anyway)")
+
+        for reveal in unfreeze(contest):
+            self.stdout.write(f"#{reveal['submission']:<8} {reveal['username']:<24} problem {reveal['problem']:<6} "
+                              f"{reveal['status']:<22} -> {reveal['problems_solved']} solved, {reveal['total_score']} points")
+        self.stdout.write(self.style.SUCCESS(f"{contest.slug} unfrozen"))
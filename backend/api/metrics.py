@@ -0,0 +1,62 @@
+"""
+In-process counters and latency samples.
+
+Metrics live in the memory of the current process (each judge worker or web
+process has its own) and are exposed to staff through ``/api/metrics/``.
+Samples are kept in a bounded window so percentiles reflect recent traffic.
+"""
+from collections import defaultdict, deque
+import threading
+
+
+SAMPLE_WINDOW = 2048
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    """Record one sample (e.g. a latency in seconds) for ``name``."""
+    with _lock:
+        _samples[name].append(value)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def snapshot():
+    """Return all counters and a summary of every sample window."""
+    with _lock:
+        counters = dict(_counters)
+        samples = {name: list(values) for name, values in _samples.items()}
+    return {
+        'counters': counters,
+        'samples': {
+            name: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+                'max': max(values) if values else 0.0,
+            }
+            for name, values in samples.items()
+        },
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _samples.clear()
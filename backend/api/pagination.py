@@ -0,0 +1,131 @@
+"""
+Pagination classes, and keyset pagination of submission lists.
+
+Submissions are paged newest (or oldest) first on ``(submitted_at, id)``: a page is
+"the next ``page_size`` rows after this position", which the
+``submitted_at`` indexes answer by seeking straight to the position, so
+the millionth row costs what the first does. Offset pagination would read
+and throw away every row before the page. The position travels as an
+opaque cursor; ``keyset_page`` is shared by the API
+(``SubmissionCursorPagination``) and the cms submissions page.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class LeaderboardPagination(PageNumberPagination):
+    """Opt-in paging for leaderboards: only applied when the request asks for a ?page="""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+# Keyset pagination
+def encode_cursor(row, reverse=False):
+    position = f"{'p' if reverse else 'n'}|{row.submitted_at.isoformat()}|{row.pk}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """``(submitted_at, id, reverse)`` of a cursor; raises ValueError if it is not one."""
+    try:
+        direction, submitted_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if direction not in ('n', 'p'):
+            raise ValueError(cursor)
+        return datetime.fromisoformat(submitted_at), int(pk), direction == 'p'
+    except (TypeError, UnicodeError, binascii.Error) as e:
+        raise ValueError(cursor) from e
+
+
+def keyset_page(queryset, cursor=None, page_size=50, oldest_first=False):
+    """
+    One page of ``queryset`` (rows with ``submitted_at`` and ``id``), newest
+    first (or ``oldest_first``), starting after ``cursor``. Returns
+    ``(rows, next_cursor, previous_cursor)``; ``next`` pages on in that
+    order, and either cursor is None at that end. Raises ValueError for a
+    malformed cursor.
+    """
+    reverse = False
+    if cursor:
+        submitted_at, pk, reverse = decode_cursor(cursor)
+    # newest first, or paging back from a position in an oldest first list
+    descending = oldest_first == reverse
+    if cursor:
+        # (submitted_at, id) beyond the position, written so the submitted_at range can use an index
+        if descending:
+            queryset = queryset.filter(submitted_at__lte=submitted_at).exclude(submitted_at=submitted_at, id__gte=pk)
+        else:
+            queryset = queryset.filter(submitted_at__gte=submitted_at).exclude(submitted_at=submitted_at, id__lte=pk)
+    queryset = queryset.order_by(*(('-submitted_at', '-id') if descending else ('submitted_at', 'id')))
+
+    rows = list(queryset[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+    has_next = more if not reverse else True
+    has_previous = more if reverse else cursor is not None
+    next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+    previous_cursor = encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+    return rows, next_cursor, previous_cursor
+
+
+class SubmissionCursorPagination(BasePagination):
+    """
+    Keyset pages of submissions: ``{next, previous, results}``, ``?cursor=``,
+    a bounded ``?page_size=`` and ``?ordering=submitted_at`` for oldest first
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset, request.query_params.get(self.cursor_query_param), self.get_page_size(request),
+                oldest_first=request.query_params.get(self.ordering_query_param) == 'submitted_at')
+        except ValueError:
+            raise NotFound('Invalid cursor')
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor) if cursor else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.next_cursor),
+            'previous': self._link(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,118 @@
+"""
+Publish/subscribe for live updates pushed to clients.
+
+Publishers are plain synchronous code (judge workers, Judge0 callbacks);
+subscribers are the coroutines of the ASGI streaming views (api.streams),
+each holding an ``asyncio.Queue`` on its event loop. An idle subscriber is
+only a queue and a suspended coroutine, so one process can hold thousands
+of them without a thread each.
+
+``InProcessBroker`` delivers to subscribers in the same process, which is
+enough when the judge runs inside the web process (``JUDGE_WORKERS_IN_PROCESS``)
+or in development. ``PUBSUB_BROKER`` names the broker class, so a broker
+with the same ``publish``/``subscribe`` methods on top of e.g. Redis pub/sub
+can take its place when the judge runs elsewhere.
+"""
+import asyncio
+from collections import defaultdict
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+class Subscription:
+    """Messages of one topic for one subscriber, read with ``await get()``."""
+
+    def __init__(self, broker, topic, maxsize):
+        self.broker = broker
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        """Hand a message over from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:  # the subscriber's loop is closed
+            self.close()
+
+    def _put(self, message):
+        if self.queue.full():
+            # A subscriber that stopped reading loses its oldest message, not the newest
+            self.queue.get_nowait()
+            metrics.increment('pubsub.dropped')
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """The next message; raises TimeoutError after ``timeout`` seconds."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+        metrics.increment('pubsub.published')
+
+    def subscribe(self, topic, maxsize=None):
+        """Subscribe the running event loop to ``topic``."""
+        subscription = Subscription(self, topic, maxsize or settings.PUBSUB_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.topic]
+
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._subscriptions.get(topic, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.PUBSUB_BROKER)()
+        return _broker
+
+
+def publish(topic, message):
+    """Publish a JSON-serializable message; never raises, live updates are best effort."""
+    try:
+        get_broker().publish(topic, message)
+    except Exception:
+        metrics.increment('pubsub.publish_errors')
+
+
+def subscribe(topic):
+    return get_broker().subscribe(topic)
@@ -0,0 +1,207 @@
+"""
+Cached responses of the public read endpoints.
+
+Contests, practice problems, tags and announcements change only when staff
+edit them (and practice problem counts when practice submissions come in),
+but were read from the database on every request. ``cached_response``
+keeps a viewset action's response data in the ``RESPONSE_CACHE_ALIAS``
+cache, together with an ETag, so repeated requests skip the queries and
+clients that send ``If-None-Match`` get a 304 without a body.
+
+Keys are versioned per group of endpoints: a key embeds the group's current
+version, and ``invalidate`` only bumps that version, so entries written
+under the old one are never read again and simply expire. Nothing has to
+find and delete them, which works the same on locmem, memcached or Redis.
+The ``post_save``/``post_delete``/``m2m_changed`` receivers below
+invalidate the groups a model appears in; writes that bypass signals
+(``QuerySet.update``, ``bulk_create``) must call ``invalidate`` themselves.
+
+Some responses go stale by time alone (a contest starting, an announcement
+expiring); those entries live no longer than ``stale_at`` says, and none
+longer than ``RESPONSE_CACHE_TIMEOUT``.
+"""
+from functools import wraps
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from cms.models import Announcement, Contest, PracticeProblem, PracticeSubmission, ProblemTag
+from . import metrics
+
+CONTESTS = 'contests'
+PRACTICE_PROBLEMS = 'practice_problems'
+PROBLEM_TAGS = 'problem_tags'
+ANNOUNCEMENTS = 'announcements'
+GROUPS = (CONTESTS, PRACTICE_PROBLEMS, PROBLEM_TAGS, ANNOUNCEMENTS)
+
+# Groups whose responses show rows of each model
+INVALIDATED_BY = {
+    Contest: (CONTESTS,),
+    PracticeProblem: (PRACTICE_PROBLEMS, PROBLEM_TAGS),
+    ProblemTag: (PRACTICE_PROBLEMS, PROBLEM_TAGS),
+    PracticeSubmission: (PRACTICE_PROBLEMS,),  # submission counts and acceptance rates
+    Announcement: (ANNOUNCEMENTS,),
+}
+# Saves of only these fields don't change any cached response
+UNCACHED_FIELDS = {
+    PracticeProblem: {'view_count'},
+}
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(group):
+    return f'response:version:{group}'
+
+
+def version(group):
+    cache = _cache()
+    current = cache.get(_version_key(group))
+    if current is None:
+        # Start from the clock, not 1: if the version was evicted, counting
+        # again from 1 could reach a version whose entries are still cached
+        cache.add(_version_key(group), time.time_ns(), timeout=None)
+        current = cache.get(_version_key(group))
+    return current
+
+
+def invalidate(*groups):
+    """Make every cached response of ``groups`` stale."""
+    cache = _cache()
+    for group in groups:
+        try:
+            cache.incr(_version_key(group))
+        except ValueError:  # no version yet, or it was evicted
+            cache.add(_version_key(group), time.time_ns(), timeout=None)
+        metrics.increment(f'response_cache.{group}.invalidations')
+
+
+def _response_key(group, request):
+    # Staff may see more (e.g. non-global announcements), so they get entries of their own
+    variant = f'{request.user.is_staff}:{request.get_full_path()}'
+    return f'response:{group}:{version(group)}:{hashlib.md5(variant.encode()).hexdigest()}'
+
+
+def _etag(data):
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return f'"{hashlib.md5(body.encode()).hexdigest()}"'
+
+
+def _timeout(stale_at):
+    timeout = settings.RESPONSE_CACHE_TIMEOUT
+    expires = stale_at() if stale_at else None
+    if expires is not None:
+        timeout = min(timeout, max(1, math.ceil((expires - timezone.now()).total_seconds())))
+    return timeout
+
+
+def _not_modified(request, etag):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    # If-None-Match uses the weak comparison
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
+
+
+def cached_response(group, stale_at=None):
+    """
+    Serve a viewset action's response from the cache while ``group`` is not
+    invalidated. ``stale_at`` returns when the response goes stale by time
+    alone, or None. Only 200 responses are cached.
+    """
+    def decorator(action):
+        @wraps(action)
+        def wrapper(self, request, *args, **kwargs):
+            cache = _cache()
+            key = _response_key(group, request)
+            entry = cache.get(key)
+            if entry is None:
+                metrics.increment(f'response_cache.{group}.misses')
+                response = action(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                entry = {'etag': _etag(response.data), 'data': response.data}
+                cache.set(key, entry, _timeout(stale_at))
+            else:
+                metrics.increment(f'response_cache.{group}.hits')
+
+            if _not_modified(request, entry['etag']):
+                metrics.increment(f'response_cache.{group}.not_modified')
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(entry['data'])
+            response['ETag'] = entry['etag']
+            return response
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Hits, misses, 304s and the hit ratio of each group, in this process."""
+    counters = metrics.snapshot()['counters']
+    result = {}
+    for group in GROUPS:
+        hits = counters.get(f'response_cache.{group}.hits', 0)
+        misses = counters.get(f'response_cache.{group}.misses', 0)
+        result[group] = {
+            'hits': hits,
+            'misses': misses,
+            'not_modified': counters.get(f'response_cache.{group}.not_modified', 0),
+            'invalidations': counters.get(f'response_cache.{group}.invalidations', 0),
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return result
+
+
+# When responses go stale by time alone
+def next_contest_transition():
+    """The next start or end of a public contest: their status changes then."""
+    now = timezone.now()
+    upcoming = Contest.objects.filter(is_public=True).aggregate(
+        start=Min('start_time', filter=Q(start_time__gt=now)),
+        end=Min('end_time', filter=Q(end_time__gt=now)),
+    )
+    return min(filter(None, upcoming.values()), default=None)
+
+
+def next_announcement_expiry():
+    return Announcement.objects.filter(expires_at__gt=timezone.now()).aggregate(Min('expires_at'))['expires_at__min']
+
+
+# Invalidation: after the commit, or a request in between could cache the
+# old rows again under the new version
+def _invalidate_on_commit(*groups):
+    transaction.on_commit(lambda: invalidate(*groups))
+
+
+@receiver(post_save, dispatch_uid='response_cache_saved')
+def _saved(sender, update_fields=None, **kwargs):
+    groups = INVALIDATED_BY.get(sender)
+    if groups and not (update_fields and set(update_fields) <= UNCACHED_FIELDS.get(sender, set())):
+        _invalidate_on_commit(*groups)
+
+
+@receiver(post_delete, dispatch_uid='response_cache_deleted')
+def _deleted(sender, **kwargs):
+    groups = INVALIDATED_BY.get(sender)
+    if groups:
+        _invalidate_on_commit(*groups)
+
+
+@receiver(m2m_changed, sender=PracticeProblem.tags.through, dispatch_uid='response_cache_tags_changed')
+def _tags_changed(action, **kwargs):
+    if action.startswith('post_'):
+        _invalidate_on_commit(PRACTICE_PROBLEMS, PROBLEM_TAGS)
@@ -6,6 +6,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.utils import timezone
 from django.db import transaction
 from django.utils.text import slugify
+from . import view_counts
 
 
 # Authentication and Registration Serializers
@@ -146,10 +147,6 @@ class UserProfileSerializer(serializers.ModelSerializer):
         
         return instance
     
-    def to_representation(self, instance):
-        instance.update_stats()  # auto-update before showing
-        return super().to_representation(instance)
-    
 
 # Contest List Serializer
 class ContestListSerializer(serializers.ModelSerializer):
@@ -178,7 +175,8 @@ class ContestDetailSerializer(serializers.ModelSerializer):
         model = Contest
         fields = [
             'id', 'title', 'slug', 'description', 'rules', 'start_time', 'end_time', 'status', 
-            'duration', 'is_rated', 'is_public', 'max_participants', 'created_by', 'participants_count'
+            'duration', 'is_rated', 'is_public', 'max_participants', 'judging_policy', 'ranking_rule', 'freeze_time',
+            'created_by', 'participants_count'
         ]
 
     def get_status(self, obj):
@@ -236,6 +234,9 @@ class ProblemTagSerializer(serializers.ModelSerializer):
 
 
 class TestcaseSerializer(serializers.ModelSerializer):
+    input = serializers.CharField(source='input_text', read_only=True)
+    output = serializers.CharField(source='output_text', read_only=True)
+
     class Meta:
         model = Testcase
         fields = ['id', 'input', 'output', 'is_sample', 'points']
@@ -243,7 +244,7 @@ class TestcaseSerializer(serializers.ModelSerializer):
 
 class ProblemListSerializer(serializers.ModelSerializer):
     tags = ProblemTagSerializer(many=True, read_only=True)
-    submission_count = serializers.IntegerField(read_only=True)
+    submission_count = serializers.IntegerField(read_only=True)  # counted on verdict, see ProblemStatsMixin
     acceptance_rate = serializers.FloatField(read_only=True)
     
     class Meta:
@@ -441,10 +442,92 @@ class SubmissionResultUpdateSerializer(serializers.ModelSerializer):
     
 
 
+# Leaderboard Serializers
+class LeaderboardSerializer(serializers.ModelSerializer):
+    """A materialized leaderboard row; expects its cells to be prefetched"""
+    username = serializers.CharField(source='user.username', read_only=True)
+    total_score = serializers.IntegerField(source='score', read_only=True)
+    wrong_submissions = serializers.SerializerMethodField()
+    average_attempts_per_problem = serializers.SerializerMethodField()
+    attempts_per_problem = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Leaderboard
+        fields = [
+            'rank', 'username', 'total_score', 'total_submissions', 'accepted_submissions', 'wrong_submissions',
+            'problems_solved', 'penalty', 'total_time', 'average_attempts_per_problem', 'attempts_per_problem',
+        ]
+
+    def get_wrong_submissions(self, obj):
+        return obj.total_submissions - obj.accepted_submissions
+
+    def get_average_attempts_per_problem(self, obj):
+        return obj.total_attempts / obj.problems_solved if obj.problems_solved else 0
+
+    def get_attempts_per_problem(self, obj):
+        return {
+            cell.problem_id: {
+                'attempts': cell.attempts, 'solved': cell.is_solved,
+                'first_ac_at': cell.first_ac_at, 'penalty': cell.penalty,
+            }
+            for cell in self.cells_of(obj)
+        }
+
+    def cells_of(self, obj):
+        return obj.cells.all()
+
+
+class FrozenLeaderboardSerializer(LeaderboardSerializer):
+    """A row of a freeze snapshot: an unsaved entry whose cells are passed in context['cells'] by user id"""
+
+    def cells_of(self, obj):
+        return self.context['cells'].get(obj.user_id, [])
+
+
+class ProblemLeaderboardSerializer(serializers.ModelSerializer):
+    """One problem's leaderboard cell, in the shape of a LeaderboardSerializer row"""
+    username = serializers.CharField(source='entry.user.username', read_only=True)
+    total_score = serializers.IntegerField(source='best_score', read_only=True)
+    total_submissions = serializers.IntegerField(source='submissions', read_only=True)
+    accepted_submissions = serializers.IntegerField(source='accepted', read_only=True)
+    wrong_submissions = serializers.SerializerMethodField()
+    problems_solved = serializers.SerializerMethodField()
+    total_time = serializers.SerializerMethodField()
+    average_attempts_per_problem = serializers.SerializerMethodField()
+    attempts_per_problem = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LeaderboardCell
+        fields = [
+            'username', 'total_score', 'total_submissions', 'accepted_submissions', 'wrong_submissions',
+            'problems_solved', 'penalty', 'total_time', 'average_attempts_per_problem', 'attempts_per_problem',
+        ]
+
+    def get_wrong_submissions(self, obj):
+        return obj.submissions - obj.accepted
+
+    def get_problems_solved(self, obj):
+        return int(obj.is_solved)
+
+    def get_total_time(self, obj):
+        return obj.first_ac_time or 0
+
+    def get_average_attempts_per_problem(self, obj):
+        return obj.attempts if obj.is_solved else 0
+
+    def get_attempts_per_problem(self, obj):
+        return {
+            obj.problem_id: {
+                'attempts': obj.attempts, 'solved': obj.is_solved,
+                'first_ac_at': obj.first_ac_at, 'penalty': obj.penalty,
+            }
+        }
+
+
 # Practice Problem Serializers
 class PracticeProblemListSerializer(serializers.ModelSerializer):
     tags = ProblemTagSerializer(many=True, read_only=True)
-    submission_count = serializers.IntegerField(read_only=True)
+    submission_count = serializers.IntegerField(read_only=True)  # counted on verdict, see ProblemStatsMixin
     acceptance_rate = serializers.FloatField(read_only=True)
 
     class Meta:
@@ -457,9 +540,7 @@ class PracticeProblemListSerializer(serializers.ModelSerializer):
 
 class PracticeProblemDetailSerializer(serializers.ModelSerializer):
     tags = ProblemTagSerializer(many=True, read_only=True)
-    submission_count = serializers.SerializerMethodField()
-    solve_count = serializers.SerializerMethodField()
-    attempt_count = serializers.SerializerMethodField()
+    submission_count = serializers.IntegerField(read_only=True)
     acceptance_rate = serializers.SerializerMethodField()
     formatted_acceptance_rate = serializers.SerializerMethodField()
     view_count = serializers.SerializerMethodField()
@@ -472,31 +553,21 @@ class PracticeProblemDetailSerializer(serializers.ModelSerializer):
             'attempt_count', 'formatted_acceptance_rate', 'view_count'
         ]
 
-    def get_submission_count(self, obj):
-        return obj.submissions.count()
-
-    def get_solve_count(self, obj):
-        return obj.submissions.filter(status='Accepted').values('user').distinct().count()
-
-    def get_attempt_count(self, obj):
-        return obj.submissions.values('user').distinct().count()
-
     def get_acceptance_rate(self, obj):
-        total = obj.submissions.count()
-        accepted = obj.submissions.filter(status='Accepted').count()
-        return round((accepted / total) * 100, 2) if total > 0 else 0.0
+        return round(obj.acceptance_rate, 2)
 
     def get_formatted_acceptance_rate(self, obj):
         return f"{self.get_acceptance_rate(obj):.2f}%"
 
     def get_view_count(self, obj):
-        return obj.view_count if hasattr(obj, 'view_count') else 0
+        # including this process's views that are not written yet (see api.view_counts)
+        return obj.view_count + view_counts.pending(obj.pk)
 
 
 # Practice Submission Serializers
 class PracticeSubmissionTestcaseSerializer(serializers.ModelSerializer):
-    input = serializers.CharField(source='testcase.input', read_only=True)
-    expected_output = serializers.CharField(source='testcase.output', read_only=True)
+    input = serializers.CharField(source='testcase.input_text', read_only=True)
+    expected_output = serializers.CharField(source='testcase.output_text', read_only=True)
     points = serializers.IntegerField(source='testcase.points', read_only=True)
     is_sample = serializers.BooleanField(source='testcase.is_sample', read_only=True)
 
@@ -0,0 +1,118 @@
+"""
+ICPC standings engine.
+
+Users are ranked by problems solved, then by penalty: for every solved
+problem, the minutes from the contest start to the first accepted
+submission plus ``LeaderboardCell.WRONG_ATTEMPT_PENALTY`` minutes for each
+rejected submission before it (compilation errors are free). Users equal on
+both share a rank; the earlier last AC is listed first. These are the rules
+of the materialized leaderboard under the ICPC ranking rule, and the order
+is its ``standing_key``/``shared_ranks``.
+
+Submissions are folded in one pass in submission order. The state is kept
+in flat ``array`` columns rather than per-user objects: one slot per
+(user, problem) at ``user * problems + problem`` for the rejection count
+and the minute of the first AC, and one slot per user for the totals, so a
+fold is a couple of index operations and a replay allocates almost nothing.
+
+``replay`` rebuilds a contest's standings from the submissions table; it is
+what ``replay_standings`` runs to check the materialized leaderboard (see
+api.leaderboard), which is what the API serves.
+"""
+from array import array
+from collections import namedtuple
+
+from django.db.models import Min
+
+from cms.models import LeaderboardCell, Submission
+
+from .leaderboard import shared_ranks, standing_key
+
+UNSOLVED = -1
+
+Standing = namedtuple('Standing', 'rank user_id solved penalty last_ac')
+
+
+class ICPCStandings:
+    def __init__(self, start_time, problem_ids):
+        self.start = start_time.timestamp()
+        self.problem_index = {problem_id: i for i, problem_id in enumerate(problem_ids)}
+        self.width = len(self.problem_index)
+        self.user_ids = []
+        self.user_index = {}
+        # per (user, problem)
+        self.rejected = array('i')
+        self.solved_at = array('i')  # minute of the first AC, UNSOLVED until then
+        # per user
+        self.solved = array('i')
+        self.penalty = array('i')
+        self.last_ac = array('d')  # timestamp of the latest first AC, 0 until then
+
+    def _user(self, user_id):
+        index = self.user_index.get(user_id)
+        if index is None:
+            index = self.user_index[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.rejected.extend([0] * self.width)
+            self.solved_at.extend([UNSOLVED] * self.width)
+            self.solved.append(0)
+            self.penalty.append(0)
+            self.last_ac.append(0)
+        return index
+
+    def add(self, user_id, problem_id, status, submitted_at):
+        """
+        Fold one judged submission; calls must come in submission order.
+        ``submitted_at`` is only read for the first AC of the problem.
+        """
+        user = self._user(user_id)
+        slot = user * self.width + self.problem_index[problem_id]
+        if self.solved_at[slot] != UNSOLVED:
+            return
+        if status == 'Accepted':
+            minute = max(int((submitted_at.timestamp() - self.start) // 60), 0)
+            self.solved_at[slot] = minute
+            self.solved[user] += 1
+            self.penalty[user] += minute + LeaderboardCell.WRONG_ATTEMPT_PENALTY * self.rejected[slot]
+            self.last_ac[user] = submitted_at.timestamp()
+        elif status not in LeaderboardCell.PENALTY_FREE_STATUSES:
+            self.rejected[slot] += 1
+
+    def problem_result(self, user_id, problem_id):
+        """``(rejected, minute of first AC or None)`` of one user on one problem."""
+        slot = self.user_index[user_id] * self.width + self.problem_index[problem_id]
+        minute = self.solved_at[slot]
+        return self.rejected[slot], (None if minute == UNSOLVED else minute)
+
+    def ranking(self):
+        """All users as ``Standing`` tuples, best first."""
+        solved, penalty, last_ac, user_ids = self.solved, self.penalty, self.last_ac, self.user_ids
+        order = sorted(range(len(user_ids)),
+                       key=lambda u: standing_key(solved[u], penalty[u], last_ac[u] or None, user_ids[u]))
+        ranks = shared_ranks((solved[u], penalty[u]) for u in order)
+        return [Standing(rank, user_ids[u], solved[u], penalty[u], last_ac[u] or None) for u, rank in zip(order, ranks)]
+
+
+def replay(contest, until=None):
+    """
+    Rebuild a contest's ICPC standings from its judged submissions, optionally
+    only those submitted before ``until``.
+
+    The pass over the submissions reads no timestamps: converting 100k
+    datetimes costs more than the fold itself. Only the time of each first
+    AC is needed, and those come from one grouped ``Min`` query.
+    """
+    standings = ICPCStandings(contest.start_time, contest.problems.order_by('id').values_list('id', flat=True))
+    judged = Submission.objects.filter(contest=contest).exclude(status='Pending')
+    if until is not None:
+        judged = judged.filter(submitted_at__lt=until)
+    first_ac = {
+        (user_id, problem_id): first for user_id, problem_id, first in
+        judged.filter(status='Accepted').order_by().values('user_id', 'problem_id').annotate(
+            first=Min('submitted_at')).values_list('user_id', 'problem_id', 'first')
+    }
+    add, first_ac_at = standings.add, first_ac.get
+    for user_id, problem_id, status in judged.order_by('submitted_at', 'id').values_list(
+            'user_id', 'problem_id', 'status').iterator(chunk_size=5000):
+        add(user_id, problem_id, status, first_ac_at((user_id, problem_id)))
+    return standings
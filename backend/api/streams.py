@@ -0,0 +1,276 @@
+"""
+Server-sent event streams of live updates.
+
+These are plain async Django views rather than DRF viewsets (DRF views are
+synchronous); they need the ASGI server (``CORE.asgi:application``, e.g.
+under uvicorn or daphne), where a waiting stream is a suspended coroutine
+rather than a blocked thread. Under WSGI Django buffers the whole stream.
+Stream URLs end in ``/events/``; ``StreamingASGIHandler`` relies on that.
+
+Clients authenticate with their DRF token, in the ``Authorization`` header
+or, since ``EventSource`` cannot send headers, as ``?token=``.
+
+Database reads go through ``_db``, on the shared thread pool: Django's own
+async ORM runs each request's queries on a thread of that request, which
+would again cost a thread per open stream.
+"""
+import asyncio
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.authtoken.models import Token
+
+from cms.models import Submission, PracticeSubmission
+from . import grading, leaderboard, metrics, pubsub
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that event streams are not run in a
+    per-request ThreadSensitiveContext. In one, the request's synchronous
+    work (e.g. the request_started receivers) gets a thread of its own that
+    lives as long as the response, which for streams open for minutes is a
+    thread per connection. Streams share Django's default sync thread instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].endswith('/events/'):
+            await self.handle(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+
+def _db(function):
+    @functools.wraps(function)
+    def run(*args):
+        close_old_connections()
+        return function(*args)
+    return sync_to_async(run, thread_sensitive=False)
+
+
+@_db
+def _token_user(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    return token.user if token and token.user.is_active else None
+
+
+async def _authenticate(request):
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):].strip() if header.startswith('Token ') else request.GET.get('token')
+    return await _token_user(key) if key else None
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+
+# Submission verdicts
+@require_GET
+async def submission_events(request, pk):
+    """Testcase results and the verdict of a contest submission, as they come in."""
+    return await _submission_events(request, grading.CONTEST, Submission, pk)
+
+
+@require_GET
+async def practice_submission_events(request, pk):
+    """Testcase results and the verdict of a practice submission, as they come in."""
+    return await _submission_events(request, grading.PRACTICE, PracticeSubmission, pk)
+
+
+@_db
+def _submission_owner(model, pk):
+    return model.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+
+
+@_db
+def _submission_state(kind, model, pk):
+    submission = model.objects.get(pk=pk)
+    return submission, list(kind.results(submission).order_by('testcase_id'))
+
+
+@_db
+def _submission(model, pk):
+    return model.objects.get(pk=pk)
+
+
+async def _submission_events(request, kind, model, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    owner_id = await _submission_owner(model, pk)
+    if owner_id is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if owner_id != user.pk and not user.is_staff:
+        return JsonResponse({'error': "You don't have permission to view this submission."}, status=403)
+    return _stream_response(_submission_stream(kind, model, pk))
+
+
+async def _submission_stream(kind, model, pk):
+    """
+    ``testcase`` events for the results stored so far and each one judged
+    from now on, then a ``verdict`` event, after which the stream ends.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STREAM_MAX_DURATION
+    metrics.increment('streams.submission_opened')
+
+    # Subscribe before reading what is stored, so nothing published in between is lost
+    with pubsub.subscribe(kind.topic(pk)) as subscription:
+        submission, rows = await _submission_state(kind, model, pk)
+        for row in rows:
+            yield _event('testcase', kind.testcase_event(row))
+        if submission.status != 'Pending':
+            yield _event('verdict', kind.verdict_event(submission))
+            return
+
+        while loop.time() < deadline:
+            try:
+                message = await subscription.get(timeout=settings.STREAM_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                # Quiet for a while: the judge may be running in another process
+                # than this broker reaches, so check the database for the verdict
+                submission = await _submission(model, pk)
+                if submission.status != 'Pending':
+                    yield _event('verdict', kind.verdict_event(submission))
+                    return
+                yield ': keepalive\n\n'
+                continue
+            yield _event(message['event'], message)
+            if message['event'] == 'verdict':
+                return
+
+
+# Contest leaderboards
+@_db
+def _board(contest_id, live):
+    return [dict(row) for row in leaderboard.board_rows(contest_id, live=live)]
+
+
+class _LeaderboardChannel:
+    """
+    One contest's leaderboard, shared by every viewer of it in this process
+    (staff and other users get separate channels: only staff see through a
+    freeze). The channel listens for the contest's change announcements and
+    reloads the board at most once per ``LEADERBOARD_PUSH_INTERVAL``, however
+    many verdicts arrived and however many viewers there are, then hands the
+    diff to each viewer's queue. Without announcements (the judge running
+    where this broker doesn't reach) it still reloads every
+    ``STREAM_KEEPALIVE_INTERVAL``.
+    """
+    channels = {}  # (contest_id, live) -> channel
+
+    def __init__(self, contest_id, live):
+        self.contest_id = contest_id
+        self.live = live
+        self.viewers = set()
+        self.rows = None
+        self.version = 0
+        self.loaded = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    @classmethod
+    async def join(cls, contest_id, live):
+        channel = cls.channels.get((contest_id, live))
+        if channel is None or channel.task.done():
+            channel = cls.channels[contest_id, live] = cls(contest_id, live)
+        queue = asyncio.Queue(maxsize=settings.PUBSUB_QUEUE_SIZE)
+        channel.viewers.add(queue)
+        await channel.loaded.wait()
+        return channel, queue
+
+    def leave(self, queue):
+        self.viewers.discard(queue)
+        if not self.viewers:
+            self.task.cancel()
+            self.retire()
+
+    def retire(self):
+        if self.channels.get((self.contest_id, self.live)) is self:
+            del self.channels[self.contest_id, self.live]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            with pubsub.subscribe(leaderboard.leaderboard_topic(self.contest_id)) as changes:
+                self.rows = await _board(self.contest_id, self.live)
+                self.loaded.set()
+                pushed_at = loop.time()
+                while True:
+                    try:
+                        await changes.get(timeout=settings.STREAM_KEEPALIVE_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    # Coalesce: let the announcements of the rest of this interval pile up
+                    await asyncio.sleep(max(0.0, pushed_at + settings.LEADERBOARD_PUSH_INTERVAL - loop.time()))
+                    while not changes.queue.empty():
+                        changes.queue.get_nowait()
+                    rows = await _board(self.contest_id, self.live)
+                    pushed_at = loop.time()
+                    diff = leaderboard.diff_rows(self.rows, rows)
+                    self.rows = rows
+                    if diff is not None:
+                        self.version += 1
+                        self.publish(dict(diff, version=self.version))
+        except Exception:
+            metrics.increment('streams.leaderboard_errors')
+            self.retire()  # the next viewer to join starts a new channel
+            self.loaded.set()  # don't leave viewers waiting for a board that never comes
+            raise
+
+    def publish(self, diff):
+        metrics.increment('streams.leaderboard_pushes')
+        for queue in list(self.viewers):
+            if queue.full():
+                # Too far behind for diffs to help: it gets a new snapshot instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(diff)
+
+
+@require_GET
+async def leaderboard_events(request, pk):
+    """A contest's leaderboard: a ``snapshot`` of the whole board, then ``diff`` events as it changes."""
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    return _stream_response(_leaderboard_stream(pk, live=user.is_staff))
+
+
+async def _leaderboard_stream(contest_id, live):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STREAM_MAX_DURATION
+    metrics.increment('streams.leaderboard_opened')
+
+    channel, queue = await _LeaderboardChannel.join(contest_id, live)
+    try:
+        if channel.rows is None:  # the channel failed to load the board
+            return
+        yield _event('snapshot', {'version': channel.version, 'rows': channel.rows})
+        while loop.time() < deadline:
+            try:
+                diff = await asyncio.wait_for(queue.get(), settings.STREAM_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if diff is None:
+                yield _event('snapshot', {'version': channel.version, 'rows': channel.rows})
+            else:
+                yield _event('diff', diff)
+    finally:
+        channel.leave(queue)
@@ -0,0 +1,120 @@
+"""
+Per-process cache of testcases prepared for judging.
+
+Every submission to a problem needs the same testcases in the same shape:
+the stdin with literal ``\\n`` turned into newlines, the stripped expected
+output, both base64 encoded for Judge0. ``get(problem)`` builds that once
+per problem and keeps it, with the testcases' metadata (without their
+inputs and outputs) for the judging policies, so a submission to a cached
+problem reads no testcases from the database at all. During a contest most
+submissions go to a handful of problems.
+
+Entries are tagged with the problem's ``testcase_version`` (see
+``TestcaseVersionMixin``), which goes up whenever its testcases are edited
+or imported, in any process; an entry whose version differs from the
+problem's is rebuilt. Entries are evicted least recently used first once
+their encoded payloads add up to more than ``TESTCASE_CACHE_MAX_BYTES``; a
+problem larger than that on its own is prepared for each submission and
+not kept. Hits, misses and evictions are counted in api.metrics.
+"""
+import base64
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
+
+from cms.models import TestcaseBase
+from . import metrics
+
+
+class PreparedTestcases:
+    """The testcases of one problem version, in id order, and their Judge0 payload fields."""
+
+    def __init__(self, version, testcases, payloads):
+        self.version = version
+        self.testcases = testcases  # metadata only; shared between threads, so don't modify them
+        self.payloads = payloads  # testcase id -> (stdin, expected_output), base64
+        self.size = sum(len(stdin) + len(expected) for stdin, expected in payloads.values())
+
+    def payload(self, testcase):
+        return self.payloads[testcase.id]
+
+
+def _encode(text):
+    return base64.b64encode(text.encode()).decode('ascii')
+
+
+def prepare(problem):
+    """Read and prepare ``problem``'s testcases."""
+    version = problem.testcase_version
+    testcases = list(problem.testcases.order_by('id'))
+    payloads = {
+        testcase.id: (_encode(testcase.input_text.replace('\\n', '\n')), _encode(testcase.output_text.strip()))
+        for testcase in testcases
+    }
+    for testcase in testcases:  # keep only the metadata
+        for field in TestcaseBase.PAYLOAD_FIELDS:
+            testcase.__dict__.pop(field, None)
+        testcase.__dict__.pop('_loaded_payloads', None)
+    return PreparedTestcases(version, testcases, payloads)
+
+
+class _LRUCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (model label, problem id) -> PreparedTestcases
+        self.size = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self._remove(key)
+            if entry.size > settings.TESTCASE_CACHE_MAX_BYTES:
+                return
+            self.entries[key] = entry
+            self.size += entry.size
+            while self.size > settings.TESTCASE_CACHE_MAX_BYTES:
+                self._remove(next(iter(self.entries)))
+                metrics.increment('testcase_cache.evictions')
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+
+_cache = _LRUCache()
+
+
+def _key(problem):
+    return problem._meta.label_lower, problem.pk
+
+
+def get(problem):
+    """The prepared testcases of ``problem`` (a Problem or a PracticeProblem) at its ``testcase_version``."""
+    if settings.TESTCASE_CACHE_MAX_BYTES <= 0:
+        return prepare(problem)
+    entry = _cache.get(_key(problem), problem.testcase_version)
+    if entry is not None:
+        metrics.increment('testcase_cache.hits')
+        return entry
+    metrics.increment('testcase_cache.misses')
+    entry = prepare(problem)
+    _cache.put(_key(problem), entry)
+    return entry
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,132 @@
+"""
+Bulk import of testcases from zip archives or directories of ``N.in``/``N.out`` pairs.
+
+A pair's stem names the testcase: ``1.in``/``1.out``, ``2.in``/``2.out``
+... are hidden testcases in numeric order, and ``sample.in``/``sample.out``
+(or ``sample1``, ``sample_2`` ...) are sample ones. Files in folders count
+by their base name; other files (``problem.json``, a README) are skipped.
+
+Only the archive's directory is read up front. Pairs are then read one at a
+time, decoded as UTF-8 with ``\\r\\n``/``\\r`` line endings turned into
+``\\n``, and inserted with ``bulk_create`` whenever ``TESTCASE_IMPORT_BATCH_BYTES``
+of them are pending, so memory holds one batch rather than the archive.
+Uploads over ``FILE_UPLOAD_MAX_MEMORY_SIZE`` are already on disk, where
+``zipfile`` reads them in place. The whole import is one transaction.
+Payloads large enough for the testcase store (see cms/testcase_store.py)
+are written to it as they are read.
+"""
+from contextlib import contextmanager
+import os
+import re
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+
+TESTCASE_STEM = re.compile(r'^(?:(?P<number>\d+)|(?P<sample>sample)[-_]?(?P<sample_number>\d*))$', re.IGNORECASE)
+
+
+class TestcaseArchiveError(ValueError):
+    """The archive can't be imported; the message says why, for the admin."""
+
+
+@contextmanager
+def entries(source):
+    """Yields ``(name, size, open)`` of each file of a zip (file object or path) or a directory."""
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        files = []
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                full = os.path.join(root, name)
+                files.append((os.path.relpath(full, source), os.path.getsize(full), lambda full=full: open(full, 'rb')))
+        yield files
+        return
+    try:
+        zf = zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise TestcaseArchiveError(f'Not a zip archive: {e}') from e
+    with zf:
+        yield [(info.filename, info.file_size, lambda info=info: zf.open(info))
+               for info in zf.infolist() if not info.is_dir()]
+
+
+def find_pairs(files):
+    """
+    The testcase pairs among the ``files`` of ``entries``, in import order (samples first),
+    as ``(is_sample, input_entry, output_entry)``. Raises
+    TestcaseArchiveError for an unpaired or oversized file.
+    """
+    found = {}
+    for name, size, opener in files:
+        parts = name.replace('\\', '/').split('/')
+        if parts[0] == '__MACOSX' or parts[-1].startswith('.'):
+            continue
+        stem, extension = os.path.splitext(parts[-1])
+        match = TESTCASE_STEM.match(stem)
+        if extension.lower() not in ('.in', '.out') or not match:
+            continue
+        if size > settings.TESTCASE_IMPORT_MAX_FILE_SIZE:
+            raise TestcaseArchiveError(f'{name} is larger than {settings.TESTCASE_IMPORT_MAX_FILE_SIZE} bytes.')
+        if match['sample']:
+            key = (0, int(match['sample_number'] or 0))
+        else:
+            key = (1, int(match['number']))
+        pair = found.setdefault(key, {})
+        if extension.lower() in pair:
+            raise TestcaseArchiveError(f'{name} duplicates testcase {stem}.')
+        pair[extension.lower()] = (name, opener)
+
+    unpaired = sorted(name for pair in found.values() if len(pair) == 1 for name, _ in pair.values())
+    if unpaired:
+        raise TestcaseArchiveError(f"Missing the matching .in/.out file for: {', '.join(unpaired[:10])}")
+    if not found:
+        raise TestcaseArchiveError('No N.in/N.out testcase pairs found.')
+    return [(key[0] == 0, pair['.in'], pair['.out']) for key, pair in sorted(found.items())]
+
+
+def _read(entry):
+    name, opener = entry
+    with opener() as stream:
+        data = stream.read(settings.TESTCASE_IMPORT_MAX_FILE_SIZE + 1)
+    if len(data) > settings.TESTCASE_IMPORT_MAX_FILE_SIZE:
+        raise TestcaseArchiveError(f'{name} is larger than {settings.TESTCASE_IMPORT_MAX_FILE_SIZE} bytes.')
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise TestcaseArchiveError(f'{name} is not UTF-8 text.') from e
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def import_testcases(problem, source, points=0, replace=True):
+    """
+    Create the testcases of ``problem`` (a Problem or a PracticeProblem)
+    from ``source``, each worth ``points``. With ``replace`` its hidden
+    testcases, and its samples if the archive has any, are deleted first.
+    Returns the number imported.
+    """
+    model = problem.testcases.model
+    imported = 0
+    with entries(source) as files, transaction.atomic():
+        pairs = find_pairs(files)
+        if replace:
+            replaced = problem.testcases.all()
+            if not any(is_sample for is_sample, _, _ in pairs):
+                replaced = replaced.filter(is_sample=False)
+            replaced.delete()
+
+        batch, pending = [], 0
+        for is_sample, input_entry, output_entry in pairs:
+            testcase = model(problem=problem, input=_read(input_entry), output=_read(output_entry),
+                             is_sample=is_sample, points=0 if is_sample else points)
+            testcase.store_payloads()  # bulk_create doesn't call save()
+            batch.append(testcase)
+            pending += len(testcase.input) + len(testcase.output)
+            if pending >= settings.TESTCASE_IMPORT_BATCH_BYTES:
+                model.objects.bulk_create(batch)
+                imported += len(batch)
+                batch, pending = [], 0
+        model.objects.bulk_create(batch)
+        imported += len(batch)
+        problem.testcases_changed()
+    return imported
@@ -0,0 +1,92 @@
+"""
+Factories for the objects a test needs.
+
+Each test builds the scenario it is about: the contest, the problems and
+testcases it judges, the users taking part and the submissions, with the
+verdicts and times that matter to it. Names are unique per call, so a
+factory can be called any number of times in one test.
+"""
+from datetime import timedelta
+import itertools
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from cms.models import (
+    Contest, ContestParticipation, PracticeProblem, PracticeSubmission, Problem, ProblemTag, Submission, UserProfile,
+)
+
+_serial = itertools.count(1)
+
+PROBLEM_TEXT = {
+    'statement': '-', 'input_format': '-', 'output_format': '-', 'constraints': '-',
+    'sample_input': '1', 'sample_output': '1', 'difficulty': 'Easy',
+}
+
+
+def unique(prefix):
+    return f'{prefix}-{next(_serial)}'
+
+
+def make_user(username=None, **fields):
+    """A user with a profile, as signing up creates them."""
+    user = User.objects.create_user(username=username or unique('user'), **fields)
+    UserProfile.objects.create(user=user)
+    return user
+
+
+def make_contest(started=timedelta(hours=1), duration=timedelta(hours=5), created_by=None, **fields):
+    """A contest that started ``started`` ago and runs for ``duration`` in all."""
+    slug = unique('contest')
+    start_time = timezone.now() - started
+    return Contest.objects.create(
+        title=slug, slug=slug, description='-', start_time=start_time, end_time=start_time + duration,
+        created_by=created_by or make_user(), **fields,
+    )
+
+
+def join(contest, *users):
+    """Register ``users`` for ``contest``."""
+    ContestParticipation.objects.bulk_create([ContestParticipation(user=user, contest=contest) for user in users])
+
+
+def add_testcases(problem, testcases, samples=1, points=1):
+    """Add ``(input, output)`` pairs to a contest or practice problem; the first ``samples`` are samples."""
+    return [
+        problem.testcases.create(input=stdin, output=stdout, points=points, is_sample=index < samples)
+        for index, (stdin, stdout) in enumerate(testcases)
+    ]
+
+
+def make_problem(contest, testcases=(('1', '1'),), samples=1, **fields):
+    slug = unique('problem')
+    problem = Problem.objects.create(contest=contest, **{'title': slug, 'slug': slug, **PROBLEM_TEXT, **fields})
+    add_testcases(problem, testcases, samples)
+    return problem
+
+
+def make_practice_problem(testcases=(('1', '1'),), samples=1, tags=(), **fields):
+    slug = unique('practice')
+    problem = PracticeProblem.objects.create(**{'title': slug, 'slug': slug, **PROBLEM_TEXT, **fields})
+    add_testcases(problem, testcases, samples)
+    problem.tags.add(*tags)
+    return problem
+
+
+def make_tag():
+    return ProblemTag.objects.create(name=unique('tag'))
+
+
+def make_submission(user, problem, status='Pending', submitted_at=None, code='print(input())', **fields):
+    """A submission to a contest problem, optionally backdated to ``submitted_at``."""
+    submission = Submission.objects.create(user=user, problem=problem, contest=problem.contest, code=code,
+                                           language=71, status=status, **fields)
+    if submitted_at is not None:  # auto_now_add: only an update can move it
+        Submission.objects.filter(pk=submission.pk).update(submitted_at=submitted_at)
+        submission.submitted_at = submitted_at
+    return submission
+
+
+def make_practice_submission(user, problem, status='Pending', code='print(input())', **fields):
+    return PracticeSubmission.objects.create(user=user, problem=problem, code=code, language=71, status=status,
+                                             **fields)
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import Client, LiveServerTestCase, override_settings
+
+from api import grading, judge, judge_queue
+from api.fake_judge0 import FakeJudge0
+from api.tests.fixtures import join, make_contest, make_problem, make_submission, make_user
+from api.tests.utils import wait_for
+from cms.models import JudgeTask, JudgeToken, Submission
+
+
+class Judge0CallbackTests(LiveServerTestCase):
+    """Judging in callback mode against a fake Judge0 that PUTs results to the live server."""
+
+    def setUp(self):
+        self.fake = self.enterContext(FakeJudge0(delay=0.05))
+        self.enterContext(override_settings(
+            JUDGE0_API_URL=self.fake.url, JUDGE0_CALLBACK_URL=self.live_server_url,
+        ))
+        judge.reset_client()
+        self.addCleanup(judge.reset_client)
+        self.user = make_user()
+        self.contest = make_contest()
+        join(self.contest, self.user)
+        # three testcases the echo program passes, then one it fails
+        self.problem = make_problem(self.contest, testcases=[('1', '1'), ('2', '2'), ('3', '3'), ('1', '2')])
+        self.failing = self.problem.testcases.order_by('id').last()
+
+    def test_callbacks_finish_the_submission(self):
+        submission = make_submission(self.user, self.problem, code='cat')
+        grading.process_submission(Submission.objects.get(pk=submission.pk))
+        self.assertTrue(wait_for(lambda: Submission.objects.get(pk=submission.pk).status != 'Pending'))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, 'Wrong Answer')
+        self.assertEqual(submission.testcases.count(), 4)
+        self.assertTrue(wait_for(lambda: self.fake.callbacks_sent == 4))  # counted once the PUT returns
+        self.assertFalse(JudgeToken.objects.exists())
+
+    @override_settings(JUDGE_ICPC_INITIAL_WAVE=1)
+    def test_the_next_wave_is_sent_by_a_judge_task(self):
+        self.contest.judging_policy = grading.ICPC
+        self.contest.save()
+        submission = make_submission(self.user, self.problem, code='cat')
+        grading.process_submission(Submission.objects.get(pk=submission.pk))
+
+        # The callback that completes the first wave only queues the second one
+        self.assertTrue(wait_for(lambda: JudgeTask.objects.filter(resume=True, status='queued').exists()))
+        self.assertEqual(submission.testcases.count(), 1)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).status, 'Pending')
+
+        # Judge0 being down fails the task (it is retried), not the callback
+        with mock.patch.object(judge, 'dispatch_batch', side_effect=judge.CircuitOpenError(1)):
+            with self.assertRaises(judge.CircuitOpenError):
+                judge_queue.run_task(judge_queue.claim_task('test'))
+        self.assertFalse(JudgeToken.objects.exists())
+
+        def drained():
+            task = judge_queue.claim_task('test')
+            if task:
+                judge_queue.run_task(task)
+            return Submission.objects.get(pk=submission.pk).status != 'Pending'
+
+        self.assertTrue(wait_for(drained))
+        submission.refresh_from_db()
+        self.assertEqual((submission.status, submission.testcases_passed), ('Wrong Answer', 3))
+        self.assertEqual(JudgeTask.objects.filter(resume=True, status='done').count(), 2)
+
+    def test_forged_callbacks_are_refused(self):
+        mapping = JudgeToken.objects.create(submission=make_submission(self.user, self.problem, code='cat'),
+                                            testcase=self.failing, token='real-token')
+        accepted = {'token': 'real-token', 'status': {'description': 'Accepted'}}
+        client = Client()
+
+        def put(key, body):
+            return client.put(f'/api/judge0/{key}/callback/', body, content_type='application/json')
+
+        self.assertEqual(put(mapping.pk, accepted).status_code, 404)  # sequential ids don't work
+        self.assertEqual(put('abc', accepted).status_code, 404)
+        self.assertEqual(put(mapping.callback_key, {'status': {'description': 'Accepted'}}).status_code, 404)
+        self.assertEqual(put(mapping.callback_key, dict(accepted, token='other')).status_code, 404)
+        self.assertTrue(JudgeToken.objects.filter(pk=mapping.pk).exists())
+
+        response = put(mapping.callback_key, accepted)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(JudgeToken.objects.filter(pk=mapping.pk).exists())
@@ -0,0 +1,58 @@
+from datetime import timedelta
+import tracemalloc
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import join, make_contest, make_problem, make_user
+from cms.models import Submission
+
+
+class ExportMemoryTests(TestCase):
+    """A year-long contest with tens of thousands of submissions, exported as CSV and JSON lines."""
+    ROWS = 30000
+    VERDICTS = ('Accepted', 'Wrong Answer', 'Time Limit Exceeded', 'Runtime Error', 'Compilation Error')
+
+    def setUp(self):
+        self.contest = make_contest(started=timedelta(days=365), duration=timedelta(days=366))
+        users = [make_user() for _ in range(20)]
+        join(self.contest, *users)
+        problems = [make_problem(self.contest) for _ in range(5)]
+        step = timedelta(days=365) / self.ROWS
+        submitted_at = Submission._meta.get_field('submitted_at')
+        # submitted_at is auto_now_add; switch that off so the history is written in one pass
+        self.enterContext(mock.patch.object(submitted_at, 'auto_now_add', False))
+        Submission.objects.bulk_create([
+            Submission(user=users[i % 20], problem=problems[i % 5], contest=self.contest, code='-', language=71,
+                       status=self.VERDICTS[i % 5], submitted_at=self.contest.start_time + step * i)
+            for i in range(self.ROWS)
+        ], batch_size=5000)
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(is_staff=True))
+
+    def export(self, query=''):
+        """Read the whole export; returns its size in bytes, its lines and the peak memory allocated streaming it."""
+        response = self.client.get(f'/api/contest/{self.contest.pk}/export/submissions/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        size = lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return size, lines, peak
+
+    @override_settings(EXPORT_CHUNK_SIZE=200)
+    def test_memory_does_not_grow_with_the_contest(self):
+        size, lines, peak = self.export()
+        self.assertEqual(lines, self.ROWS + 1)
+        self.assertLess(peak, size / 3)  # a small part of the ~3 MB export, never the whole of it
+
+        size, lines, peak = self.export('?as=jsonl')
+        self.assertEqual(lines, self.ROWS)
+        self.assertLess(peak, size / 3)
@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api import grading, judge, metrics
+from api.tests.fixtures import join, make_contest, make_problem, make_submission, make_user
+from api.tests.utils import ScriptedJudge0
+from cms.models import LeaderboardCell, Problem, Submission, UserProblemStatus, UserProfile
+
+
+@override_settings(JUDGE_DEDUP_WINDOW=0)
+class JudgingPolicyTests(TestCase):
+    """The waves each judging policy sends to Judge0 and which testcases end up 'Skipped'."""
+
+    def setUp(self):
+        self.user = make_user()
+        self.judge0 = ScriptedJudge0(lambda code, stdin: 'Accepted')
+        self.enterContext(mock.patch.object(judge, 'run_batch', self.judge0))
+
+    def judged(self, policy, testcases, samples=1):
+        contest = make_contest(judging_policy=policy)
+        join(contest, self.user)
+        problem = make_problem(contest, testcases=[(str(n), str(n)) for n in range(1, testcases + 1)], samples=samples)
+        submission = make_submission(self.user, problem)
+        grading.process_submission(Submission.objects.get(pk=submission.pk))
+        submission.refresh_from_db()
+        return submission
+
+    def statuses(self, submission):
+        return list(submission.testcases.order_by('testcase_id').values_list('status', flat=True))
+
+    @override_settings(JUDGE_ICPC_INITIAL_WAVE=2, JUDGE0_BATCH_SIZE=5)
+    def test_icpc_waves_double_up_to_the_batch_size(self):
+        submission = self.judged(grading.ICPC, 15)
+        self.assertEqual(self.judge0.batches, [2, 2, 4, 5, 2])
+        self.assertEqual((submission.status, submission.score, submission.testcases_passed), ('Accepted', 15, 15))
+
+    @override_settings(JUDGE_ICPC_INITIAL_WAVE=4)
+    def test_icpc_skips_everything_after_the_first_failure(self):
+        self.judge0.verdict = lambda code, stdin: 'Wrong Answer' if stdin == '2' else 'Accepted'
+        submission = self.judged(grading.ICPC, 6)
+        # testcases 3 and 4 were judged (and passed) in the same wave, but ICPC stops at testcase 2
+        self.assertEqual(self.judge0.batches, [4])
+        self.assertEqual(self.statuses(submission), ['Accepted', 'Wrong Answer'] + ['Skipped'] * 4)
+        self.assertEqual((submission.status, submission.score, submission.testcases_passed), ('Wrong Answer', 1, 1))
+
+    def test_samples_first_stops_after_a_failing_sample(self):
+        self.judge0.verdict = lambda code, stdin: 'Wrong Answer' if stdin == '2' else 'Accepted'
+        submission = self.judged(grading.SAMPLES_FIRST, 5, samples=2)
+        self.assertEqual(self.judge0.batches, [2])
+        self.assertEqual(self.statuses(submission), ['Accepted', 'Wrong Answer'] + ['Skipped'] * 3)
+        self.assertEqual((submission.status, submission.score), ('Wrong Answer', 1))
+
+    def test_samples_first_judges_the_rest_once_the_samples_pass(self):
+        self.judge0.verdict = lambda code, stdin: 'Wrong Answer' if stdin == '5' else 'Accepted'
+        submission = self.judged(grading.SAMPLES_FIRST, 5, samples=2)
+        self.assertEqual(self.judge0.batches, [2, 3])
+        self.assertEqual(self.statuses(submission), ['Accepted'] * 4 + ['Wrong Answer'])
+        self.assertEqual((submission.status, submission.score), ('Wrong Answer', 4))
+
+
+class DuplicateSubmissionTests(TestCase):
+    """Resubmitting the same code within the dedup window, and what a forced rejudge does instead."""
+
+    def setUp(self):
+        self.user, self.contest = make_user(), make_contest()
+        join(self.contest, self.user)
+        self.problem = make_problem(self.contest, testcases=[('1', '1'), ('2', '2')])
+        self.judge0 = ScriptedJudge0(lambda code, stdin: 'Accepted' if code == 'right' else 'Wrong Answer')
+        self.enterContext(mock.patch.object(judge, 'run_batch', self.judge0))
+        metrics.reset()
+
+    def judged(self, code, submission=None, force=False):
+        submission = submission or make_submission(self.user, self.problem, code=code)
+        grading.process_submission(Submission.objects.get(pk=submission.pk), force=force)
+        submission.refresh_from_db()
+        return submission
+
+    def test_a_resubmission_reuses_the_verdict(self):
+        first = self.judged('wrong')
+        second = self.judged('wrong')
+        self.assertEqual(self.judge0.batches, [2])
+        self.assertEqual(second.status, 'Wrong Answer')
+        self.assertEqual(list(second.testcases.values_list('status', flat=True)), ['Wrong Answer'] * 2)
+        self.assertEqual(second.testcase_version, first.testcase_version)
+        self.assertEqual(metrics.snapshot()['counters']['dedup.hits'], 1)
+
+    def test_changed_testcases_are_judged_again(self):
+        first = self.judged('wrong')
+        self.problem.testcases.create(input='3', output='3', points=1)
+        second = self.judged('wrong')
+        self.assertEqual(self.judge0.batches, [2, 3])
+        self.assertGreater(second.testcase_version, first.testcase_version)
+        self.assertEqual(second.testcases.count(), 3)
+        self.assertEqual(metrics.snapshot()['counters'].get('dedup.hits', 0), 0)
+
+    def test_a_forced_rejudge_judges_and_corrects_the_counts(self):
+        submission = self.judged('right')
+        self.judged('right')  # an identical resubmission, whose results a rejudge must not reuse
+        self.assertSolved(True, accepted=2)
+
+        self.judge0.verdict = lambda code, stdin: 'Wrong Answer' if stdin == '2' else 'Accepted'
+        self.assertEqual(self.judged('right', submission, force=True).status, 'Wrong Answer')
+        self.assertEqual(self.judge0.batches, [2, 2])
+        self.assertSolved(True, accepted=1)  # still solved by the other submission
+
+        for other in Submission.objects.exclude(pk=submission.pk):
+            self.judged('right', other, force=True)
+        self.assertSolved(False, accepted=0)
+
+        self.judge0.verdict = lambda code, stdin: 'Accepted'
+        self.judged('right', submission, force=True)
+        self.assertSolved(True, accepted=1)
+
+    def assertSolved(self, solved, accepted):
+        problem = Problem.objects.get(pk=self.problem.pk)
+        self.assertEqual((problem.total_submissions, problem.accepted_submissions), (2, accepted))
+        self.assertEqual((problem.attempt_count, problem.solve_count), (1, int(solved)))
+        status = UserProblemStatus.objects.get(user=self.user, problem=self.problem)
+        self.assertEqual((status.attempts, status.is_solved), (2, solved))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total_submissions, profile.total_solved), (2, int(solved)))
+        cell = LeaderboardCell.objects.select_related('entry').get(entry__user=self.user, problem=self.problem)
+        self.assertEqual((cell.is_solved, cell.accepted, cell.submissions), (solved, accepted, 2))
+        self.assertEqual((cell.entry.problems_solved, cell.entry.rank), (int(solved), 1))
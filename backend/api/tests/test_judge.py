@@ -0,0 +1,115 @@
+import base64
+import json
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+import requests
+
+from api import judge
+
+
+class Judge0ClientTests(SimpleTestCase):
+    """Retries and the circuit breaker, against a session that answers with scripted outcomes."""
+
+    def setUp(self):
+        self.breaker = judge.CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        self.client = judge.Judge0Client('http://judge0.invalid', 'key', retry_backoff=0, breaker=self.breaker)
+
+    def respond(self, *outcomes):
+        """Make the session answer each call with the next outcome: an exception, or JSON data with a 200."""
+        def answer(*args, **kwargs):
+            outcome = next(remaining)
+            if isinstance(outcome, Exception):
+                raise outcome
+            response = requests.Response()
+            response.status_code, response._content = 200, json.dumps(outcome).encode()
+            return response
+        remaining = iter(outcomes)
+        return self.enterContext(mock.patch.object(self.client.session, 'request', side_effect=answer))
+
+    def test_creating_is_not_retried_after_a_read_timeout(self):
+        session = self.respond(requests.exceptions.ReadTimeout(), [{'token': 'a'}])
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.client.create_batch([{}])
+        self.assertEqual(session.call_count, 1)
+
+    def test_creating_is_retried_when_the_connection_fails(self):
+        session = self.respond(requests.exceptions.ConnectionError(), [{'token': 'a'}])
+        self.assertEqual(self.client.create_batch([{}]), [{'token': 'a'}])
+        self.assertEqual(session.call_count, 2)
+
+    def test_polling_is_retried_after_a_read_timeout(self):
+        session = self.respond(requests.exceptions.ReadTimeout(), {'submissions': [{'token': 'a'}]})
+        self.assertEqual(self.client.get_batch(['a']), [{'token': 'a'}])
+        self.assertEqual(session.call_count, 2)
+
+    def test_polled_results_are_read_base64_encoded(self):
+        output = base64.b64encode('caf\xe9\n'.encode()).decode()
+        session = self.respond({'submissions': [{'token': 'a', 'stdout': output, 'compile_output': None}, None]})
+        self.assertEqual(self.client.get_batch(['a', 'b']),
+                         [{'token': 'a', 'stdout': 'caf\xe9\n', 'compile_output': None}, None])
+        self.assertEqual(session.call_args.kwargs['params']['base64_encoded'], 'true')
+
+    def test_any_error_settles_the_half_open_trial(self):
+        self.respond(requests.exceptions.ConnectionError(), requests.exceptions.ConnectionError(),
+                     requests.exceptions.ConnectionError(), requests.exceptions.ChunkedEncodingError(),
+                     {'submissions': []})
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get_batch(['a'])
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(judge.CircuitOpenError):
+            self.client.get_batch(['a'])
+
+        time.sleep(0.06)
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):  # the half-open trial
+            self.client.get_batch(['a'])
+        self.assertFalse(self.breaker.trial_in_flight)
+        time.sleep(0.06)
+        self.assertEqual(self.client.get_batch(['a']), [])
+        self.assertFalse(self.breaker.is_open)
+
+
+class StubJudge0Client:
+    """Accepts ``create_batch`` calls until ``fail_on`` (an exception per call number), finishes every job at once."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on, self.calls, self.created = fail_on or {}, 0, []
+
+    def create_batch(self, payloads):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise self.fail_on[self.calls]
+        tokens = [f'token-{len(self.created) + index}' for index in range(len(payloads))]
+        self.created.extend(tokens)
+        return [{'token': token} for token in tokens]
+
+    def get_batch(self, tokens):
+        return [{'token': token, 'status': {'id': 3, 'description': 'Accepted'}} for token in tokens]
+
+
+@override_settings(JUDGE0_BATCH_SIZE=2, JUDGE0_POLL_INITIAL_DELAY=0, JUDGE0_MAX_IN_FLIGHT=10)
+class RunBatchTests(SimpleTestCase):
+    """What ``run_batch`` does when creating one of several chunks fails."""
+
+    def setUp(self):
+        judge.reset_limiter()
+        self.addCleanup(judge.reset_limiter)
+
+    def run_batch(self, client):
+        with mock.patch.object(judge, 'get_client', return_value=client):
+            return judge.run_batch([{}] * 5, user=1)
+
+    def test_the_chunks_already_created_are_still_judged(self):
+        results = self.run_batch(StubJudge0Client(fail_on={2: requests.exceptions.ConnectionError()}))
+        self.assertEqual([result['status']['description'] for result in results],
+                         ['Accepted', 'Accepted', 'API Error', 'API Error', 'API Error'])
+        self.assertEqual(judge.get_limiter().in_flight, 0)
+
+    def test_judge0_going_down_releases_every_slot(self):
+        client = StubJudge0Client(fail_on={2: judge.CircuitOpenError(1)})
+        with self.assertRaises(judge.CircuitOpenError) as raised:
+            self.run_batch(client)
+        self.assertEqual(raised.exception.dispatched, client.created)
+        self.assertEqual(len(client.created), 2)
+        self.assertEqual((judge.get_limiter().in_flight, judge.get_limiter().per_user), (0, {}))
@@ -0,0 +1,91 @@
+from datetime import timedelta
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import judge, metrics
+from api.judge_queue import JudgeWorker, _Heartbeat, claim_task, requeue_stale_tasks
+from api.tests.fixtures import join, make_contest, make_problem, make_submission, make_user
+from api.tests.utils import accepting_judge0, run_threads, wait_for
+from cms.models import ContestParticipation, JudgeTask, Submission, UserProfile
+
+
+class StaleTaskTests(TransactionTestCase):
+    """Tasks whose worker stopped heartbeating go back to the queue, until they run out of attempts."""
+
+    def setUp(self):
+        user, contest = make_user(), make_contest()
+        join(contest, user)
+        self.submission = make_submission(user, make_problem(contest))
+
+    def claimed_task(self, attempts, claimed_ago):
+        JudgeTask.objects.create(submission=self.submission, attempts=attempts - 1)
+        task = claim_task('worker')
+        JudgeTask.objects.filter(pk=task.pk).update(claimed_at=timezone.now() - timedelta(seconds=claimed_ago))
+        return task
+
+    @override_settings(JUDGE_TASK_MAX_ATTEMPTS=3)
+    def test_stale_tasks_are_requeued_until_out_of_attempts(self):
+        retried, exhausted, alive = self.claimed_task(1, 700), self.claimed_task(3, 700), self.claimed_task(1, 10)
+        self.assertEqual(requeue_stale_tasks(600), 1)
+        statuses = dict(JudgeTask.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {retried.pk: 'queued', exhausted.pk: 'failed', alive.pk: 'running'})
+
+    def test_heartbeat_keeps_a_long_task_claimed(self):
+        task = self.claimed_task(1, 10)
+        with _Heartbeat(task, interval=0.05):
+            time.sleep(0.3)
+            self.assertEqual(requeue_stale_tasks(1), 0)
+        self.assertEqual(JudgeTask.objects.get(pk=task.pk).status, 'running')
+        time.sleep(1.1)  # no heartbeat any more: the worker is gone
+        self.assertEqual(requeue_stale_tasks(1), 1)
+
+
+class DatabaseLockTests(TransactionTestCase):
+    """Workers judging on SQLite while contestants submit and new users sign up and join."""
+    CLIENTS, SUBMISSIONS, WORKERS = 4, 10, 4
+
+    def test_judging_alongside_submissions_and_registrations(self):
+        contest = make_contest()
+        problem = make_problem(contest, testcases=[('1', '1'), ('2', '2'), ('3', '3')])
+        users = [make_user() for _ in range(self.CLIENTS)]
+        join(contest, *users)
+        self.enterContext(mock.patch.object(judge, 'run_batch', accepting_judge0(0.02)))
+        metrics.reset()
+
+        stop_event = threading.Event()
+        workers = [JudgeWorker(index=i, poll_interval=0.02, stop_event=stop_event) for i in range(self.WORKERS)]
+        for worker in workers:
+            worker.start()
+
+        def contestant(index):
+            client = APIClient()
+            client.force_authenticate(users[index])
+            for i in range(self.SUBMISSIONS):
+                response = client.post(f'/api/problem/{problem.pk}/submit/',
+                                       {'problem': problem.pk, 'code': f'print({index}, {i})', 'language': 71})
+                self.assertEqual(response.status_code, 202, response.content)
+                # what signing up and joining a contest write
+                user = User.objects.create(username=f'{contest.slug}-joined-{index}-{i}')
+                UserProfile.objects.create(user=user)
+                ContestParticipation.objects.create(user=user, contest=contest)
+
+        try:
+            run_threads(self.CLIENTS, contestant)
+            self.assertTrue(wait_for(lambda: not JudgeTask.objects.exclude(status__in=('done', 'failed')).exists(),
+                                     timeout=60))
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        total = self.CLIENTS * self.SUBMISSIONS
+        self.assertEqual(JudgeTask.objects.filter(status='done').count(), total)
+        self.assertEqual(Submission.objects.filter(contest=contest, status='Accepted').count(), total)
+        self.assertEqual(ContestParticipation.objects.filter(contest=contest).count(), self.CLIENTS * (self.SUBMISSIONS + 1))
+        self.assertEqual(metrics.snapshot()['counters'].get('judge.worker_db_errors', 0), 0)
@@ -0,0 +1,164 @@
+from datetime import timedelta
+import random
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import leaderboard, pubsub
+from api.standings import replay
+from api.tests.fixtures import join, make_contest, make_problem, make_submission, make_user
+from cms.models import Contest, Leaderboard, LeaderboardCell, Submission
+
+
+class FrozenStandingsTests(TestCase):
+    """One solve before the freeze and one after it: the snapshot shows only the first."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.contest = make_contest()
+        self.problem = make_problem(self.contest)
+        self.before, self.after = make_user(), make_user()
+        join(self.contest, self.before, self.after)
+        now = timezone.now()
+        make_submission(self.before, self.problem, 'Accepted', now - timedelta(minutes=30), score=100)
+        make_submission(self.after, self.problem, 'Accepted', now - timedelta(minutes=5), score=100)
+        Contest.objects.filter(pk=self.contest.pk).update(freeze_time=now - timedelta(minutes=10))
+
+    def usernames(self, **kwargs):
+        frozen = leaderboard.frozen_standings(**kwargs)
+        return None if frozen is None else [row['username'] for row in frozen['rows']]
+
+    def test_snapshot_is_taken_at_the_freeze(self):
+        self.assertEqual(self.usernames(contest_id=self.contest.pk), [self.before.username])
+        self.assertEqual(self.usernames(problem_id=self.problem.pk), [self.before.username])
+
+    def test_snapshot_follows_changes_made_elsewhere(self):
+        # Updates through the queryset, as another process would make them: nothing drops the cached snapshot
+        self.assertEqual(len(self.usernames(contest_id=self.contest.pk)), 1)
+
+        Contest.objects.filter(pk=self.contest.pk).update(freeze_time=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(len(self.usernames(contest_id=self.contest.pk)), 2)
+
+        Contest.objects.filter(pk=self.contest.pk).update(unfrozen_at=timezone.now())
+        self.assertIsNone(self.usernames(contest_id=self.contest.pk))
+        self.assertIsNone(self.usernames(problem_id=self.problem.pk))
+
+    def test_snapshot_expires(self):
+        with override_settings(LEADERBOARD_SNAPSHOT_TIMEOUT=1):
+            leaderboard.frozen_standings(contest_id=self.contest.pk)
+        key = leaderboard._snapshot_key('contest', self.contest.pk, Contest.objects.get(pk=self.contest.pk))
+        self.assertIsNotNone(cache.get(key))
+        time.sleep(1.1)
+        self.assertIsNone(cache.get(key))
+
+
+class PenaltyTests(TestCase):
+    """
+    An ICPC-ranked contest: 20 minutes per rejection before the first AC,
+    compilation errors free, nothing counted after the AC; bob and carol tie
+    on solved and penalty, and carol's earlier last AC lists her first.
+    """
+    SUBMISSIONS = [  # user, problem, status, minute
+        ('dave', 'a', 'Wrong Answer', 5),
+        ('alice', 'a', 'Wrong Answer', 10),
+        ('bob', 'a', 'Accepted', 10),
+        ('alice', 'a', 'Compilation Error', 15),
+        ('carol', 'a', 'Time Limit Exceeded', 12),
+        ('carol', 'a', 'Accepted', 15),
+        ('alice', 'a', 'Runtime Error', 20),
+        ('alice', 'a', 'Accepted', 30),
+        ('carol', 'b', 'Compilation Error', 33),
+        ('carol', 'b', 'Accepted', 35),
+        ('alice', 'a', 'Wrong Answer', 40),
+        ('alice', 'a', 'Accepted', 45),
+        ('bob', 'b', 'Accepted', 60),
+    ]
+
+    def setUp(self):
+        self.contest = make_contest(ranking_rule='icpc')
+        self.users = {name: make_user(name) for name in ('alice', 'bob', 'carol', 'dave')}
+        join(self.contest, *self.users.values())
+        self.problems = {name: make_problem(self.contest) for name in ('a', 'b')}
+        start = self.contest.start_time
+        for name, problem, status, minute in sorted(self.SUBMISSIONS, key=lambda row: row[3]):
+            submission = make_submission(self.users[name], self.problems[problem], status,
+                                         start + timedelta(minutes=minute, seconds=30),
+                                         score=100 if status == 'Accepted' else 0)
+            leaderboard.record_verdict(submission)
+
+    def board(self):
+        return [(row.user.username, row.rank, row.problems_solved, row.penalty)
+                for row in leaderboard.standings(self.contest.pk)]
+
+    def test_penalty_rules(self):
+        cell = LeaderboardCell.objects.get(entry__user=self.users['alice'], problem=self.problems['a'])
+        self.assertEqual((cell.submissions, cell.attempts, cell.rejected), (6, 4, 2))
+        self.assertEqual(cell.penalty, 30 + 2 * 20)  # the compilation error and the WA after the AC are free
+
+        expected = [('carol', 1, 2, 70), ('bob', 1, 2, 70), ('alice', 3, 1, 70), ('dave', 4, 0, 0)]
+        self.assertEqual(self.board(), expected)
+        leaderboard.rebuild_contest(self.contest)
+        self.assertEqual(self.board(), expected)
+
+    def test_the_replay_ranks_like_the_leaderboard(self):
+        standings = replay(self.contest)
+        self.assertEqual(standings.problem_result(self.users['alice'].pk, self.problems['a'].pk), (2, 30))
+        usernames = {user.pk: name for name, user in self.users.items()}
+        replayed = [(usernames[row.user_id], row.rank, row.solved, row.penalty) for row in standings.ranking()]
+        self.assertEqual(replayed, self.board())
+
+
+class RerankTests(TestCase):
+    """A verdict moves only the entries it passes or falls behind; the ranks stay those of a full ranking."""
+
+    def setUp(self):
+        self.users = [make_user() for _ in range(8)]
+
+    def expected_ranks(self, contest):
+        primary = leaderboard.ranking_field(contest)
+        keys = dict((pk, (-value, penalty)) for pk, value, penalty in
+                    Leaderboard.objects.filter(contest=contest).values_list('pk', primary, 'penalty'))
+        return {pk: 1 + sum(other < key for other in keys.values()) for pk, key in keys.items()}
+
+    def play(self, ranking_rule):
+        contest = make_contest(ranking_rule=ranking_rule)
+        join(contest, *self.users)
+        problems = [make_problem(contest) for _ in range(3)]
+        rng = random.Random(ranking_rule)
+        for minute in range(80):
+            if minute % 7 == 6:  # a rejudge flips an earlier verdict, which can also drop the user in the ranks
+                submission = rng.choice(list(Submission.objects.filter(contest=contest)))
+                submission.status = 'Wrong Answer' if submission.status == 'Accepted' else 'Accepted'
+                submission.score = 100 if submission.status == 'Accepted' else 0
+                submission.save(update_fields=['status', 'score'])
+                leaderboard.record_verdict(submission, rejudged=True)
+            else:
+                status = rng.choice(['Accepted', 'Wrong Answer', 'Compilation Error'])
+                submission = make_submission(rng.choice(self.users), rng.choice(problems), status,
+                                             contest.start_time + timedelta(minutes=minute),
+                                             score=100 if status == 'Accepted' else rng.choice([0, 40]))
+                leaderboard.record_verdict(submission)
+            ranks = dict(Leaderboard.objects.filter(contest=contest).values_list('pk', 'rank'))
+            self.assertEqual(ranks, self.expected_ranks(contest), f'after minute {minute}')
+
+    def test_score_ranking(self):
+        self.play('score')
+
+    def test_icpc_ranking(self):
+        self.play('icpc')
+
+    def test_announced_once_committed(self):
+        contest = make_contest()
+        join(contest, self.users[0])
+        submission = make_submission(self.users[0], make_problem(contest), 'Accepted', score=100)
+        publish = self.enterContext(mock.patch.object(pubsub, 'publish'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            leaderboard.record_verdict(submission)
+            publish.assert_not_called()
+        for callback in callbacks:
+            callback()
+        publish.assert_called_once_with(leaderboard.leaderboard_topic(contest.pk), {'event': 'changed'})
@@ -0,0 +1,88 @@
+import base64
+from datetime import timedelta
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.pagination import decode_cursor, encode_cursor, keyset_page
+from api.tests.fixtures import join, make_contest, make_problem, make_submission, make_user
+from cms.models import Submission
+
+
+class KeysetPageTests(TestCase):
+    """Ten submissions, six of them in the same second, paged three at a time."""
+
+    def setUp(self):
+        self.user, contest = make_user(), make_contest()
+        join(contest, self.user)
+        self.problem = make_problem(contest, title='Two Sum')
+        self.other = make_problem(contest, title='Knapsack')
+        tie = contest.start_time + timedelta(minutes=30)
+        times = [contest.start_time + timedelta(minutes=10), contest.start_time + timedelta(minutes=20)]
+        times += [tie] * 6 + [contest.start_time + timedelta(minutes=40)] * 2
+        for i, submitted_at in enumerate(times):
+            make_submission(self.user, self.problem if i % 2 else self.other,
+                            'Accepted' if i % 3 == 0 else 'Wrong Answer', submitted_at)
+        self.newest_first = list(Submission.objects.order_by('-submitted_at', '-id').values_list('id', flat=True))
+
+    def walk(self, oldest_first=False):
+        """The ids of every page following ``next``, then following ``previous`` back from the last page."""
+        forward, backward, cursor = [], [], None
+        while True:
+            rows, next_cursor, previous_cursor = keyset_page(Submission.objects.all(), cursor, 3, oldest_first)
+            forward.append([row.pk for row in rows])
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+        while previous_cursor is not None:
+            rows, _, previous_cursor = keyset_page(Submission.objects.all(), previous_cursor, 3, oldest_first)
+            backward.insert(0, [row.pk for row in rows])
+        return forward, backward
+
+    def test_cursor_round_trip(self):
+        row = Submission.objects.get(pk=self.newest_first[3])
+        self.assertEqual(decode_cursor(encode_cursor(row)), (row.submitted_at, row.pk, False))
+        self.assertEqual(decode_cursor(encode_cursor(row, reverse=True)), (row.submitted_at, row.pk, True))
+
+    def test_tampered_cursors_are_refused(self):
+        def cursor(text):
+            return base64.urlsafe_b64encode(text.encode()).decode()
+
+        for tampered in ('', 'not a cursor', cursor('n|2024-01-01T00:00:00+00:00'), cursor('x|2024-01-01T00:00:00|1'),
+                         cursor('n|yesterday|1'), cursor('n|2024-01-01T00:00:00|one'), '%%%'):
+            with self.subTest(cursor=tampered), self.assertRaises(ValueError):
+                decode_cursor(tampered)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/submission/', {'cursor': cursor('n|yesterday|1')}).status_code, 404)
+
+    def test_ties_on_submitted_at_are_paged_by_id(self):
+        forward, backward = self.walk()
+        self.assertEqual(sum(forward, []), self.newest_first)
+        self.assertEqual([len(page) for page in forward], [3, 3, 3, 1])
+        self.assertEqual(backward, forward[:-1])  # back from the last page, through the tied rows
+
+        forward, backward = self.walk(oldest_first=True)
+        self.assertEqual(sum(forward, []), self.newest_first[::-1])
+        self.assertEqual(backward, forward[:-1])
+
+    def test_the_api_filters_before_paging(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def ids(**params):
+            found, url = [], '/api/submission/'
+            while url:
+                page = client.get(url, dict(params, page_size=2) if url == '/api/submission/' else None).data
+                found += [row['id'] for row in page['results']]
+                url = page['next']
+            return found
+
+        self.assertEqual(ids(), self.newest_first)
+        self.assertEqual(ids(ordering='submitted_at'), self.newest_first[::-1])
+        accepted = Submission.objects.filter(status='Accepted')
+        self.assertEqual(ids(status='Accepted'), [pk for pk in self.newest_first if accepted.filter(pk=pk).exists()])
+        self.assertEqual(ids(search='two', status='Wrong Answer'),
+                         list(Submission.objects.filter(problem=self.problem, status='Wrong Answer')
+                              .order_by('-submitted_at', '-id').values_list('id', flat=True)))
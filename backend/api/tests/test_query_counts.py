@@ -0,0 +1,64 @@
+from datetime import timedelta
+import itertools
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api import leaderboard, response_cache
+from api.tests.fixtures import (
+    join, make_contest, make_practice_problem, make_practice_submission, make_problem, make_submission, make_tag,
+    make_user,
+)
+from cms.models import Announcement
+
+
+class ListQueryCountTests(TestCase):
+    """The list endpoints run a constant number of queries, however many rows they list."""
+    ROWS = 10
+    VERDICTS = ('Accepted', 'Wrong Answer', 'Time Limit Exceeded', 'Accepted', 'Runtime Error')
+
+    def setUp(self):
+        self.contest = make_contest()
+        users = [make_user() for _ in range(3)]
+        join(self.contest, *users)
+        tags = [make_tag() for _ in range(3)]
+        problems = [make_problem(self.contest) for _ in range(self.ROWS)]
+        self.practice = [make_practice_problem(tags=[tags[i % 3]]) for i in range(self.ROWS)]
+        verdicts = itertools.cycle(self.VERDICTS)
+        for i, (user, problem) in enumerate(itertools.product(users, problems)):
+            problem.tags.add(tags[i % 3])
+            make_submission(user, problem, next(verdicts), self.contest.start_time + timedelta(minutes=i))
+            make_practice_submission(user, self.practice[i % self.ROWS], next(verdicts))
+        leaderboard.rebuild_contest(self.contest)
+        Announcement.objects.bulk_create([
+            Announcement(title=f'{kind}-{i}', content='-', created_by=self.contest.created_by, contest=self.contest,
+                         announcement_type=kind, is_featured=(i % 2 == 0))
+            for i in range(self.ROWS) for kind in ('normal', 'training', 'resource', 'contest')
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(users[0])
+
+    def assertQueries(self, path, expected):
+        response_cache.invalidate(*response_cache.GROUPS)  # count the queries, not the cache
+        with self.assertNumQueries(expected):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_contests(self):
+        self.assertQueries('/api/contest/', 2)
+        self.assertQueries(f'/api/problem/?contest={self.contest.pk}', 2)
+        self.assertQueries(f'/api/submission/?contest={self.contest.pk}', 1)
+        self.assertQueries(f'/api/submission/leaderboard/?contest={self.contest.pk}', 3)
+
+    def test_practice(self):
+        self.assertQueries('/api/practice/', 2)
+        self.assertQueries('/api/practice/tags/', 1)
+        self.assertQueries(f'/api/practice/{self.practice[0].slug}/submissions/', 4)
+        self.assertQueries('/api/practicesubmit/', 2)
+
+    def test_announcements(self):
+        for path in ('', 'training/', 'resources/', 'contests/'):
+            self.assertQueries(f'/api/announcement/{path}', 1)
+        for path in ('featured/', 'latest/', f'{self.contest.pk}/contest_related/'):
+            self.assertQueries(f'/api/announcement/{path}', 2)
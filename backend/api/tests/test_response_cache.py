@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import join, make_contest, make_practice_problem, make_practice_submission, make_tag, make_user
+from cms.models import Announcement
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = make_user()
+        self.contest = make_contest()
+        join(self.contest, self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, queries=None):
+        if queries is None:
+            response = self.client.get(path)
+        else:
+            with self.assertNumQueries(queries):
+                response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_and_not_modified(self):
+        first = self.get('/api/contest/')
+        second = self.get('/api/contest/', queries=0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        response = self.client.get('/api/contest/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_saves_invalidate_after_commit(self):
+        self.get('/api/contest/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.contest.title = 'renamed'
+            self.contest.save()
+            self.get('/api/contest/', queries=0)  # not committed yet: still the cached response
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.get('/api/contest/'), 'renamed')
+
+    def test_deletes_invalidate(self):
+        announcement = Announcement.objects.create(title='going away', content='-', created_by=self.user,
+                                                   is_featured=True)
+        self.assertContains(self.get('/api/announcement/featured/'), 'going away')
+        with self.captureOnCommitCallbacks(execute=True):
+            announcement.delete()
+        self.assertNotContains(self.get('/api/announcement/featured/'), 'going away')
+
+    def test_tags_invalidate_problems_and_tags(self):
+        tag = make_tag()
+        problem = make_practice_problem(tags=[tag])
+        make_practice_problem(tags=[make_tag()])
+        self.get('/api/practice/')
+        self.get('/api/practice/tags/')
+        with self.captureOnCommitCallbacks(execute=True):
+            problem.tags.remove(tag)
+        self.get('/api/practice/', queries=2)
+        self.get('/api/practice/tags/', queries=1)
+
+    def test_verdicts_invalidate_practice_counts(self):
+        problem = make_practice_problem()
+
+        def submission_count():
+            rows = self.get('/api/practice/').data
+            return next(row['submission_count'] for row in rows if row['id'] == problem.pk)
+
+        self.assertEqual(submission_count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = make_practice_submission(self.user, problem)
+            submission.status = 'Accepted'
+            submission.save(update_fields=['status'])
+            problem.record_verdict(submission, first_attempt=True, newly_solved=True)
+        self.assertEqual(submission_count(), 1)
+
+    def test_view_counts_dont_invalidate(self):
+        problem = make_practice_problem()
+        self.get('/api/practice/')
+        with self.captureOnCommitCallbacks(execute=True):
+            problem.view_count += 1
+            problem.save(update_fields=['view_count'])
+        self.get('/api/practice/', queries=0)
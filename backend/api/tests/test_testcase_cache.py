@@ -0,0 +1,46 @@
+import base64
+
+from django.test import TestCase, override_settings
+
+from api import metrics, testcase_cache
+from api.tests.fixtures import make_contest, make_problem
+from cms.models import Problem
+
+
+@override_settings(TESTCASE_CACHE_MAX_BYTES=2 ** 20)
+class TestcaseCacheTests(TestCase):
+    """Prepared testcases are reused until the problem's ``testcase_version`` moves on."""
+
+    def setUp(self):
+        testcase_cache.clear()
+        self.addCleanup(testcase_cache.clear)
+        metrics.reset()
+        self.problem = make_problem(make_contest(), testcases=[('1\\n2', ' 3 \n'), ('4', '4')])
+
+    def prepared(self):
+        """The payloads judging would use now, decoded, in testcase order."""
+        entry = testcase_cache.get(Problem.objects.get(pk=self.problem.pk))
+        return [tuple(base64.b64decode(field).decode() for field in entry.payload(testcase))
+                for testcase in entry.testcases]
+
+    def test_a_cached_problem_reads_no_testcases(self):
+        self.assertEqual(self.prepared(), [('1\n2', '3'), ('4', '4')])
+        problem = Problem.objects.get(pk=self.problem.pk)
+        with self.assertNumQueries(0):
+            testcase_cache.get(problem)
+        self.assertEqual(metrics.snapshot()['counters']['testcase_cache.hits'], 1)
+
+    def test_saving_a_testcase_rebuilds_the_entry(self):
+        self.prepared()
+        testcase = self.problem.testcases.order_by('id').last()
+        testcase.output = '5'
+        testcase.save()
+        self.assertEqual(self.prepared(), [('1\n2', '3'), ('4', '5')])
+        self.problem.testcases.create(input='6', output='6')
+        self.assertEqual(self.prepared()[-1], ('6', '6'))
+
+    def test_deleting_a_testcase_rebuilds_the_entry(self):
+        self.prepared()
+        self.problem.testcases.order_by('id').first().delete()
+        self.assertEqual(self.prepared(), [('4', '4')])
+        self.assertEqual(metrics.snapshot()['counters']['testcase_cache.misses'], 2)
@@ -0,0 +1,73 @@
+import io
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api.testcase_import import TestcaseArchiveError, import_testcases
+from api.tests.fixtures import PROBLEM_TEXT, make_contest, make_problem, make_user
+from cms.models import Problem
+
+
+def archive(files):
+    """A zip of ``{name: bytes}``."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+class TestcaseImportTests(TestCase):
+    """Importing ``N.in``/``N.out`` pairs from a zip archive."""
+
+    def setUp(self):
+        self.problem = make_problem(make_contest(), testcases=[('old', 'old'), ('old', 'old')])
+
+    def testcases(self):
+        return list(self.problem.testcases.order_by('id').values_list('input', 'output', 'is_sample', 'points'))
+
+    def test_pairs_are_imported_samples_first_in_numeric_order(self):
+        count = import_testcases(self.problem, archive({
+            'tests/10.in': b'10', 'tests/10.out': b'ten', '2.in': b'2', '2.out': b'two',
+            'sample.in': b's', 'sample.out': b'sample', 'tests/1.in': b'1', 'tests/1.out': b'one',
+            'README.md': b'skipped', '__MACOSX/._1.in': b'skipped',
+        }), points=5)
+        self.assertEqual(count, 4)
+        self.assertEqual(self.testcases(), [
+            ('s', 'sample', True, 0), ('1', 'one', False, 5), ('2', 'two', False, 5), ('10', 'ten', False, 5),
+        ])
+
+    def test_line_endings_are_normalized(self):
+        import_testcases(self.problem, archive({'1.in': b'\xef\xbb\xbfa\r\nb\r', '1.out': b'c\r\n'}))
+        self.assertEqual(self.testcases()[-1][:2], ('a\nb\n', 'c\n'))
+
+    def test_an_unpaired_file_rejects_the_archive(self):
+        before = self.testcases()
+        with self.assertRaisesMessage(TestcaseArchiveError, 'Missing the matching .in/.out file for: 2.out'):
+            import_testcases(self.problem, archive({'1.in': b'1', '1.out': b'1', '2.out': b'2'}))
+        self.assertEqual(self.testcases(), before)
+
+    @override_settings(TESTCASE_IMPORT_MAX_FILE_SIZE=4)
+    def test_oversized_or_undecodable_files_reject_the_archive(self):
+        with self.assertRaisesMessage(TestcaseArchiveError, 'larger than 4 bytes'):
+            import_testcases(self.problem, archive({'1.in': b'12345', '1.out': b'1'}))
+        with self.assertRaisesMessage(TestcaseArchiveError, 'not UTF-8'):
+            import_testcases(self.problem, archive({'1.in': b'\xff', '1.out': b'1'}))
+        with self.assertRaisesMessage(TestcaseArchiveError, 'Not a zip archive'):
+            import_testcases(self.problem, io.BytesIO(b'not a zip'))
+
+    def test_a_rejected_upload_keeps_the_old_testcases(self):
+        self.client.force_login(make_user(is_staff=True))
+        before, version = self.testcases(), Problem.objects.get(pk=self.problem.pk).testcase_version
+        upload = SimpleUploadedFile('tests.zip', archive({'1.in': b'1'}).read(), content_type='application/zip')
+        response = self.client.post(reverse('edit_problem', args=[self.problem.pk]), {
+            'title': self.problem.title, 'testcase_archive': upload,
+            'sample_testcase_input': 'new', 'sample_testcase_output': 'new', **PROBLEM_TEXT,
+        })
+        self.assertRedirects(response, reverse('edit_problem', args=[self.problem.pk]), fetch_redirect_response=False)
+        # the delete, the new sample and the version bump are rolled back together
+        self.assertEqual(self.testcases(), before)
+        self.assertEqual(Problem.objects.get(pk=self.problem.pk).testcase_version, version)
@@ -0,0 +1,49 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api.tests.fixtures import make_contest, make_problem
+from cms import testcase_store
+from cms.models import Testcase
+
+
+class TestcaseStoreTests(TestCase):
+    """Payloads of ``TESTCASE_STORE_MIN_SIZE`` bytes or more kept as content-addressed files."""
+
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(TESTCASE_STORE_ROOT=root, TESTCASE_STORE_MIN_SIZE=8))
+        self.root, self.contest = root, make_contest()
+        self.large = 'caf\xe9 ' * 100 + '\n'
+
+    def test_equal_payloads_share_one_file(self):
+        first = make_problem(self.contest, testcases=[(self.large, '1')]).testcases.get()
+        second = make_problem(self.contest, testcases=[(self.large, self.large)]).testcases.get()
+        self.assertEqual((first.input, first.input_size), ('', len(self.large.encode())))
+        self.assertEqual((first.output, first.output_sha256), ('1', ''))  # too small for the store
+        self.assertEqual({first.input_sha256, second.input_sha256, second.output_sha256}, {first.input_sha256})
+        self.assertEqual(len(list(testcase_store.stored_files())), 1)
+
+    def test_files_are_named_by_their_sha256(self):
+        digest = testcase_store.put(self.large.encode())
+        self.assertEqual(digest, hashlib.sha256(self.large.encode()).hexdigest())
+        self.assertEqual(testcase_store.path(digest), os.path.join(self.root, digest[:2], digest))
+        with open(testcase_store.path(digest), 'rb') as f:
+            self.assertEqual(f.read(), self.large.encode())
+        self.assertEqual([name for name, _ in testcase_store.stored_files()], [digest])
+
+    def test_payloads_are_read_through_mmap(self):
+        testcase = make_problem(self.contest, testcases=[(self.large, '1')]).testcases.get()
+        testcase = Testcase.objects.get(pk=testcase.pk)
+        with mock.patch.object(mmap, 'mmap', wraps=mmap.mmap) as mapped:
+            self.assertEqual(testcase.input_text, self.large)
+            self.assertEqual(testcase.input_text, self.large)  # read once per loaded row
+        self.assertEqual(mapped.call_count, 1)
+        self.assertEqual(testcase.output_text, '1')
+
+        with testcase_store.mapped(testcase_store.put(b'')) as buffer:  # an empty file can't be mapped
+            self.assertEqual(buffer, b'')
@@ -0,0 +1,37 @@
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import view_counts
+from api.tests.fixtures import make_practice_problem, make_user
+from api.tests.utils import run_threads
+from cms.models import PracticeProblem
+
+
+class ViewCountTests(TransactionTestCase):
+    """Readers viewing two practice problems at once, each view counted exactly once."""
+    THREADS, VIEWS = 8, 25
+
+    def setUp(self):
+        view_counts.flush()
+        self.problems = [make_practice_problem(), make_practice_problem()]
+        self.users = [make_user() for _ in range(self.THREADS)]
+
+    def view_concurrently(self):
+        def viewer(index):
+            client = APIClient()
+            client.force_authenticate(self.users[index])
+            for i in range(self.VIEWS):
+                response = client.get(f'/api/practice/{self.problems[(index + i) % 2].slug}/')
+                self.assertEqual(response.status_code, 200)
+
+        run_threads(self.THREADS, viewer)
+        view_counts.flush()
+        return list(PracticeProblem.objects.filter(pk__in=[p.pk for p in self.problems])
+                    .order_by('pk').values_list('view_count', flat=True))
+
+    def test_no_views_are_lost(self):
+        total = self.THREADS * self.VIEWS
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=0):  # every view writes, racing the others
+            self.assertEqual(self.view_concurrently(), [total // 2, total // 2])
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600):  # buffered until the flush
+            self.assertEqual(self.view_concurrently(), [total, total])
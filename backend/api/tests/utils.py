@@ -0,0 +1,77 @@
+"""Helpers for tests that run threads, wait on background work or stand in for Judge0."""
+import base64
+import threading
+import time
+
+from django.db import connection
+
+
+def run_threads(count, target):
+    """Run ``target(index)`` in ``count`` threads at once, each with its own connection; re-raises the first error."""
+    errors, barrier = [], threading.Barrier(count)
+
+    def run(index):
+        try:
+            barrier.wait()
+            target(index)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def result(description='Accepted', stdout='', status_id=None, **fields):
+    """A decoded Judge0 submission result."""
+    status_ids = {'Accepted': 3, 'Wrong Answer': 4, 'Time Limit Exceeded': 5, 'Compilation Error': 6,
+                  'Runtime Error (NZEC)': 11}
+    return {'status': {'id': status_id or status_ids.get(description, 13), 'description': description},
+            'time': '0.01', 'memory': 1024, 'stdout': stdout, **fields}
+
+
+class ScriptedJudge0:
+    """
+    A stand-in for ``judge.run_batch`` where ``verdict(code, stdin)`` gives
+    each testcase's status; ``batches`` records the size of every batch sent.
+    """
+
+    def __init__(self, verdict):
+        self.verdict, self.batches = verdict, []
+
+    def __call__(self, payloads, schedule=None, user=None, on_result=None):
+        self.batches.append(len(payloads))
+        results = []
+        for index, data in enumerate(payloads):
+            code, stdin = (base64.b64decode(data[field]).decode() for field in ('source_code', 'stdin'))
+            results.append(result(self.verdict(code, stdin)))
+            if on_result:
+                on_result(index, results[-1])
+        return results
+
+
+def accepting_judge0(latency=0):
+    """A stand-in for ``judge.run_batch`` that accepts every testcase after ``latency`` seconds."""
+    def run_batch(payloads, schedule=None, user=None, on_result=None):
+        time.sleep(latency)
+        results = [result(stdout=base64.b64decode(data['expected_output']).decode()) for data in payloads]
+        for index, item in enumerate(results):
+            if on_result:
+                on_result(index, item)
+        return results
+    return run_batch
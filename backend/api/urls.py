@@ -1,6 +1,7 @@
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
 from .views import *
+from . import streams
 
 router = DefaultRouter()
 
@@ -12,9 +13,14 @@ router.register('submission', SubmissionViewSet, basename='submission')
 router.register('practice', PracticeProblemViewSet, basename='practice-problems')
 router.register('practicesubmit', PracticeSubmissionViewSet, basename='practice-submit')
 router.register('announcement', AnnouncementViewSet, basename='announcement')
+router.register('judge0', Judge0CallbackViewSet, basename='judge0')
+router.register('metrics', MetricsViewSet, basename='metrics')
 
 
 urlpatterns = [
+   path('submission/<int:pk>/events/', streams.submission_events, name='submission-events'),
+   path('practicesubmit/<int:pk>/events/', streams.practice_submission_events, name='practice-submission-events'),
+   path('contest/<int:pk>/leaderboard/events/', streams.leaderboard_events, name='leaderboard-events'),
    path('', include(router.urls)),
     
 ]
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Buffered practice problem view counts.
+
+Counting a view used to be a read-modify-write of ``view_count`` in the
+detail request: concurrent views overwrote each other's increments, and
+every read took SQLite's write lock. Views are now added up in memory and
+written every ``VIEW_COUNT_FLUSH_INTERVAL`` seconds, one
+``view_count = view_count + n`` UPDATE per viewed problem, so nothing is
+lost however the increments interleave.
+
+The buffer belongs to the process (each web process flushes its own; the
+additions commute) and is flushed by the first view after the interval and
+at exit, so at most an interval's worth of views is lost if the process is
+killed. ``VIEW_COUNT_DEDUP_WINDOW`` counts a user's repeated views of a
+problem once per window, remembered in the default cache.
+"""
+import atexit
+from collections import Counter
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from cms.models import PracticeProblem
+from . import metrics
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def record_view(problem_id, user_id=None):
+    """Count a view of a practice problem; returns whether it was counted."""
+    window = settings.VIEW_COUNT_DEDUP_WINDOW
+    if window and user_id is not None and not cache.add(f'views:seen:{problem_id}:{user_id}', 1, timeout=window):
+        metrics.increment('views.deduplicated')
+        return False
+    with _lock:
+        _pending[problem_id] += 1
+        due = time.monotonic() - _last_flush >= settings.VIEW_COUNT_FLUSH_INTERVAL
+    metrics.increment('views.recorded')
+    if due:
+        try:
+            flush()
+        except Exception:
+            pass  # a failed flush must not fail the read; the views are kept for the next one
+    return True
+
+
+def pending(problem_id):
+    """Views of a problem recorded in this process but not written yet."""
+    with _lock:
+        return _pending[problem_id]
+
+
+def flush():
+    """Write the buffered views; returns the number of problems updated."""
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not counts:
+        return 0
+    try:
+        with transaction.atomic():
+            for problem_id, views in counts.items():
+                PracticeProblem.objects.filter(pk=problem_id).update(view_count=F('view_count') + views)
+    except Exception:
+        # Keep the views for the next flush rather than dropping them
+        with _lock:
+            _pending.update(counts)
+        metrics.increment('views.flush_errors')
+        raise
+    metrics.increment('views.flushed', sum(counts.values()))
+    return len(counts)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
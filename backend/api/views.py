@@ -1,8 +1,7 @@
 from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.decorators import action
+from rest_framework import exceptions
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from django.contrib.auth import logout
 from django.shortcuts import get_object_or_404
 from cms.models import *
 from .serializers import *
@@ -10,16 +9,13 @@ from django.contrib.auth import authenticate, logout
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db import transaction
 from django.conf import settings
-import requests
-import json
-import base64
-import time
-from django.db.models import Count, Sum, Max, Q, FloatField, ExpressionWrapper
-from django.db.models.functions import Coalesce
-from collections import defaultdict
-import requests, json, time
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .judge_queue import enqueue_submission, enqueue_practice_submission
+from . import exports, grading, judge, leaderboard, metrics, response_cache, view_counts
+from .pagination import LeaderboardPagination, SubmissionCursorPagination
 
 
 
@@ -121,6 +117,24 @@ class ContestViewSet(viewsets.ReadOnlyModelViewSet):
         """
         return Contest.objects.filter(is_public=True).order_by('-start_time')
 
+    @response_cache.cached_response(response_cache.CONTESTS, stale_at=response_cache.next_contest_transition)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=True, methods=['GET'], permission_classes=[permissions.IsAdminUser],
+            url_path=r'export/(?P<dataset>submissions|verdicts|standings)')
+    def export(self, request, pk=None, dataset=None):
+        """
+        Stream any contest's submissions, testcase verdicts or standings as
+        ``?as=csv`` (default) or ``?as=jsonl``, gzipped with ``?gzip=1`` (staff only).
+        """
+        contest = get_object_or_404(Contest, pk=pk)
+        file_format = request.query_params.get('as', 'csv')
+        if file_format not in exports.FORMATS:
+            return Response({"error": f"Unknown format, expected one of {', '.join(exports.FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return exports.export_response(request, dataset, contest, file_format, request.query_params.get('gzip') == '1')
+
 
 class ContestParticipationView(viewsets.GenericViewSet):
     """
@@ -160,7 +174,7 @@ class ProblemViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Problem.objects.filter(is_visible=True)
+        queryset = Problem.objects.filter(is_visible=True).prefetch_related('tags')
         contest_id = self.request.query_params.get('contest')
         difficulty = self.request.query_params.get('difficulty')
         tag = self.request.query_params.get('tag')
@@ -188,76 +202,11 @@ class ProblemViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.
         serializer = SubmissionCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             submission = serializer.save()
-            # print(f"Submission created: {submission}")
-            self._process_submission(submission)
-            return Response(SubmissionDetailSerializer(submission, context={'request': request}).data, status=status.HTTP_201_CREATED)
+            # Judged asynchronously by the judge workers (see api.judge_queue)
+            enqueue_submission(submission)
+            return Response(SubmissionDetailSerializer(submission, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def _process_submission(self, submission):
-        problem = submission.problem
-        testcases = problem.testcases.all()
-        total_points, max_exec_time, max_mem_used = 0, 0, 0
-        overall_status = 'Accepted'
-        testcases_passed = 0
-
-        with transaction.atomic():
-            for testcase in testcases:
-                judge0_data = {
-                    'source_code': submission.code,
-                    'language_id': submission.language,
-                    'stdin': testcase.input.replace("\\n", "\n"),
-                    'expected_output': testcase.output.strip(),
-                    'cpu_time_limit': problem.time_limit,
-                    'memory_limit': problem.memory_limit * 1024,
-                }
-                result = self._submit_to_judge0(judge0_data)
-                print("Judge0 Submission Data:", json.dumps(judge0_data, indent=2))
-                testcase_result = SubmissionTestcase.objects.create(
-                    submission=submission, testcase=testcase,
-                    status=result.get('status', {}).get('description', 'Runtime Error'),
-                    execution_time=float(result.get('time', 0)) if result.get('time') else 0.0,
-                    memory_used=result.get('memory') / 1024 if result.get('memory') else None,
-                    output=result.get('stdout', '').strip() if result.get('stdout') else None
-                )
-                if testcase_result.status == 'Accepted':
-                    total_points += testcase.points
-                    testcases_passed += 1
-                else:
-                    overall_status = testcase_result.status
-                max_exec_time = max(max_exec_time, testcase_result.execution_time or 0)
-                max_mem_used = max(max_mem_used, testcase_result.memory_used or 0)
-
-            submission.status = overall_status
-            submission.score = total_points
-            submission.execution_time = max_exec_time
-            submission.memory_used = max_mem_used
-            submission.testcases_passed = testcases_passed
-            submission.save()
-
-            # update user profile
-            user_profile = submission.user.profile
-            user_profile.update_stats()
-
-    def _submit_to_judge0(self, data):
-        judge0_url = settings.JUDGE0_API_URL
-        headers = {'Content-Type': 'application/json', 'X-RapidAPI-Key': settings.JUDGE0_API_KEY}
-        try:
-            create_response = requests.post(f"{judge0_url}/submissions", headers=headers, data=json.dumps(data))
-            create_response.raise_for_status()
-            token = create_response.json().get('token')
-            for _ in range(10):
-                result_response = requests.get(f"{judge0_url}/submissions/{token}", headers=headers)
-                result_response.raise_for_status()
-                result = result_response.json()
-                print("Judge0 Result Response:", result)
-                if result.get('status', {}).get('id') not in [1, 2]:
-                    return result
-                print("Judge0 Submission Response:", result)
-                time.sleep(1)
-            return {'status': {'description': 'System Error'}}
-        except requests.exceptions.RequestException:
-            return {'status': {'description': 'API Error'}}
-
 
 # Submission API's
 class SubmissionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -267,6 +216,7 @@ class SubmissionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewse
     queryset = Submission.objects.all()
     serializer_class = SubmissionListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SubmissionCursorPagination
 
     def get_queryset(self):
         # Check if this is a schema generation request
@@ -280,14 +230,28 @@ class SubmissionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewse
             return Submission.objects.none()
 
         # Filter submissions for the authenticated user
-        queryset = self.queryset.filter(user=user)
+        queryset = self.queryset.filter(user=user).select_related('user', 'problem')
         if problem_id := self.request.query_params.get('problem'):
             queryset = queryset.filter(problem_id=problem_id)
         if contest_id := self.request.query_params.get('contest'):
-            queryset = queryset.filter(problem__contest_id=contest_id)
+            queryset = queryset.filter(contest_id=contest_id)
         if status_filter := self.request.query_params.get('status'):
             queryset = queryset.filter(status=status_filter)
-        return queryset.order_by('-submitted_at')
+        if search := self.request.query_params.get('search'):
+            queryset = queryset.filter(problem__title__icontains=search)
+        # ?since= / ?until= (ISO datetimes) bound submitted_at
+        for param, lookup in (('since', 'submitted_at__gte'), ('until', 'submitted_at__lt')):
+            if value := self.request.query_params.get(param):
+                try:
+                    moment = parse_datetime(value)
+                except ValueError:
+                    moment = None
+                if moment is None:
+                    raise exceptions.ValidationError({param: 'Expected an ISO 8601 datetime.'})
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+                queryset = queryset.filter(**{lookup: moment})
+        return queryset.order_by('-submitted_at', '-id')
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -304,75 +268,40 @@ class SubmissionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewse
 
     @action(detail=False, methods=['GET'])
     def leaderboard(self, request):
+        """
+        Contest (or single problem) standings, served from the materialized
+        leaderboard kept up to date by the judge (see api.leaderboard).
+        While a contest is frozen non-staff users get the cached snapshot
+        taken at its freeze time instead.
+        Pass ?page= (and optionally ?page_size=) to read one page.
+        """
         problem_id = request.query_params.get('problem')
         contest_id = request.query_params.get('contest')
 
         if not problem_id and not contest_id:
             return Response({"error": "Either problem or contest parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not (problem_id or contest_id).isdigit():
+            return Response({"error": "Invalid problem or contest id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not request.user.is_staff:
+            frozen = leaderboard.frozen_standings(contest_id=contest_id, problem_id=problem_id)
+            if frozen is not None:
+                paginator = LeaderboardPagination()
+                page = paginator.paginate_queryset(frozen['rows'], request, view=self)
+                response = paginator.get_paginated_response(page) if page is not None else Response(frozen['rows'])
+                response['X-Leaderboard-Frozen-At'] = frozen['freeze_time']
+                return response
 
-        # Filter base queryset
-        submissions = Submission.objects.select_related("user", "problem").all()
         if problem_id:
-            submissions = submissions.filter(problem_id=problem_id)
+            queryset, serializer_class = leaderboard.problem_standings(problem_id), ProblemLeaderboardSerializer
         else:
-            submissions = submissions.filter(problem__contest_id=contest_id)
-
-        leaderboard_data = defaultdict(lambda: {
-            "username": "",
-            "total_score": 0,
-            "total_submissions": 0,
-            "accepted_submissions": 0,
-            "wrong_submissions": 0,
-            "problems_solved": 0,
-            "total_time": 0.0,
-            "attempts_per_problem": {},
-        })
-
-        for sub in submissions.order_by('submitted_at'):
-            user = sub.user.username
-            problem = sub.problem_id
-            key = user
-
-            data = leaderboard_data[key]
-            data["username"] = user
-            data["total_score"] += sub.score
-            data["total_submissions"] += 1
-
-            if sub.status == "Accepted":
-                data["accepted_submissions"] += 1
-
-                # First accepted submission for a problem
-                if problem not in data["attempts_per_problem"]:
-                    data["problems_solved"] += 1
-                    data["total_time"] += sub.execution_time or 0
-            else:
-                data["wrong_submissions"] += 1
-
-            # Track attempts per problem until accepted
-            if problem not in data["attempts_per_problem"]:
-                data["attempts_per_problem"][problem] = {
-                    "attempts": 1,
-                    "solved": sub.status == "Accepted"
-                }
-            else:
-                if not data["attempts_per_problem"][problem]["solved"]:
-                    data["attempts_per_problem"][problem]["attempts"] += 1
-                    if sub.status == "Accepted":
-                        data["attempts_per_problem"][problem]["solved"] = True
-
-        # Format leaderboard
-        leaderboard = []
-        for data in leaderboard_data.values():
-            total_attempts = sum(p["attempts"] for p in data["attempts_per_problem"].values())
-            data["average_attempts_per_problem"] = (
-                total_attempts / data["problems_solved"] if data["problems_solved"] else 0
-            )
-            leaderboard.append(data)
-
-        # Sort leaderboard
-        leaderboard.sort(key=lambda x: (-x["total_score"], -x["accepted_submissions"], x["total_time"]))
+            queryset, serializer_class = leaderboard.standings(contest_id), LeaderboardSerializer
 
-        return Response(leaderboard)
+        paginator = LeaderboardPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(serializer_class(page, many=True).data)
+        return Response(serializer_class(queryset, many=True).data)
     
     
 # Practice Problem API's
@@ -384,7 +313,7 @@ class PracticeProblemViewSet(mixins.ListModelMixin,
     - List (public)
     - Detail by slug (authenticated only)
     """
-    queryset = PracticeProblem.objects.filter(is_visible=True)
+    queryset = PracticeProblem.objects.filter(is_visible=True).prefetch_related('tags')
     lookup_field = 'slug'
 
     def get_permissions(self):
@@ -397,12 +326,13 @@ class PracticeProblemViewSet(mixins.ListModelMixin,
             return PracticeProblemDetailSerializer
         return PracticeProblemListSerializer
 
+    @response_cache.cached_response(response_cache.PRACTICE_PROBLEMS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-
-        # Increment view count and save
-        instance.view_count = instance.view_count + 1 if instance.view_count else 1
-        instance.save(update_fields=["view_count"])
+        view_counts.record_view(instance.pk, request.user.pk)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -414,7 +344,7 @@ class PracticeProblemViewSet(mixins.ListModelMixin,
         submissions = PracticeSubmission.objects.filter(
             user=request.user,
             problem=problem
-        ).order_by('-submitted_at')
+        ).select_related('user', 'problem').prefetch_related('testcases__testcase').order_by('-submitted_at')
 
         page = self.paginate_queryset(submissions)
         if page is not None:
@@ -425,6 +355,7 @@ class PracticeProblemViewSet(mixins.ListModelMixin,
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @response_cache.cached_response(response_cache.PROBLEM_TAGS)
     def tags(self, request):
         """Return all tags used in visible practice problems"""
         tags = ProblemTag.objects.filter(practice_problems__is_visible=True).distinct()
@@ -477,85 +408,10 @@ class PracticeSubmissionViewSet(mixins.ListModelMixin,
         serializer = self.get_serializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             submission = serializer.save()
-            self._process_submission(submission)
-            return Response(PracticeSubmissionSerializer(submission, context={'request': request}).data, status=status.HTTP_201_CREATED)
+            enqueue_practice_submission(submission)
+            return Response(PracticeSubmissionSerializer(submission, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def _process_submission(self, submission):
-        problem = submission.problem
-        testcases = problem.testcases.all()
-        overall_status = 'Accepted'
-        max_exec_time, max_mem_used = 0, 0
-        total_penalty = 0
-
-        with transaction.atomic():
-            for testcase in testcases:
-                judge0_data = {
-                    'source_code': submission.code,
-                    'language_id': submission.language,
-                    'stdin': testcase.input.replace("\\n", "\n"),
-                    'expected_output': testcase.output.strip(),
-                    'cpu_time_limit': problem.time_limit,
-                    'memory_limit': problem.memory_limit * 1024,
-                }
-                result = self._submit_to_judge0(judge0_data)
-                
-                status_description = result.get('status', {}).get('description', 'Runtime Error')
-                exec_time = float(result.get('time', 0)) if result.get('time') else 0.0
-                mem_used = result.get('memory', 0) / 1024 if result.get('memory') else 0.0
-                output = result.get('stdout', '').strip() if result.get('stdout') else ''
-
-                PracticeSubmissionTestcase.objects.create(
-                    submission=submission,
-                    testcase=testcase,
-                    status=status_description,
-                    execution_time=exec_time,
-                    memory_used=mem_used,
-                    output=output
-                )
-
-                if status_description != 'Accepted':
-                    overall_status = status_description
-                    total_penalty += 5  # 5 seconds penalty for failed testcase (customize as needed)
-
-                max_exec_time = max(max_exec_time, exec_time)
-                max_mem_used = max(max_mem_used, mem_used)
-
-            submission.status = overall_status
-            submission.execution_time = max_exec_time
-            submission.memory_used = max_mem_used
-            submission.penalty = total_penalty
-            submission.save()
-
-            # Optionally update user profile stats here
-            if hasattr(submission.user, 'profile'):
-                submission.user.profile.update_stats()
-
-    def _submit_to_judge0(self, data):
-        judge0_url = settings.JUDGE0_API_URL
-        headers = {
-            'Content-Type': 'application/json',
-            'X-RapidAPI-Key': settings.JUDGE0_API_KEY
-        }
-        try:
-            create_response = requests.post(f"{judge0_url}/submissions", headers=headers, data=json.dumps(data))
-            create_response.raise_for_status()
-            token = create_response.json().get('token')
-
-            for _ in range(10):
-                result_response = requests.get(f"{judge0_url}/submissions/{token}", headers=headers)
-                result_response.raise_for_status()
-                result = result_response.json()
-
-                if result.get('status', {}).get('id') not in [1, 2]:  # In Queue / Processing
-                    return result
-                time.sleep(1)
-
-            return {'status': {'description': 'System Error'}}
-        except requests.exceptions.RequestException:
-            return {'status': {'description': 'API Error'}}
-        
-
 
 # Announcement API's
 class AnnouncementViewSet(mixins.ListModelMixin,
@@ -584,7 +440,7 @@ class AnnouncementViewSet(mixins.ListModelMixin,
     
     def get_queryset(self):
         """Filter announcements based on query parameters and permissions"""
-        queryset = Announcement.objects.all().order_by('-is_featured', '-created_at')
+        queryset = Announcement.objects.select_related('created_by', 'contest').order_by('-is_featured', '-created_at')
         
         # Only staff can see non-global announcements
         if not self.request.user.is_staff:
@@ -635,6 +491,7 @@ class AnnouncementViewSet(mixins.ListModelMixin,
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @response_cache.cached_response(response_cache.ANNOUNCEMENTS, stale_at=response_cache.next_announcement_expiry)
     def featured(self, request):
         """Get featured announcements"""
         queryset = self.get_queryset().filter(is_featured=True)
@@ -642,6 +499,7 @@ class AnnouncementViewSet(mixins.ListModelMixin,
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @response_cache.cached_response(response_cache.ANNOUNCEMENTS, stale_at=response_cache.next_announcement_expiry)
     def latest(self, request):
         """Get latest 5 announcements"""
         queryset = self.get_queryset()[:5]
@@ -654,4 +512,37 @@ class AnnouncementViewSet(mixins.ListModelMixin,
         contest = get_object_or_404(Contest, pk=pk)
         queryset = self.get_queryset().filter(contest=contest)
         serializer = AnnouncementListSerializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+# Judge0 callbacks
+class Judge0CallbackViewSet(viewsets.GenericViewSet):
+    """
+    Receives the PUT Judge0 makes to a submission's callback_url once it has
+    been judged (see api.grading). Judge0 cannot authenticate, so the
+    callback key in the URL and the Judge0 token in the body are checked
+    against the testcase's JudgeToken instead.
+    """
+    queryset = JudgeToken.objects.all()
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @action(detail=True, methods=['PUT'])
+    def callback(self, request, pk=None):
+        result = judge.decode_result(dict(request.data))
+        mapping_id = grading.callback_mapping(pk, result)
+        if mapping_id is None:
+            return Response({'error': 'Unknown callback.'}, status=status.HTTP_404_NOT_FOUND)
+        applied = grading.apply_callback(mapping_id, result)
+        return Response({'applied': applied}, status=status.HTTP_200_OK)
+
+
+# Metrics API
+class MetricsViewSet(viewsets.ViewSet):
+    """
+    In-process counters, latency percentiles and response cache hit ratios of the serving process (staff only).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        return Response(dict(metrics.snapshot(), response_cache=response_cache.stats()))
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import *
+from api.judge_queue import enqueue_practice_submission, enqueue_submission
 
 # Register your models here.
 admin.site.register(UserProfile)
@@ -13,12 +14,22 @@ admin.site.register(Leaderboard)
 admin.site.register(ProblemTag)
 admin.site.register(ContestParticipation)
 admin.site.register(PracticeProblem)
-admin.site.register(PracticeSubmission)
 admin.site.register(PracticeSubmissionTestcase)
 admin.site.register(PracticeTestcase)
 
+def _rejudge(modeladmin, request, queryset, enqueue):
+    for submission in queryset:
+        enqueue(submission, force=True)
+    modeladmin.message_user(request, f"{len(queryset)} submission(s) queued to be judged again.")
+
+
 class SubmissionAdmin(admin.ModelAdmin):
     list_display = ('user', 'problem', 'contest', 'language_display', 'status', 'testcases_passed', 'testcases_total')
+    actions = ['rejudge']
+
+    @admin.action(description='Rejudge selected submissions (even identical resubmissions)')
+    def rejudge(self, request, queryset):
+        _rejudge(self, request, queryset, enqueue_submission)
 
     def language_display(self, obj):
         return obj.get_language_display() 
@@ -28,6 +39,16 @@ class SubmissionAdmin(admin.ModelAdmin):
 
 admin.site.register(Submission, SubmissionAdmin)
 
+class PracticeSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'problem', 'language', 'status', 'submitted_at')
+    actions = ['rejudge']
+
+    @admin.action(description='Rejudge selected submissions (even identical resubmissions)')
+    def rejudge(self, request, queryset):
+        _rejudge(self, request, queryset, enqueue_practice_submission)
+
+admin.site.register(PracticeSubmission, PracticeSubmissionAdmin)
+
 admin.site.index_title = "PCCOJ Admin"
 admin.site.site_header = "PCCOJ Admin Panel"
 admin.site.site_title = "PCCOJ Admin Panel"
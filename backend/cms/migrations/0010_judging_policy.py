@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0009_judgetoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='judging_policy',
+            field=models.CharField(choices=[('ioi', 'IOI (run every testcase, partial points)'), ('icpc', 'ICPC (stop at the first failing testcase)'), ('samples_first', 'Samples first (abort if a sample fails)')], default='ioi', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='practiceproblem',
+            name='judging_policy',
+            field=models.CharField(choices=[('ioi', 'IOI (run every testcase, partial points)'), ('icpc', 'ICPC (stop at the first failing testcase)'), ('samples_first', 'Samples first (abort if a sample fails)')], default='ioi', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='practicesubmissiontestcase',
+            name='status',
+            field=models.CharField(choices=[('Accepted', 'Accepted'), ('Wrong Answer', 'Wrong Answer'), ('Runtime Error', 'Runtime Error'), ('Time Limit Exceeded', 'Time Limit Exceeded'), ('Memory Limit Exceeded', 'Memory Limit Exceeded'), ('Skipped', 'Skipped')], default='Accepted', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='submissiontestcase',
+            name='status',
+            field=models.CharField(choices=[('Accepted', 'Accepted'), ('Wrong Answer', 'Wrong Answer'), ('Runtime Error', 'Runtime Error'), ('Time Limit Exceeded', 'Time Limit Exceeded'), ('Memory Limit Exceeded', 'Memory Limit Exceeded'), ('Skipped', 'Skipped')], default='Accepted', max_length=50),
+        ),
+    ]
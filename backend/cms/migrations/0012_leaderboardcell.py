@@ -0,0 +1,67 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0011_userproblemstatus'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submissions', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('best_score', models.IntegerField(default=0)),
+                ('first_ac_at', models.DateTimeField(blank=True, null=True)),
+                ('first_ac_time', models.FloatField(blank=True, null=True)),
+                ('penalty', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='leaderboard',
+            name='accepted_submissions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaderboard',
+            name='total_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaderboard',
+            name='total_submissions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaderboard',
+            name='total_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['contest', 'rank'], name='cms_leaderb_contest_730073_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardcell',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cells', to='cms.leaderboard'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardcell',
+            name='problem',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_cells', to='cms.problem'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardcell',
+            unique_together={('entry', 'problem')},
+        ),
+    ]
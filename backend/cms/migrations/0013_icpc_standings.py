@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0012_leaderboardcell'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboardcell',
+            name='rejected',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['contest', 'submitted_at'], name='cms_submiss_contest_59a02b_idx'),
+        ),
+    ]
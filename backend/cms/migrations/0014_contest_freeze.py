@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0013_icpc_standings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='freeze_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='unfrozen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0014_contest_freeze'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practiceproblem',
+            name='accepted_submissions',
+            field=models.PositiveIntegerField(default=0, help_text='Number of accepted submissions'),
+        ),
+        migrations.AddField(
+            model_name='practiceproblem',
+            name='total_submissions',
+            field=models.PositiveIntegerField(default=0, help_text='Number of judged submissions'),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='accepted_submissions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='solve_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='total_submissions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='UserPracticeProblemStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('solved_at', models.DateTimeField(blank=True, null=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_statuses', to='cms.practiceproblem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='practice_problem_statuses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['problem', 'solved_at'], name='cms_userpra_problem_b7df10_idx')],
+                'unique_together': {('user', 'problem')},
+            },
+        ),
+    ]
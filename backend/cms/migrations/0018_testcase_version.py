@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0017_testcase_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practiceproblem',
+            name='testcase_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='testcase_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0018_testcase_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='judgetask',
+            name='force',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='practicesubmission',
+            name='code_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='practicesubmission',
+            name='testcase_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='code_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='testcase_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
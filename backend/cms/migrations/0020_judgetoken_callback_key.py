@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+import cms.models
+
+
+def fill_callback_keys(apps, schema_editor):
+    JudgeToken = apps.get_model('cms', 'JudgeToken')
+    for mapping in JudgeToken.objects.only('id'):
+        JudgeToken.objects.filter(pk=mapping.pk).update(callback_key=cms.models.new_callback_key())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0019_duplicate_submissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='judgetoken',
+            name='callback_key',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_callback_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='judgetoken',
+            name='callback_key',
+            field=models.CharField(default=cms.models.new_callback_key, max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations
+
+# LeaderboardCell's rules as of this migration; historical models don't have its methods
+WRONG_ATTEMPT_PENALTY = 20
+PENALTY_FREE_STATUSES = ('Compilation Error',)
+
+
+def fold_cell(cell, submission, contest_start):
+    """LeaderboardCell.apply: fold one judged submission into the cell, in submission order."""
+    cell.submissions += 1
+    cell.best_score = max(cell.best_score, submission.score)
+    if submission.status == 'Accepted':
+        cell.accepted += 1
+    if cell.first_ac_at is not None:
+        return
+    cell.attempts += 1
+    if submission.status == 'Accepted':
+        cell.first_ac_at = submission.submitted_at
+        cell.first_ac_time = submission.execution_time or 0
+        minutes = max(int((submission.submitted_at - contest_start).total_seconds() // 60), 0)
+        cell.penalty = minutes + WRONG_ATTEMPT_PENALTY * cell.rejected
+    elif submission.status not in PENALTY_FREE_STATUSES:
+        cell.rejected += 1
+
+
+def rebuild_leaderboards(apps, schema_editor):
+    # Standings are now kept per verdict in Leaderboard/LeaderboardCell; fill them in for the
+    # submissions judged before, as api.leaderboard.rebuild_contest would
+    Contest = apps.get_model('cms', 'Contest')
+    Leaderboard = apps.get_model('cms', 'Leaderboard')
+    LeaderboardCell = apps.get_model('cms', 'LeaderboardCell')
+    Submission = apps.get_model('cms', 'Submission')
+
+    for contest in Contest.objects.all():
+        cells = {}
+        judged = Submission.objects.filter(contest=contest).exclude(status='Pending').order_by('submitted_at', 'id')
+        for submission in judged.iterator():
+            key = (submission.user_id, submission.problem_id)
+            if key not in cells:
+                cells[key] = LeaderboardCell(problem_id=submission.problem_id)
+            fold_cell(cells[key], submission, contest.start_time)
+
+        Leaderboard.objects.filter(contest=contest).delete()
+        Leaderboard.objects.bulk_create([Leaderboard(contest=contest, user_id=user_id)
+                                         for user_id in sorted({user_id for user_id, _ in cells})], batch_size=500)
+        entries = {entry.user_id: entry for entry in Leaderboard.objects.filter(contest=contest)}
+        by_user = {}
+        for (user_id, _), cell in cells.items():
+            cell.entry = entries[user_id]
+            by_user.setdefault(user_id, []).append(cell)
+        LeaderboardCell.objects.bulk_create(cells.values(), batch_size=500)
+
+        for user_id, entry in entries.items():
+            user_cells = by_user[user_id]
+            entry.score = sum(cell.best_score for cell in user_cells)
+            entry.problems_solved = sum(cell.first_ac_at is not None for cell in user_cells)
+            entry.penalty = sum(cell.penalty for cell in user_cells)
+            entry.total_submissions = sum(cell.submissions for cell in user_cells)
+            entry.accepted_submissions = sum(cell.accepted for cell in user_cells)
+            entry.total_attempts = sum(cell.attempts for cell in user_cells)
+            entry.total_time = sum(cell.first_ac_time or 0 for cell in user_cells)
+
+        # ICPC contests rank by problems solved, the others by score, then both by penalty; ties share a rank
+        primary = 'problems_solved' if contest.judging_policy == 'icpc' else 'score'
+        ranked = sorted(entries.values(), key=lambda entry: (-getattr(entry, primary), entry.penalty, entry.pk))
+        previous, rank = None, 0
+        for position, entry in enumerate(ranked, start=1):
+            key = (getattr(entry, primary), entry.penalty)
+            if key != previous:
+                previous, rank = key, position
+            entry.rank = rank
+        Leaderboard.objects.bulk_update(ranked, [
+            'score', 'problems_solved', 'penalty', 'total_submissions', 'accepted_submissions', 'total_attempts',
+            'total_time', 'rank',
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0020_judgetoken_callback_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_leaderboards, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Min, Q
+
+STATS_FIELDS = ['total_submissions', 'accepted_submissions', 'attempt_count', 'solve_count']
+
+
+def rebuild(apps, submission_model, status_model, problem_model):
+    Submission = apps.get_model('cms', submission_model)
+    Status = apps.get_model('cms', status_model)
+    Problem = apps.get_model('cms', problem_model)
+
+    # One grouped query gives both the per-user statuses and, summed per problem, the problem stats
+    accepted = Q(status='Accepted')
+    statuses, totals = [], {}
+    for row in Submission.objects.exclude(status='Pending').order_by().values('user_id', 'problem_id').annotate(
+            attempts=Count('id'), accepted=Count('id', filter=accepted), solved_at=Min('submitted_at', filter=accepted)):
+        statuses.append(Status(user_id=row['user_id'], problem_id=row['problem_id'], attempts=row['attempts'],
+                               solved_at=row['solved_at']))
+        submitted, accepted_count, attempters, solvers = totals.get(row['problem_id'], (0, 0, 0, 0))
+        totals[row['problem_id']] = (submitted + row['attempts'], accepted_count + row['accepted'],
+                                     attempters + 1, solvers + (row['solved_at'] is not None))
+
+    Status.objects.all().delete()
+    Status.objects.bulk_create(statuses, batch_size=1000)
+    problems = list(Problem.objects.only('id', *STATS_FIELDS))
+    for problem in problems:
+        for field, value in zip(STATS_FIELDS, totals.get(problem.pk, (0, 0, 0, 0))):
+            setattr(problem, field, value)
+    Problem.objects.bulk_update(problems, STATS_FIELDS, batch_size=1000)
+
+
+def rebuild_problem_stats(apps, schema_editor):
+    # Counts the submissions judged before the counters were kept (0015_problem_stats), the way
+    # the rebuild_problem_stats command recounts them
+    rebuild(apps, 'Submission', 'UserProblemStatus', 'Problem')
+    rebuild(apps, 'PracticeSubmission', 'UserPracticeProblemStatus', 'PracticeProblem')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0021_backfill_leaderboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_problem_stats, migrations.RunPython.noop, elidable=True),
+    ]
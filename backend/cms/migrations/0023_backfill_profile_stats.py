@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def reconcile_user_stats(apps, schema_editor):
+    # Profile counters are now kept per verdict and leave pending submissions out; recount the
+    # existing ones the same way, as the reconcile_user_stats command does
+    Submission = apps.get_model('cms', 'Submission')
+    UserProfile = apps.get_model('cms', 'UserProfile')
+
+    totals = {
+        row['user_id']: (row['submitted'], row['solved'])
+        for row in Submission.objects.exclude(status='Pending').order_by().values('user_id').annotate(
+            submitted=Count('id'), solved=Count('problem_id', filter=Q(status='Accepted'), distinct=True))
+    }
+    profiles = list(UserProfile.objects.only('id', 'user_id', 'total_submissions', 'total_solved'))
+    for profile in profiles:
+        profile.total_submissions, profile.total_solved = totals.get(profile.user_id, (0, 0))
+    UserProfile.objects.bulk_update(profiles, ['total_submissions', 'total_solved'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0022_backfill_problem_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconcile_user_stats, migrations.RunPython.noop, elidable=True),
+    ]
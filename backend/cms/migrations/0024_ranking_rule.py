@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:22
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def carry_over(apps, schema_editor):
+    # Contests judged under the ICPC policy were ranked by problems solved; keep ranking them that way
+    Contest = apps.get_model('cms', 'Contest')
+    Leaderboard = apps.get_model('cms', 'Leaderboard')
+    LeaderboardCell = apps.get_model('cms', 'LeaderboardCell')
+    Contest.objects.filter(judging_policy='icpc').update(ranking_rule='icpc')
+    last_ac = LeaderboardCell.objects.filter(entry=OuterRef('pk')).order_by().values('entry').annotate(
+        last=Max('first_ac_at')).values('last')
+    Leaderboard.objects.update(last_ac_at=Subquery(last_ac))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0023_backfill_profile_stats'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='leaderboard',
+            options={'ordering': ['rank', models.OrderBy(models.F('last_ac_at'), nulls_last=True), 'user_id']},
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='ranking_rule',
+            field=models.CharField(choices=[('score', 'Score, then penalty'), ('icpc', 'ICPC (problems solved, then penalty)')], default='score', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='leaderboard',
+            name='last_ac_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(carry_over, migrations.RunPython.noop, elidable=True),
+    ]
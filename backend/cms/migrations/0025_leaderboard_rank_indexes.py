@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0024_ranking_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='leaderboard',
+            name='cms_leaderb_contest_cbaf87_idx',
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['contest', 'score', 'penalty'], name='cms_leaderb_contest_baa518_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['contest', 'problems_solved', 'penalty'], name='cms_leaderb_contest_55a4ad_idx'),
+        ),
+    ]
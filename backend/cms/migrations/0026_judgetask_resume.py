@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0025_leaderboard_rank_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='judgetask',
+            name='resume',
+            field=models.BooleanField(default=False),
+        ),
+    ]
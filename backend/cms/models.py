@@ -1,7 +1,14 @@
+import hashlib
+import secrets
+
 from django.db import models
+from django.db.models import F
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from . import testcase_store
+
 # User Profile 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile', db_index=True)
@@ -23,10 +30,46 @@ class UserProfile(models.Model):
         return self.user.username
     
     def update_stats(self):
-        """Update user statistics based on submissions"""
-        self.total_submissions = self.user.submissions.count()
-        self.total_solved = self.user.submissions.filter(status='Accepted').values('problem').distinct().count()
-        self.save()
+        """Recount user statistics from submissions (see `manage.py reconcile_user_stats`)"""
+        judged = self.user.submissions.exclude(status='Pending')
+        self.total_submissions = judged.count()
+        self.total_solved = judged.filter(status='Accepted').values('problem').distinct().count()
+        self.save(update_fields=['total_submissions', 'total_solved', 'updated_at'])
+
+    def record_verdict(self, submission, newly_solved):
+        """
+        Count a newly judged contest submission without recounting the others;
+        ``newly_solved`` comes from ``UserProblemStatus.record_verdict``.
+        """
+        UserProfile.objects.filter(pk=self.pk).update(
+            total_submissions=F('total_submissions') + 1,
+            total_solved=F('total_solved') + newly_solved,
+            updated_at=timezone.now(),
+        )
+
+    def record_rejudge(self, solved_change):
+        """
+        Correct the solved count after a counted submission's verdict changed;
+        ``solved_change`` comes from ``UserProblemStatus.record_rejudge``.
+        """
+        if solved_change:
+            UserProfile.objects.filter(pk=self.pk).update(
+                total_solved=F('total_solved') + solved_change, updated_at=timezone.now(),
+            )
+
+# How a submission's testcases are judged (see api.grading)
+JUDGING_POLICY_CHOICES = [
+    ('ioi', 'IOI (run every testcase, partial points)'),
+    ('icpc', 'ICPC (stop at the first failing testcase)'),
+    ('samples_first', 'Samples first (abort if a sample fails)'),
+]
+
+# How a contest's leaderboard is ranked (see api.leaderboard)
+RANKING_RULE_CHOICES = [
+    ('score', 'Score, then penalty'),
+    ('icpc', 'ICPC (problems solved, then penalty)'),
+]
+
 
 # Contest Model 
 class Contest(models.Model):
@@ -47,6 +90,10 @@ class Contest(models.Model):
     is_public = models.BooleanField(default=True)
     is_rated = models.BooleanField(default=True)
     max_participants = models.IntegerField(null=True, blank=True)
+    judging_policy = models.CharField(max_length=20, choices=JUDGING_POLICY_CHOICES, default='ioi')
+    ranking_rule = models.CharField(max_length=20, choices=RANKING_RULE_CHOICES, default='score')
+    freeze_time = models.DateTimeField(null=True, blank=True)  # public standings stop updating from here on
+    unfrozen_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -58,6 +105,12 @@ class Contest(models.Model):
 
     def __str__(self):
         return self.title
+
+    def is_frozen(self, now=None):
+        """Whether non-staff users currently see the standings as of freeze_time"""
+        if self.freeze_time is None or self.unfrozen_at is not None:
+            return False
+        return (now or timezone.now()) >= self.freeze_time
     
     @property
     def status(self):
@@ -90,8 +143,70 @@ class ContestParticipation(models.Model):
     def __str__(self):
         return f'{self.user.username} - {self.contest.title}'    
 
+class ProblemStatsMixin:
+    """
+    Submission statistics of a (practice) problem, counted as verdicts come in
+    instead of aggregated over its submissions on every read. Pending
+    submissions are not counted. ``manage.py rebuild_problem_stats``
+    recounts them all.
+    """
+
+    @property
+    def submission_count(self):
+        return self.total_submissions
+
+    @property
+    def acceptance_rate(self):
+        if self.total_submissions == 0:
+            return 0.0
+        return (self.accepted_submissions / self.total_submissions) * 100
+
+    def record_verdict(self, submission, first_attempt, newly_solved):
+        """Count a newly judged submission; the flags come from the user's problem status"""
+        type(self).objects.filter(pk=self.pk).update(
+            total_submissions=F('total_submissions') + 1,
+            accepted_submissions=F('accepted_submissions') + (submission.status == 'Accepted'),
+            attempt_count=F('attempt_count') + first_attempt,
+            solve_count=F('solve_count') + newly_solved,
+        )
+
+    def record_rejudge(self, submission, previous_status, solved_change):
+        """Correct the counts after a counted submission's verdict changed from ``previous_status``"""
+        type(self).objects.filter(pk=self.pk).update(
+            accepted_submissions=F('accepted_submissions') + (submission.status == 'Accepted')
+            - (previous_status == 'Accepted'),
+            solve_count=F('solve_count') + solved_change,
+        )
+
+    def update_stats(self):
+        """Recount this problem's statistics from its submissions"""
+        accepted = models.Q(status='Accepted')
+        stats = self.submissions.exclude(status='Pending').aggregate(
+            total_submissions=models.Count('id'),
+            accepted_submissions=models.Count('id', filter=accepted),
+            attempt_count=models.Count('user', distinct=True),
+            solve_count=models.Count('user', filter=accepted, distinct=True),
+        )
+        for field, value in stats.items():
+            setattr(self, field, value)
+        self.save(update_fields=list(stats))
+
+
+class TestcaseVersionMixin:
+    """
+    ``testcase_version`` goes up whenever the problem's testcases change, so
+    copies prepared for judging (see api/testcase_cache.py) can tell they
+    are stale. Saving or deleting a testcase bumps it; code that changes
+    testcases in bulk calls ``testcases_changed``.
+    """
+
+    def testcases_changed(self):
+        type(self).objects.filter(pk=self.pk).update(testcase_version=F('testcase_version') + 1)
+        self.refresh_from_db(fields=['testcase_version'])
+
+
 # Problem Model 
-class Problem(models.Model):
+class Problem(TestcaseVersionMixin, ProblemStatsMixin, models.Model):
     DIFFICULTY_CHOICES = [
         ('Easy', 'Easy'), 
         ('Medium', 'Medium'), 
@@ -115,6 +230,12 @@ class Problem(models.Model):
     tags = models.ManyToManyField('ProblemTag', related_name='problems')
     points = models.IntegerField(default=100)
     is_visible = models.BooleanField(default=True)
+    # judged submissions, maintained by ProblemStatsMixin.record_verdict
+    total_submissions = models.PositiveIntegerField(default=0)
+    accepted_submissions = models.PositiveIntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)  # distinct users
+    solve_count = models.PositiveIntegerField(default=0)  # distinct users
+    testcase_version = models.PositiveIntegerField(default=0)  # see TestcaseVersionMixin
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -127,18 +248,6 @@ class Problem(models.Model):
 
     def __str__(self):
         return self.title
-    
-    @property
-    def submission_count(self):
-        return self.submissions.count()
-    
-    @property
-    def acceptance_rate(self):
-        total = self.submissions.count()
-        if total == 0:
-            return 0
-        accepted = self.submissions.filter(status='Accepted').count()
-        return (accepted / total) * 100
 
 # Problem Tags
 class ProblemTag(models.Model):
@@ -147,8 +256,27 @@ class ProblemTag(models.Model):
     def __str__(self):
         return self.name
 
+class CodeHashMixin:
+    """
+    ``code_hash`` tells resubmissions of the same code apart from new code:
+    the SHA-256 of the user, problem, language and the code with ``\\r\\n``
+    line endings and trailing whitespace normalized away. The judge reuses
+    the verdict of a recent identical submission (see api.grading).
+    """
+
+    def compute_code_hash(self):
+        code = self.code.replace('\r\n', '\n').replace('\r', '\n').rstrip()
+        key = f'{self.user_id}:{self.problem_id}:{self.language}:{code}'
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if not self.code_hash:
+            self.code_hash = self.compute_code_hash()
+        super().save(*args, **kwargs)
+
+
 # Submission Model 
-class Submission(models.Model):
+class Submission(CodeHashMixin, models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'), 
         ('Accepted', 'Accepted'), 
@@ -182,12 +310,16 @@ class Submission(models.Model):
     compiler_output = models.TextField(blank=True, null=True)
     testcases_passed = models.IntegerField(default=0)
     testcases_total = models.IntegerField(default=0)
+    code_hash = models.CharField(max_length=64, blank=True, default='')  # see CodeHashMixin
+    testcase_version = models.PositiveIntegerField(null=True, blank=True)  # of the problem, when judged
 
     class Meta:
         indexes = [
             models.Index(fields=['user', 'problem']),
             models.Index(fields=['contest', 'user']),
+            models.Index(fields=['contest', 'submitted_at']),
             models.Index(fields=['status', 'submitted_at']),
+            models.Index(fields=['user', 'submitted_at']),
         ]
 
     def __str__(self):
@@ -203,54 +335,188 @@ class Submission(models.Model):
 
 # Leaderboard Model 
 class Leaderboard(models.Model):
+    """A user's standing in a contest, kept up to date on every verdict (see api.leaderboard)"""
     contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='leaderboard')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard')
     score = models.IntegerField(default=0, db_index=True)
     problems_solved = models.IntegerField(default=0)
     last_submission_time = models.DateTimeField(auto_now=True)
+    last_ac_at = models.DateTimeField(null=True, blank=True)  # latest first AC of a problem; breaks ties in a rank
     penalty = models.IntegerField(default=0)  # Time penalty in minutes
     rank = models.IntegerField(null=True, blank=True)
+    total_submissions = models.IntegerField(default=0)
+    accepted_submissions = models.IntegerField(default=0)
+    total_attempts = models.IntegerField(default=0)  # submissions up to the first AC of each problem
+    total_time = models.FloatField(default=0)  # execution time of the first AC of each problem, in seconds
 
     class Meta:
         unique_together = ('contest', 'user')
         indexes = [
-            models.Index(fields=['contest', 'score', 'last_submission_time']),
+            models.Index(fields=['contest', 'score', 'penalty']),  # moving an entry in the ranks, see api.leaderboard
+            models.Index(fields=['contest', 'problems_solved', 'penalty']),
+            models.Index(fields=['contest', 'rank']),
             models.Index(fields=['rank']),
         ]
-        ordering = ['-score', 'penalty', 'last_submission_time']
+        ordering = ['rank', F('last_ac_at').asc(nulls_last=True), 'user_id']
 
     def __str__(self):
         return f'{self.user.username} - {self.contest.title}'
     
     def update_stats(self):
-        """Update leaderboard statistics"""
-        # Get all accepted submissions
-        accepted_submissions = self.user.submissions.filter(
-            contest=self.contest,
-            status='Accepted'
-        ).values('problem').distinct().count()
-        
-        # Get total score
-        problem_scores = {}
-        submissions = self.user.submissions.filter(contest=self.contest)
-        
-        for sub in submissions:
-            if sub.problem_id not in problem_scores or sub.score > problem_scores[sub.problem_id]:
-                problem_scores[sub.problem_id] = sub.score
-        
-        self.score = sum(problem_scores.values())
-        self.problems_solved = accepted_submissions
+        """Recompute the totals from the per-problem cells"""
+        self.sum_cells(self.cells.all())
         self.save()
 
-# Testcase Model
-class Testcase(models.Model):
-    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='testcases')
+    def sum_cells(self, cells):
+        cells = list(cells)
+        self.score = sum(cell.best_score for cell in cells)
+        self.problems_solved = sum(1 for cell in cells if cell.is_solved)
+        self.penalty = sum(cell.penalty for cell in cells)
+        self.total_submissions = sum(cell.submissions for cell in cells)
+        self.accepted_submissions = sum(cell.accepted for cell in cells)
+        self.total_attempts = sum(cell.attempts for cell in cells)
+        self.total_time = sum(cell.first_ac_time or 0 for cell in cells)
+        self.last_ac_at = max((cell.first_ac_at for cell in cells if cell.is_solved), default=None)
+
+
+class LeaderboardCell(models.Model):
+    """One user's results on one contest problem"""
+    WRONG_ATTEMPT_PENALTY = 20  # minutes per rejected submission before the first AC
+    PENALTY_FREE_STATUSES = ('Compilation Error',)  # rejected without costing penalty time
+
+    entry = models.ForeignKey(Leaderboard, on_delete=models.CASCADE, related_name='cells')
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='leaderboard_cells')
+    submissions = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)  # submissions up to and including the first AC
+    rejected = models.IntegerField(default=0)  # penalized rejections before the first AC
+    best_score = models.IntegerField(default=0)
+    first_ac_at = models.DateTimeField(null=True, blank=True)
+    first_ac_time = models.FloatField(null=True, blank=True)  # execution time of the first AC, in seconds
+    penalty = models.IntegerField(default=0)  # minutes, once solved
+
+    class Meta:
+        unique_together = ('entry', 'problem')
+
+    def __str__(self):
+        return f'{self.entry} - {self.problem.title}'
+
+    @property
+    def is_solved(self):
+        return self.first_ac_at is not None
+
+    def reset(self):
+        self.submissions = self.accepted = self.attempts = self.rejected = self.best_score = self.penalty = 0
+        self.first_ac_at = self.first_ac_time = None
+
+    def apply(self, submission, contest_start):
+        """Fold one judged submission into the cell; submissions must come in submission order"""
+        self.submissions += 1
+        self.best_score = max(self.best_score, submission.score)
+        if submission.status == 'Accepted':
+            self.accepted += 1
+        if self.is_solved:
+            return
+        self.attempts += 1
+        if submission.status == 'Accepted':
+            self.first_ac_at = submission.submitted_at
+            self.first_ac_time = submission.execution_time or 0
+            minutes = max(int((submission.submitted_at - contest_start).total_seconds() // 60), 0)
+            self.penalty = minutes + self.WRONG_ATTEMPT_PENALTY * self.rejected
+        elif submission.status not in self.PENALTY_FREE_STATUSES:
+            self.rejected += 1
+
+
+class TestcaseBase(models.Model):
+    """
+    A testcase's input and expected output. Each is kept inline in its text
+    column, or, once it's ``TESTCASE_STORE_MIN_SIZE`` bytes or more, in the
+    content-addressed testcase store (see cms/testcase_store.py) with the
+    column left empty. Read them through ``input_text``/``output_text``.
+    """
+    PAYLOAD_FIELDS = ('input', 'output')
+
     input = models.TextField()
     output = models.TextField()
+    input_sha256 = models.CharField(max_length=64, blank=True, default='')  # set when the input is in the store
+    output_sha256 = models.CharField(max_length=64, blank=True, default='')
+    input_size = models.PositiveBigIntegerField(default=0)  # bytes of UTF-8
+    output_size = models.PositiveBigIntegerField(default=0)
     is_sample = models.BooleanField(default=False)
     points = models.IntegerField(default=0)  # Points for this testcase
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        abstract = True
+
+    @property
+    def input_text(self):
+        return self._payload('input')
+
+    @input_text.setter
+    def input_text(self, text):
+        self.input = text
+
+    @property
+    def output_text(self):
+        return self._payload('output')
+
+    @output_text.setter
+    def output_text(self, text):
+        self.output = text
+
+    def _payload(self, field):
+        digest = getattr(self, f'{field}_sha256')
+        if not digest or (field not in self.get_deferred_fields() and getattr(self, field)):
+            return getattr(self, field)  # inline, or set since loading
+        loaded = self.__dict__.setdefault('_loaded_payloads', {})
+        if loaded.get(field, (None,))[0] != digest:
+            loaded[field] = (digest, testcase_store.read(digest))
+        return loaded[field][1]
+
+    def store_payloads(self, min_size=None):
+        """
+        Record the size of payloads set since loading, moving those of
+        ``min_size`` (default ``TESTCASE_STORE_MIN_SIZE``) bytes or more to
+        the testcase store; 0 keeps them inline. ``save`` calls this; call it
+        before ``bulk_create``.
+        """
+        if min_size is None:
+            min_size = settings.TESTCASE_STORE_MIN_SIZE
+        deferred = self.get_deferred_fields()
+        for field in self.PAYLOAD_FIELDS:
+            if field in deferred:
+                continue  # not loaded, so not changed
+            text = getattr(self, field)
+            if getattr(self, f'{field}_sha256') and not text:
+                continue  # still the stored payload
+            data = text.encode()
+            digest = ''
+            if min_size and len(data) >= min_size:
+                digest = testcase_store.put(data)
+                setattr(self, field, '')
+            setattr(self, f'{field}_sha256', digest)
+            setattr(self, f'{field}_size', len(data))
+
+    def save(self, *args, **kwargs):
+        self.store_payloads()
+        super().save(*args, **kwargs)
+        self._bump_testcase_version()
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        self._bump_testcase_version()
+        return deleted
+
+    def _bump_testcase_version(self):
+        problem_model = self._meta.get_field('problem').related_model
+        problem_model.objects.filter(pk=self.problem_id).update(testcase_version=F('testcase_version') + 1)
+
+
+# Testcase Model
+class Testcase(TestcaseBase):
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='testcases')
+
     class Meta:
         indexes = [
             models.Index(fields=['problem', 'is_sample']),
@@ -266,7 +532,8 @@ class SubmissionTestcase(models.Model):
         ('Wrong Answer', 'Wrong Answer'), 
         ('Runtime Error', 'Runtime Error'), 
         ('Time Limit Exceeded', 'Time Limit Exceeded'),
-        ('Memory Limit Exceeded', 'Memory Limit Exceeded')
+        ('Memory Limit Exceeded', 'Memory Limit Exceeded'),
+        ('Skipped', 'Skipped'),
     ]
     
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='testcases')
@@ -356,7 +623,7 @@ class Announcement(models.Model):
         return self.announcement_type == 'resource'
     
 
-class PracticeProblem(models.Model):
+class PracticeProblem(TestcaseVersionMixin, ProblemStatsMixin, models.Model):
     DIFFICULTY_CHOICES = [
         ('Easy', 'Easy'), 
         ('Medium', 'Medium'), 
@@ -383,7 +650,11 @@ class PracticeProblem(models.Model):
     view_count = models.PositiveIntegerField(default=0, help_text="Number of times this problem has been viewed")
     solve_count = models.PositiveIntegerField(default=0, help_text="Number of unique users who solved this problem")
     attempt_count = models.PositiveIntegerField(default=0, help_text="Number of unique users who attempted this problem")
+    total_submissions = models.PositiveIntegerField(default=0, help_text="Number of judged submissions")
+    accepted_submissions = models.PositiveIntegerField(default=0, help_text="Number of accepted submissions")
     is_visible = models.BooleanField(default=True)
+    judging_policy = models.CharField(max_length=20, choices=JUDGING_POLICY_CHOICES, default='ioi')
+    testcase_version = models.PositiveIntegerField(default=0)  # see TestcaseVersionMixin
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -402,35 +673,12 @@ class PracticeProblem(models.Model):
     def __str__(self):
         return self.title
     
-    @property
-    def submission_count(self):
-        return self.submissions.count()
-    
-    @property
-    def acceptance_rate(self):
-        total = self.submissions.count()
-        if total == 0:
-            return 0
-        accepted = self.submissions.filter(status='Accepted').count()
-        return (accepted / total) * 100
-    
-    def update_stats(self):
-        """Update problem statistics (solve_count, attempt_count)"""
-        # Number of distinct users who submitted to this problem
-        self.attempt_count = self.submissions.values('user').distinct().count()
-        
-        # Number of distinct users who solved this problem
-        self.solve_count = self.submissions.filter(status='Accepted').values('user').distinct().count()
-        
-        self.save(update_fields=['attempt_count', 'solve_count'])
-    
-    def increment_view_count(self):
-        """Increment the view count for this problem"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+    def increment_view_count(self, views=1):
+        """Add views in the database, without losing concurrent increments (see api.view_counts)"""
+        PracticeProblem.objects.filter(pk=self.pk).update(view_count=F('view_count') + views)
 
 
-class PracticeSubmission(models.Model):
+class PracticeSubmission(CodeHashMixin, models.Model):
     """Similar to your regular Submission model but for practice problems"""
     STATUS_CHOICES = [
         ('Pending', 'Pending'), 
@@ -461,6 +709,8 @@ class PracticeSubmission(models.Model):
     execution_time = models.FloatField(null=True, blank=True)  # in seconds
     memory_used = models.FloatField(null=True, blank=True)  # in MB
     penalty = models.IntegerField(default=0)  # Time penalty in seconds
+    code_hash = models.CharField(max_length=64, blank=True, default='')  # see CodeHashMixin
+    testcase_version = models.PositiveIntegerField(null=True, blank=True)  # of the problem, when judged
     
     class Meta:
         ordering = ['-submitted_at']
@@ -474,13 +724,8 @@ class PracticeSubmission(models.Model):
     
 
 # Testcase Model
-class PracticeTestcase(models.Model):
+class PracticeTestcase(TestcaseBase):
     problem = models.ForeignKey(PracticeProblem, on_delete=models.CASCADE, related_name='testcases')
-    input = models.TextField()
-    output = models.TextField()
-    is_sample = models.BooleanField(default=False)
-    points = models.IntegerField(default=0)  # Points for this testcase
-    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
@@ -497,7 +742,8 @@ class PracticeSubmissionTestcase(models.Model):
         ('Wrong Answer', 'Wrong Answer'), 
         ('Runtime Error', 'Runtime Error'), 
         ('Time Limit Exceeded', 'Time Limit Exceeded'),
-        ('Memory Limit Exceeded', 'Memory Limit Exceeded')
+        ('Memory Limit Exceeded', 'Memory Limit Exceeded'),
+        ('Skipped', 'Skipped'),
     ]
     
     submission = models.ForeignKey(PracticeSubmission, on_delete=models.CASCADE, related_name='testcases')
@@ -513,4 +759,131 @@ class PracticeSubmissionTestcase(models.Model):
         ]
 
     def __str__(self):
-        return f'{self.submission.user.username} - {self.testcase.problem.title}'    
\ No newline at end of file
+        return f'{self.submission.user.username} - {self.testcase.problem.title}'
+
+
+# Judge Queue
+class JudgeTask(models.Model):
+    """A pending judging job, drained by the workers in api.judge_queue"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='judge_tasks', null=True, blank=True)
+    practice_submission = models.ForeignKey(PracticeSubmission, on_delete=models.CASCADE, related_name='judge_tasks', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    force = models.BooleanField(default=False)  # judge even if a duplicate submission's verdict could be reused
+    resume = models.BooleanField(default=False)  # send the next wave of a callback-judged submission (see api.grading)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['status', 'claimed_at']),
+        ]
+
+    def __str__(self):
+        target = self.submission_id or self.practice_submission_id
+        kind = 'contest' if self.submission_id else 'practice'
+        return f'{kind} #{target} ({self.status})'
+
+
+def new_callback_key():
+    return secrets.token_urlsafe(32)
+
+
+class JudgeToken(models.Model):
+    """Maps a Judge0 submission token to the testcase it judges, for Judge0 callbacks"""
+    token = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    callback_key = models.CharField(max_length=64, unique=True, default=new_callback_key)  # unguessable, in the callback URL
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='judge_tokens', null=True, blank=True)
+    testcase = models.ForeignKey(Testcase, on_delete=models.CASCADE, null=True, blank=True)
+    practice_submission = models.ForeignKey(PracticeSubmission, on_delete=models.CASCADE, related_name='judge_tokens', null=True, blank=True)
+    practice_testcase = models.ForeignKey(PracticeTestcase, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.token or f'pending #{self.pk}'
+
+
+class ProblemStatusBase(models.Model):
+    """Judged attempts of one user at one problem, and when it was first solved"""
+    attempts = models.IntegerField(default=0)
+    solved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def record_verdict(cls, submission):
+        """
+        Count a newly judged submission. Returns ``(first_attempt, newly_solved)``
+        as 0 or 1, for the per-problem counts of distinct users.
+        """
+        problem_status, created = cls.objects.get_or_create(
+            user_id=submission.user_id, problem_id=submission.problem_id
+        )
+        cls.objects.filter(pk=problem_status.pk).update(attempts=F('attempts') + 1)
+        newly_solved = 0
+        if submission.status == 'Accepted':
+            # Only the first accepted submission flips solved_at, even under concurrency
+            newly_solved = cls.objects.filter(pk=problem_status.pk, solved_at__isnull=True).update(
+                solved_at=submission.submitted_at
+            )
+        return int(created), newly_solved
+
+    @classmethod
+    def record_rejudge(cls, submission):
+        """
+        Follow a counted submission's changed verdict: the problem is solved
+        as of the user's earliest accepted submission, if any is left. Returns
+        the change in solved problems, -1, 0 or 1.
+        """
+        solved_at = type(submission).objects.filter(
+            user_id=submission.user_id, problem_id=submission.problem_id, status='Accepted'
+        ).aggregate(first=models.Min('submitted_at'))['first']
+        problem_status, _ = cls.objects.get_or_create(user_id=submission.user_id, problem_id=submission.problem_id)
+        cls.objects.filter(pk=problem_status.pk).update(solved_at=solved_at)
+        return (solved_at is not None) - problem_status.is_solved
+
+    @property
+    def is_solved(self):
+        return self.solved_at is not None
+
+
+class UserProblemStatus(ProblemStatusBase):
+    """Judged attempts per user and contest problem, and when it was first solved"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='problem_statuses')
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='user_statuses')
+
+    class Meta:
+        unique_together = ('user', 'problem')
+        indexes = [
+            models.Index(fields=['problem', 'solved_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.problem.title}'
+
+
+class UserPracticeProblemStatus(ProblemStatusBase):
+    """Judged attempts per user and practice problem, and when it was first solved"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='practice_problem_statuses')
+    problem = models.ForeignKey(PracticeProblem, on_delete=models.CASCADE, related_name='user_statuses')
+
+    class Meta:
+        unique_together = ('user', 'problem')
+        indexes = [
+            models.Index(fields=['problem', 'solved_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.problem.title}'
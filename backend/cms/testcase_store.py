@@ -0,0 +1,83 @@
+"""
+Content-addressed files for large testcase inputs and outputs.
+
+With ``TESTCASE_STORE_MIN_SIZE`` set, a Testcase or PracticeTestcase payload
+of at least that many bytes (UTF-8) is written to
+``TESTCASE_STORE_ROOT/<ab>/<abcdef...>``, named by its SHA-256, and the row
+keeps only the digest and size in ``input_sha256``/``input_size`` (and the
+``output_`` pair) with the text column left empty. Equal payloads, on the
+same problem or across problems, share one file. Smaller payloads stay in
+the database, where they cost less than a file.
+
+Files are written to a temporary name and renamed into place, so a reader
+never sees a partial one, and they are never changed afterwards. They are
+read on first use through ``mmap``: the page cache is shared between worker
+processes and nothing is copied until the text is decoded.
+
+Unreferenced files (testcases deleted or edited since) are only removed by
+``manage.py externalize_testcases --prune``. The digests are not exposed by
+the API, and a payload's name can only be worked out from the payload itself.
+"""
+from contextlib import contextmanager
+import hashlib
+import mmap
+import os
+import tempfile
+
+from django.conf import settings
+
+
+def path(digest):
+    return os.path.join(settings.TESTCASE_STORE_ROOT, digest[:2], digest)
+
+
+def put(data):
+    """Store ``data`` (bytes) unless it's already there; returns its SHA-256 hex digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    target = path(digest)
+    if os.path.exists(target):
+        os.utime(target)  # so --prune leaves it alone until the new row is committed
+        return digest
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return digest
+
+
+@contextmanager
+def mapped(digest):
+    """The stored payload as a read-only buffer (an ``mmap``, or ``b''`` for an empty file)."""
+    with open(path(digest), 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:  # an empty file can't be mapped
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def read(digest):
+    """The stored payload as text."""
+    with mapped(digest) as buffer, memoryview(buffer) as view:
+        return str(view, 'utf-8')
+
+
+def stored_files():
+    """``(name, path)`` of every file in the store, including temporary ones left by a crash."""
+    root = settings.TESTCASE_STORE_ROOT
+    if not os.path.isdir(root):
+        return
+    for shard in sorted(os.listdir(root)):
+        directory = os.path.join(root, shard)
+        if len(shard) != 2 or not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            yield name, os.path.join(directory, name)
@@ -10,6 +10,11 @@ from django.db.models import Count, Avg
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.mail import send_mail
+from api import exports
+from api.leaderboard import unfreeze, update_ranks
+from api.pagination import keyset_page
+from api.testcase_import import TestcaseArchiveError, import_testcases
+from django.db import transaction
 from django.template.loader import render_to_string
 
 
@@ -113,20 +118,63 @@ def editcontest(request, contest_id):
         contest.is_public = request.POST.get('is_public') == 'on'
         contest.is_rated = request.POST.get('is_rated') == 'on'
         contest.max_participants = request.POST.get('max_participants') or None
+        contest.judging_policy = request.POST.get('judging_policy') or contest.judging_policy
+        ranking_rule = contest.ranking_rule
+        contest.ranking_rule = request.POST.get('ranking_rule') or contest.ranking_rule
+        contest.freeze_time = parse_datetime(request.POST.get('freeze_time') or '')
         contest.slug = slugify(contest.title)  # Update slug based on the new title
 
         # Validate contest time
         if contest.start_time >= contest.end_time:
             messages.error(request, 'End time must be after start time.')
             return redirect('editcontest', contest_id=contest.id)
+        if contest.freeze_time and not contest.start_time <= contest.freeze_time < contest.end_time:
+            messages.error(request, 'Scoreboard freeze must be between start and end time.')
+            return redirect('editcontest', contest_id=contest.id)
 
         contest.save()
+        if contest.ranking_rule != ranking_rule:
+            update_ranks(contest)
         messages.success(request, 'Contest updated successfully.')
         return redirect('allcontest')
 
-    return render(request, 'contest/editcontest.html', {'contest': contest})
+    return render(request, 'contest/editcontest.html', {
+        'contest': contest,
+        'judging_policy_choices': JUDGING_POLICY_CHOICES,
+        'ranking_rule_choices': RANKING_RULE_CHOICES,
+    })
+
 
 
+@login_required(login_url='admin_login')
+def unfreezecontest(request, contest_id):
+    if not request.user.is_staff:
+        messages.error(request, 'You are not authorized to access this page.')
+        return redirect('admin_login')
+    contest = get_object_or_404(Contest, id=contest_id)
+
+    if contest.end_time > timezone.now():
+        messages.error(request, 'A contest can only be unfrozen after it ends.')
+    elif not contest.freeze_time or contest.unfrozen_at:
+        messages.error(request, 'This contest is not frozen.')
+    else:
+        reveals = unfreeze(contest)
+        messages.success(request, f'Scoreboard unfrozen: {len(reveals)} results revealed.')
+    return redirect('allcontest')
+
+
+@login_required(login_url='admin_login')
+def exportcontest(request, contest_id, dataset):
+    if not request.user.is_staff:
+        messages.error(request, 'You are not authorized to access this page.')
+        return redirect('admin_login')
+    contest = get_object_or_404(Contest, id=contest_id)
+    file_format = request.GET.get('format', 'csv')
+    if dataset not in exports.DATASETS or file_format not in exports.FORMATS:
+        messages.error(request, 'Unknown export.')
+        return redirect('allcontest')
+    return exports.export_response(request, dataset, contest, file_format, request.GET.get('gzip') == '1')
+
 
 def deletecontest(request, contest_id):
     contest = get_object_or_404(Contest, id=contest_id)
@@ -147,11 +195,17 @@ def addcontest(request):
             is_public = request.POST.get('is_public') == 'on'
             is_rated = request.POST.get('is_rated') == 'on'
             max_participants = request.POST.get('max_participants') or None
+            judging_policy = request.POST.get('judging_policy') or 'ioi'
+            ranking_rule = request.POST.get('ranking_rule') or 'score'
+            freeze_time = parse_datetime(request.POST.get('freeze_time') or '')
 
             # Basic validation (optional)
             if start_time >= end_time:
                 messages.error(request, 'End time must be after start time.')
                 return redirect('addcontest')
+            if freeze_time and not start_time <= freeze_time < end_time:
+                messages.error(request, 'Scoreboard freeze must be between start and end time.')
+                return redirect('addcontest')
 
             # Create a new contest instance
             Contest.objects.create(
@@ -165,12 +219,18 @@ def addcontest(request):
                 is_public=is_public,
                 is_rated=is_rated,
                 max_participants=max_participants if max_participants else None,
+                judging_policy=judging_policy,
+                ranking_rule=ranking_rule,
+                freeze_time=freeze_time,
             )
 
             messages.success(request, 'Contest added successfully.')
             return redirect('allcontest')  # make sure this URL exists
 
-        return render(request, 'contest/addcontest.html')
+        return render(request, 'contest/addcontest.html', {
+            'judging_policy_choices': JUDGING_POLICY_CHOICES,
+            'ranking_rule_choices': RANKING_RULE_CHOICES,
+        })
     else:
         messages.error(request, 'You are not authorized to access this page.')
         return redirect('admin_login')
@@ -191,6 +251,18 @@ def practice_problems_list(request):
         return redirect('home')
     
 
+def _import_testcase_archive(request, problem):
+    """Import the testcases of the uploaded ``testcase_archive``; False, with an error message, if it can't be."""
+    try:
+        count = import_testcases(problem, request.FILES['testcase_archive'],
+                                 points=int(request.POST.get('archive_points') or 0))
+    except (TestcaseArchiveError, ValueError) as e:
+        messages.error(request, f'Testcases not imported: {e}')
+        return False
+    messages.info(request, f'{count} testcases imported from the archive.')
+    return True
+
+
 @login_required(login_url='admin_login')
 def addpracticeproblem(request):
     if request.user.is_staff:
@@ -212,6 +284,7 @@ def addpracticeproblem(request):
             editorial = request.POST.get('editorial')
             is_featured = request.POST.get('is_featured') == 'on'
             is_visible = request.POST.get('is_visible') == 'on'
+            judging_policy = request.POST.get('judging_policy') or 'ioi'
             
             # Create the problem
             problem = PracticeProblem.objects.create(
@@ -230,7 +303,8 @@ def addpracticeproblem(request):
                 points=points,
                 editorial=editorial,
                 is_featured=is_featured,
-                is_visible=is_visible
+                is_visible=is_visible,
+                judging_policy=judging_policy,
             )
             
             # Handle tags from multi-select
@@ -252,21 +326,25 @@ def addpracticeproblem(request):
                 )
             
             # Handle non-sample testcases
-            testcase_count = int(request.POST.get('testcase_count', 0))
-            for i in range(testcase_count):
-                testcase_input = request.POST.get(f'testcase_input_{i}')
-                testcase_output = request.POST.get(f'testcase_output_{i}')
-                testcase_points = request.POST.get(f'testcase_points_{i}', 0)
+            if 'testcase_archive' in request.FILES:
+                if not _import_testcase_archive(request, problem):
+                    return redirect('updatepracticeproblem', problem_id=problem.id)
+            else:
+                testcase_count = int(request.POST.get('testcase_count', 0))
+                for i in range(testcase_count):
+                    testcase_input = request.POST.get(f'testcase_input_{i}')
+                    testcase_output = request.POST.get(f'testcase_output_{i}')
+                    testcase_points = request.POST.get(f'testcase_points_{i}', 0)
                 
-                if testcase_input and testcase_output:
-                    PracticeTestcase.objects.create(
-                        problem=problem,
-                        input=testcase_input,
-                        output=testcase_output,
-                        is_sample=False,
-                        points=testcase_points
-                    )
-            
+                    if testcase_input and testcase_output:
+                        PracticeTestcase.objects.create(
+                            problem=problem,
+                            input=testcase_input,
+                            output=testcase_output,
+                            is_sample=False,
+                            points=testcase_points
+                        )
+
             messages.success(request, 'Practice problem created successfully!')
             return redirect('practice_problems_list')  
         else:
@@ -277,6 +355,7 @@ def addpracticeproblem(request):
             context = {
                 'difficulty_choices': difficulty_choices,
                 'all_tags': all_tags,
+                'judging_policy_choices': JUDGING_POLICY_CHOICES,
                 'mode': 'add'
             }
             return render(request, 'practice/practice_problem_form.html', context)
@@ -308,6 +387,7 @@ def updatepracticeproblem(request, problem_id):
             problem.editorial = request.POST.get('editorial')
             problem.is_featured = request.POST.get('is_featured') == 'on'
             problem.is_visible = request.POST.get('is_visible') == 'on'
+            problem.judging_policy = request.POST.get('judging_policy') or problem.judging_policy
             
             problem.save()
             
@@ -319,36 +399,43 @@ def updatepracticeproblem(request, problem_id):
                 problem.tags.add(tag)
             
             
-            problem.testcases.all().delete()
+            with transaction.atomic():
+                problem.testcases.all().delete()
+                problem.testcases_changed()
             
-            # Add sample testcase
-            sample_testcase_input = request.POST.get('sample_testcase_input')
-            sample_testcase_output = request.POST.get('sample_testcase_output')
+                # Add sample testcase
+                sample_testcase_input = request.POST.get('sample_testcase_input')
+                sample_testcase_output = request.POST.get('sample_testcase_output')
             
-            if sample_testcase_input and sample_testcase_output:
-                PracticeTestcase.objects.create(
-                    problem=problem,
-                    input=sample_testcase_input,
-                    output=sample_testcase_output,
-                    is_sample=True
-                )
-            
-            # Add non-sample testcases
-            testcase_count = int(request.POST.get('testcase_count', 0))
-            for i in range(testcase_count):
-                testcase_input = request.POST.get(f'testcase_input_{i}')
-                testcase_output = request.POST.get(f'testcase_output_{i}')
-                testcase_points = request.POST.get(f'testcase_points_{i}', 0)
-                
-                if testcase_input and testcase_output:
+                if sample_testcase_input and sample_testcase_output:
                     PracticeTestcase.objects.create(
                         problem=problem,
-                        input=testcase_input,
-                        output=testcase_output,
-                        is_sample=False,
-                        points=testcase_points
+                        input=sample_testcase_input,
+                        output=sample_testcase_output,
+                        is_sample=True
                     )
             
+                # Add non-sample testcases
+                if 'testcase_archive' in request.FILES:
+                    if not _import_testcase_archive(request, problem):
+                        transaction.set_rollback(True)  # keep the old testcases
+                        return redirect('updatepracticeproblem', problem_id=problem.id)
+                else:
+                    testcase_count = int(request.POST.get('testcase_count', 0))
+                    for i in range(testcase_count):
+                        testcase_input = request.POST.get(f'testcase_input_{i}')
+                        testcase_output = request.POST.get(f'testcase_output_{i}')
+                        testcase_points = request.POST.get(f'testcase_points_{i}', 0)
+                
+                        if testcase_input and testcase_output:
+                            PracticeTestcase.objects.create(
+                                problem=problem,
+                                input=testcase_input,
+                                output=testcase_output,
+                                is_sample=False,
+                                points=testcase_points
+                            )
+
             messages.success(request, 'Practice problem updated successfully!')
             return redirect('practice_problems_list')  
         else:
@@ -366,6 +453,7 @@ def updatepracticeproblem(request, problem_id):
                 'problem': problem,
                 'difficulty_choices': difficulty_choices,
                 'all_tags': all_tags,
+                'judging_policy_choices': JUDGING_POLICY_CHOICES,
                 'sample_testcase': sample_testcase,
                 'other_testcases': other_testcases,
                 'mode': 'edit'
@@ -468,19 +556,23 @@ def addproblem(request):
                 )
 
             # Other testcases
-            testcase_count = int(request.POST.get('testcase_count', 0))
-            for i in range(testcase_count):
-                testcase_input = request.POST.get(f'testcase_input_{i}')
-                testcase_output = request.POST.get(f'testcase_output_{i}')
-                testcase_points = request.POST.get(f'testcase_points_{i}', 0)
-                if testcase_input and testcase_output:
-                    Testcase.objects.create(
-                        problem=problem,
-                        input=testcase_input,
-                        output=testcase_output,
-                        is_sample=False,
-                        points=testcase_points
-                    )
+            if 'testcase_archive' in request.FILES:
+                if not _import_testcase_archive(request, problem):
+                    return redirect('edit_problem', problem_id=problem.id)
+            else:
+                testcase_count = int(request.POST.get('testcase_count', 0))
+                for i in range(testcase_count):
+                    testcase_input = request.POST.get(f'testcase_input_{i}')
+                    testcase_output = request.POST.get(f'testcase_output_{i}')
+                    testcase_points = request.POST.get(f'testcase_points_{i}', 0)
+                    if testcase_input and testcase_output:
+                        Testcase.objects.create(
+                            problem=problem,
+                            input=testcase_input,
+                            output=testcase_output,
+                            is_sample=False,
+                            points=testcase_points
+                        )
 
             messages.success(request, 'Problem added successfully!')
             return redirect('contest_problems_list')
@@ -536,35 +628,42 @@ def edit_problem(request, problem_id):
                 tag = ProblemTag.objects.get(id=tag_id)
                 problem.tags.add(tag)
 
-            # Delete existing testcases
-            problem.testcases.all().delete()
+            with transaction.atomic():
+                # Delete existing testcases
+                problem.testcases.all().delete()
+                problem.testcases_changed()
 
-            # Sample testcase
-            sample_testcase_input = request.POST.get('sample_testcase_input')
-            sample_testcase_output = request.POST.get('sample_testcase_output')
-            if sample_testcase_input and sample_testcase_output:
-                Testcase.objects.create(
-                    problem=problem,
-                    input=sample_testcase_input,
-                    output=sample_testcase_output,
-                    is_sample=True
-                )
-
-            # Other testcases
-            testcase_count = int(request.POST.get('testcase_count', 0))
-            for i in range(testcase_count):
-                testcase_input = request.POST.get(f'testcase_input_{i}')
-                testcase_output = request.POST.get(f'testcase_output_{i}')
-                testcase_points = request.POST.get(f'testcase_points_{i}', 0)
-                if testcase_input and testcase_output:
+                # Sample testcase
+                sample_testcase_input = request.POST.get('sample_testcase_input')
+                sample_testcase_output = request.POST.get('sample_testcase_output')
+                if sample_testcase_input and sample_testcase_output:
                     Testcase.objects.create(
                         problem=problem,
-                        input=testcase_input,
-                        output=testcase_output,
-                        is_sample=False,
-                        points=testcase_points
+                        input=sample_testcase_input,
+                        output=sample_testcase_output,
+                        is_sample=True
                     )
 
+                # Other testcases
+                if 'testcase_archive' in request.FILES:
+                    if not _import_testcase_archive(request, problem):
+                        transaction.set_rollback(True)  # keep the old testcases
+                        return redirect('edit_problem', problem_id=problem.id)
+                else:
+                    testcase_count = int(request.POST.get('testcase_count', 0))
+                    for i in range(testcase_count):
+                        testcase_input = request.POST.get(f'testcase_input_{i}')
+                        testcase_output = request.POST.get(f'testcase_output_{i}')
+                        testcase_points = request.POST.get(f'testcase_points_{i}', 0)
+                        if testcase_input and testcase_output:
+                            Testcase.objects.create(
+                                problem=problem,
+                                input=testcase_input,
+                                output=testcase_output,
+                                is_sample=False,
+                                points=testcase_points
+                            )
+
             messages.success(request, 'Problem updated successfully!')
             return redirect('contest_problems_list')
 
@@ -649,8 +748,28 @@ def contest_analytics(request):
 
 @login_required(login_url='admin_login')
 def all_submission(request):
-    submissions = Submission.objects.select_related('user', 'problem', 'contest').order_by('-submitted_at')
-    return render(request, 'dashboard/all_submissions.html', {'submissions': submissions})
+    submissions = Submission.objects.select_related('user', 'problem', 'contest')
+    status = request.GET.get('status', '')
+    if status:
+        submissions = submissions.filter(status=status)
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 50)), 1), 200)
+    except ValueError:
+        page_size = 50
+    try:
+        page, next_cursor, previous_cursor = keyset_page(submissions, request.GET.get('cursor'), page_size)
+    except ValueError:
+        messages.error(request, 'Invalid page link, showing the latest submissions.')
+        page, next_cursor, previous_cursor = keyset_page(submissions, None, page_size)
+    context = {
+        'submissions': page,
+        'status': status,
+        'status_choices': Submission.STATUS_CHOICES,
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
+    }
+    return render(request, 'dashboard/all_submissions.html', context)
 
 @login_required(login_url='admin_login')
 def ban_user(request, user_id):
@@ -30,11 +30,16 @@ import Editor from "@monaco-editor/react"
 export default function SubmissionHistory() {
   const { 
     submissions, 
-    fetchAllSubmissions, 
+    filters,
+    nextPage,
+    fetchSubmissions, 
+    fetchMoreSubmissions,
     fetchSubmissionById, 
     selectedSubmission, 
     clearSelectedSubmission,
+    loaded,
     loading,
+    loadingMore,
     error
   } = useSubmissionStore()
 
@@ -50,9 +55,14 @@ export default function SubmissionHistory() {
     console.log("Current submissions in store:", submissions);
   }, [submissions]);
 
+  // The server filters and pages the list; wait for a pause in typing before searching
   useEffect(() => {
-    fetchAllSubmissions()
-  }, [])
+    const search = searchTerm.trim()
+    const timer = setTimeout(() => {
+      fetchSubmissions({ search, status: statusFilter, ordering: sortOrder === "desc" ? "-submitted_at" : "submitted_at" })
+    }, search === filters.search ? 0 : 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm, statusFilter, sortOrder])
 
   const handleSubmissionClick = async (id) => {
     await fetchSubmissionById(id)
@@ -73,20 +83,7 @@ export default function SubmissionHistory() {
     setTimeout(() => setCopied(false), 2000)
   }
 
-  // Filter and sort submissions
-  const filteredSubmissions = submissions && submissions.length > 0
-    ? submissions
-        .filter((sub) => {
-          const matchesSearch = sub.problem_title?.toLowerCase().includes(searchTerm.toLowerCase())
-          const matchesStatus = statusFilter ? sub.status === statusFilter : true
-          return matchesSearch && matchesStatus
-        })
-        .sort((a, b) => {
-          const dateA = new Date(a.submitted_at).getTime()
-          const dateB = new Date(b.submitted_at).getTime()
-          return sortOrder === "desc" ? dateB - dateA : dateA - dateB
-        })
-    : []
+  const filtering = Boolean(filters.search || filters.status)
 
   // Format date
   const formatDate = (dateString) => {
@@ -149,8 +146,8 @@ export default function SubmissionHistory() {
     },
   }
 
-  // Show loading state
-  if (loading) {
+  // Show loading state until the first page is in
+  if (loading && !loaded) {
     return (
       <div className="min-h-screen relative bg-slate-950 py-8 px-4 sm:px-6 lg:px-8 flex items-center justify-center">
         <div className="text-white text-xl">Loading submissions...</div>
@@ -233,7 +230,7 @@ export default function SubmissionHistory() {
           </div>
         </motion.div>
 
-        {!submissions || submissions.length === 0 ? (
+        {submissions.length === 0 && !filtering ? (
           <motion.div
             initial={{ opacity: 0, y: 20 }}
             animate={{ opacity: 1, y: 0 }}
@@ -247,7 +244,7 @@ export default function SubmissionHistory() {
               You haven't submitted any solutions yet. Solve some problems to see your submission history here.
             </p>
           </motion.div>
-        ) : filteredSubmissions.length === 0 ? (
+        ) : submissions.length === 0 ? (
           <motion.div
             initial={{ opacity: 0, y: 20 }}
             animate={{ opacity: 1, y: 0 }}
@@ -272,7 +269,7 @@ export default function SubmissionHistory() {
           </motion.div>
         ) : (
           <motion.div variants={containerVariants} initial="hidden" animate="visible" className="grid gap-4">
-            {filteredSubmissions.map((submission) => (
+            {submissions.map((submission) => (
               <motion.div
                 key={submission.id}
                 variants={itemVariants}
@@ -328,6 +325,18 @@ export default function SubmissionHistory() {
             ))}
           </motion.div>
         )}
+
+        {nextPage && submissions.length > 0 && (
+          <div className="mt-6 flex justify-center">
+            <button
+              onClick={fetchMoreSubmissions}
+              disabled={loadingMore}
+              className="px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-lg text-white text-sm transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Detail Modal */}
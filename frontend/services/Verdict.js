@@ -0,0 +1,75 @@
+import apiClient from "./Api";
+
+// Submissions are judged in the background: submitting answers 202 with the
+// submission still "Pending". waitForVerdict resolves with the judged
+// submission, from the /events/ stream (verdict event) when the server can
+// stream, or by polling the submission otherwise.
+//
+// `path` is the submission's URL, e.g. `/submission/12/`. Returns
+// { promise, cancel }; cancel() stops waiting and the promise never settles.
+
+const POLL_START_MS = 1000;
+const POLL_MAX_MS = 5000;
+const GIVE_UP_MS = 10 * 60 * 1000;
+
+export const waitForVerdict = (path, token) => {
+  const headers = { Authorization: `Token ${token}` };
+  const startedAt = Date.now();
+  let cancelled = false;
+  let source = null;
+  let timer = null;
+
+  const cancel = () => {
+    cancelled = true;
+    if (source) source.close();
+    clearTimeout(timer);
+  };
+
+  const promise = new Promise((resolve, reject) => {
+    const fetchSubmission = async () => (await apiClient.get(path, { headers })).data;
+
+    const poll = (delay) => {
+      timer = setTimeout(async () => {
+        if (cancelled) return;
+        try {
+          const submission = await fetchSubmission();
+          if (cancelled) return;
+          if (submission.status !== "Pending") {
+            resolve(submission);
+          } else if (Date.now() - startedAt > GIVE_UP_MS) {
+            reject(new Error("The submission is still being judged."));
+          } else {
+            poll(Math.min(Math.max(delay * 2, POLL_START_MS), POLL_MAX_MS));
+          }
+        } catch (error) {
+          if (!cancelled) reject(error);
+        }
+      }, delay);
+    };
+
+    if (typeof EventSource === "undefined") {
+      poll(POLL_START_MS);
+      return;
+    }
+
+    source = new EventSource(
+      `${apiClient.defaults.baseURL}${path}events/?token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener("verdict", async () => {
+      source.close();
+      try {
+        const submission = await fetchSubmission();
+        if (!cancelled) resolve(submission);
+      } catch (error) {
+        if (!cancelled) reject(error);
+      }
+    });
+    source.onerror = () => {
+      // No streaming (e.g. not served over ASGI) or the stream dropped: poll instead
+      source.close();
+      if (!cancelled) poll(0);
+    };
+  });
+
+  return { promise, cancel };
+};
@@ -1,7 +1,10 @@
 import { create } from "zustand";
 import apiClient from "@/services/Api";
+import { waitForVerdict } from "@/services/Verdict";
 import useAuthStore from "./AuthStore";
 
+let pendingVerdict = null; // the submission we are waiting on, if any
+
 const usePracticeSubmitStore = create((set) => ({
     submissions: [],
     submissionDetail: null,
@@ -46,6 +49,7 @@ const usePracticeSubmitStore = create((set) => ({
     submitPracticeCode: async ({ problemId, code, language }) => {
         const token = useAuthStore.getState().token;
         set({ submitting: true, error: null });
+        pendingVerdict?.cancel();
 
         try {
             const response = await apiClient.post(
@@ -60,14 +64,24 @@ const usePracticeSubmitStore = create((set) => ({
                 }
             );
 
-        
+            // 202: queued for judging, still "Pending"; show that until the verdict arrives
             set((state) => ({
                 submissions: [response.data, ...state.submissions],
                 submissionResult: response.data,
+            }));
+            pendingVerdict = waitForVerdict(`/practicesubmit/${response.data.id}/`, token);
+            const judged = await pendingVerdict.promise;
+            pendingVerdict = null;
+
+            set((state) => ({
+                submissions: state.submissions.map((submission) =>
+                    submission.id === judged.id ? judged : submission
+                ),
+                submissionResult: judged,
                 submitting: false,
             }));
 
-            return response.data; // Useful for redirect or showing result
+            return judged; // Useful for redirect or showing result
         } catch (err) {
             console.error("Error submitting code", err);
             set({ error: err, submitting: false });
@@ -77,6 +91,8 @@ const usePracticeSubmitStore = create((set) => ({
 
     // Reset submission state
     resetSubmission: () => {
+        pendingVerdict?.cancel();
+        pendingVerdict = null;
         set({
             submissionResult: null,
             error: null,
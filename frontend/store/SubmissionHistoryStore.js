@@ -2,61 +2,117 @@ import { create } from "zustand";
 import apiClient from "@/services/Api";
 import useAuthStore from "./AuthStore";
 
+// The list is cursor paginated ({ next, previous, results }) and filtered by
+// the server: fetchSubmissions loads the first page for the given filters,
+// fetchMoreSubmissions the next one when the user asks for it.
+const PAGE_SIZE = 25;
+
+export const DEFAULT_FILTERS = { search: "", status: "", ordering: "-submitted_at" };
+
+const filterParams = ({ search, status, ordering }) => {
+  const params = { page_size: PAGE_SIZE, ordering };
+  if (search) params.search = search;
+  if (status) params.status = status;
+  return params;
+};
+
 const useSubmissionStore = create((set, get) => ({
   submissions: [],
+  filters: DEFAULT_FILTERS,
+  nextPage: null, // URL of the next page, null once all of them are loaded
+  loaded: false,
   loading: false,
+  loadingMore: false,
   error: null,
   selectedSubmission: null,
-  
-  fetchAllSubmissions: async () => {
+
+  fetchSubmissions: async (filters = get().filters) => {
     const { token } = useAuthStore.getState();
-    
-    set({ loading: true, error: null });
-    
+
+    set({ filters, loading: true, error: null });
+
     try {
       const response = await apiClient.get("/submission/", {
+        params: filterParams(filters),
         headers: {
           Authorization: `Token ${token}`,
         },
       });
-      
-      console.log("Fetched submissions:", response.data);
-      set({ submissions: response.data, loading: false });
+      if (get().filters !== filters) return; // the filters changed while this page was loading
+
+      set({
+        submissions: response.data.results,
+        nextPage: response.data.next,
+        loaded: true,
+        loading: false,
+      });
     } catch (error) {
       console.error("Failed to fetch submissions:", error);
-      set({ 
-        error: error.response?.data?.detail || "Failed to fetch submissions", 
-        loading: false 
+      set({
+        error: error.response?.data?.detail || "Failed to fetch submissions",
+        loading: false
+      });
+    }
+  },
+
+  fetchMoreSubmissions: async () => {
+    const { token } = useAuthStore.getState();
+    const { nextPage, filters, loadingMore } = get();
+    if (!nextPage || loadingMore) return;
+
+    set({ loadingMore: true });
+
+    try {
+      const response = await apiClient.get(nextPage, {
+        headers: {
+          Authorization: `Token ${token}`,
+        },
+      });
+      if (get().filters !== filters) {
+        set({ loadingMore: false });
+        return;
+      }
+
+      set((state) => ({
+        submissions: state.submissions.concat(response.data.results),
+        nextPage: response.data.next,
+        loadingMore: false,
+      }));
+    } catch (error) {
+      console.error("Failed to fetch more submissions:", error);
+      set({
+        error: error.response?.data?.detail || "Failed to fetch submissions",
+        loadingMore: false
       });
     }
   },
-  
+
   fetchSubmissionById: async (id) => {
     const { token } = useAuthStore.getState();
-    
+
     set({ loading: true, error: null });
-    
+
     try {
       const response = await apiClient.get(`/submission/${id}/`, {
         headers: {
           Authorization: `Token ${token}`,
         },
       });
-      
+
       console.log("Fetched submission details:", response.data);
       set({ selectedSubmission: response.data, loading: false });
     } catch (error) {
       console.error("Failed to fetch submission details:", error);
-      set({ 
-        error: error.response?.data?.detail || "Failed to fetch submission details", 
-        loading: false 
+      set({
+        error: error.response?.data?.detail || "Failed to fetch submission details",
+        loading: false
       });
     }
   },
-  
+
   clearSelectedSubmission: () => {
     set({ selectedSubmission: null });
   },
 }));
 
-export default useSubmissionStore;
\ No newline at end of file
+export default useSubmissionStore;
@@ -1,7 +1,10 @@
 import { create } from "zustand";
 import apiClient from "@/services/Api";
+import { waitForVerdict } from "@/services/Verdict";
 import useAuthStore from "./AuthStore";
 
+let pendingVerdict = null; // the submission we are waiting on, if any
+
 const useCodeSubmissionStore = create((set, get) => ({
   result: null, // Store the result of the submission
   loading: false,
@@ -10,6 +13,7 @@ const useCodeSubmissionStore = create((set, get) => ({
   submitCode: async ({ problemId, code, language }) => {
     const { token } = useAuthStore.getState();
     set({ loading: true, error: null, result: null });
+    pendingVerdict?.cancel();
     
     try {
       const response = await apiClient.post(
@@ -26,8 +30,14 @@ const useCodeSubmissionStore = create((set, get) => ({
         }
       );
       
-      set({ result: response.data, loading: false });
-      return response.data; // Return data for direct use in component
+      // 202: queued for judging, still "Pending"; show that until the verdict arrives
+      set({ result: response.data });
+      pendingVerdict = waitForVerdict(`/submission/${response.data.id}/`, token);
+      const judged = await pendingVerdict.promise;
+      pendingVerdict = null;
+      
+      set({ result: judged, loading: false });
+      return judged; // Return data for direct use in component
       
     } catch (error) {
       console.error("Submission failed:", error);
@@ -42,6 +52,8 @@ const useCodeSubmissionStore = create((set, get) => ({
   },
   
   resetSubmissionState: () => {
+    pendingVerdict?.cancel();
+    pendingVerdict = null;
     set({ result: null, error: null, loading: false });
   },
 }));